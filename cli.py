@@ -15,6 +15,12 @@ def main() -> None:
     # generate subcommand
     gen = subparsers.add_parser('generate', help='Generate the diving website')
     gen.add_argument('image_root', nargs='?', help='path to diving images directory')
+    gen.add_argument(
+        '-j', '--jobs', type=int, default=1, help='render the trees in this many processes'
+    )
+    gen.add_argument(
+        '-z', '--compress', action='store_true', help='write .gz and .br siblings of the output'
+    )
 
     # imprecise subcommand
     imp = subparsers.add_parser('imprecise', help='Find and update imprecise image names')
@@ -38,7 +44,7 @@ def main() -> None:
             static.image_root = args.image_root
 
         verify.verify_before()
-        generate.main()
+        generate.main(args.jobs, args.compress)
         verify.verify_after()
 
         metrics.summary('gallery')
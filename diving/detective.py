@@ -4,17 +4,23 @@
 identification game
 """
 
+import base64
+import json
 import os
+import random
 import shutil
 from collections.abc import Iterable, Sequence
 
+import numpy as np
+
 from diving.hypertext import Where, navigation_carousel
 from diving.util import collection, static, taxonomy
-from diving.util.common import titlecase
+from diving.util.common import flatten, titlecase
 from diving.util.image import Image, categorize, split, unqualify
+from diving.util.links import links
 from diving.util.metrics import metrics
 from diving.util.resource import VersionedResource
-from diving.util.similarity import similarity
+from diving.util.similarity import similarity_matrix
 from diving.util.static import source_root, stylesheet
 
 
@@ -27,34 +33,41 @@ def get_hashes(images: list[Image]) -> Iterable[str]:
 ThumbsTable = list[list[str]]
 SimiliarityTable = list[list[int]]
 DifficultyTable = list[int]
+PoolTable = list[list[list[int]]]
 
+# These mirror g_lower_bound_table, g_upper_bound_table and g_count_table in
+# game.js, indexed by difficulty
+LOWER_BOUNDS = (0, 30, 50, 70, 80)
+UPPER_BOUNDS = (30, 50, 70, 80, 100)
+OPTION_COUNTS = (2, 2, 4, 6, 8)
 
-def table_builder(
-    images: Sequence[Image],
-) -> tuple[list[str], ThumbsTable, SimiliarityTable, DifficultyTable]:
-    """Build the tables."""
-    images = reversed(images)
-    all_names, images = _filter_images(images)
+# Most distractors kept per name and difficulty, more means more variety
+POOL_SIZE = 16
 
-    hashes = list(get_hashes(images))
-    names = sorted(list(set(all_names)))
-    thumbs: ThumbsTable = [[] for _ in names]
 
-    for i, name in enumerate(all_names):
-        where = names.index(name)
-        if len(thumbs[where]) < 20:
-            thumbs[where].append(hashes[i])
+Tables = tuple[list[str], ThumbsTable, SimiliarityTable, DifficultyTable, PoolTable]
+MasterMatrix = tuple[dict[str, int], np.ndarray]
 
-    similarity = _similarity_table(names)
-    names = [titlecase(n) for n in names]
-    diffs = _difficulties(names)
 
-    return names, thumbs, similarity, diffs
+def table_builder(images: Sequence[Image], master: MasterMatrix | None = None) -> Tables:
+    """Build the tables.
+
+    When provided, similarities are sliced out of the master matrix rather than
+    computed, which must include every name in these images.
+    """
+    images = reversed(images)
+    all_names, images = _filter_images(images)
+    return _build_tables(all_names, images, master)
 
 
 def writer() -> None:
     """Write out all the game artifacts"""
-    _write_data_js(collection.named(), 'main')
+    all_names, images = _filter_images(reversed(collection.named()))
+    master = _master_matrix(all_names)
+    datasets = _datasets(all_names, images)
+
+    for name, (names, images) in datasets.items():
+        _write_data_js(_build_tables(names, images, master), name)
 
     shutil.copy(
         os.path.join(source_root, 'web', 'game.js'),
@@ -62,30 +75,144 @@ def writer() -> None:
     )
 
     game = VersionedResource('detective/game.js', 'detective')
-    data = VersionedResource('detective/main.js', 'detective')
+    data = {name: VersionedResource(f'detective/{name}.js', 'detective').path for name in datasets}
 
     with open('detective/index.html', 'w+') as fd:
-        html = _html_builder(stylesheet.path, game.path, data.path)
+        html = _html_builder(stylesheet.path, game.path, data)
         print(html, file=fd, end='')
+    links.add('detective/index.html', html)
 
 
 # PRIVATE
 
 
-def _write_data_js(images: Sequence[Image], name: str) -> None:
-    """write out the tables to a file"""
-    ns, ts, ss, ds = table_builder(images)
+def _build_tables(all_names: list[str], images: list[Image], master: MasterMatrix | None) -> Tables:
+    """Build the tables for already filtered images"""
+    hashes = list(get_hashes(images))
+    names = sorted(list(set(all_names)))
+    index = {name: i for i, name in enumerate(names)}
+    thumbs: ThumbsTable = [[] for _ in names]
 
-    # This saves 100KB of data, ~20% of the total
-    ts = str(ts).replace(' ', '')
-    ss = str(ss).replace(' ', '')
-    ds = str(ds).replace(' ', '')
+    for i, name in enumerate(all_names):
+        where = index[name]
+        if len(thumbs[where]) < 20:
+            thumbs[where].append(hashes[i])
+
+    if master:
+        lookup, full = master
+        rows = [lookup[name] for name in names]
+        matrix = full[np.ix_(rows, rows)]
+    else:
+        matrix = _similarity_matrix(names)
+
+    similarity = _similarity_table(matrix)
+    pools = _distractor_pools(matrix, names)
+    names = [titlecase(n) for n in names]
+    diffs = _difficulties(names)
+
+    return names, thumbs, similarity, diffs, pools
+
+
+def _master_matrix(all_names: list[str]) -> MasterMatrix:
+    """similarities between every name, shared by all the datasets"""
+    names = sorted(set(all_names))
+    return {name: i for i, name in enumerate(names)}, _similarity_matrix(names)
+
+
+def _datasets(
+    all_names: list[str], images: list[Image]
+) -> dict[str, tuple[list[str], list[Image]]]:
+    """Split the filtered images into the datasets the game can play with.
+
+    main is everything, reef is static.reef_organisms for the reef game, and
+    the rest are limited to the regions in static.detective_datasets
+    """
+    reef = set(static.reef_organisms)
+    pairs = list(zip(all_names, images))
+    regions = [image.dive.region for image in images]
+
+    selections = {
+        'main': [True for _ in pairs],
+        'reef': [name in reef for name in all_names],
+    }
+    for label, included in static.detective_datasets.items():
+        selections[_dataset_key(label)] = [region in included for region in regions]
+
+    datasets = {}
+    for key, selected in selections.items():
+        chosen = [pair for pair, keep in zip(pairs, selected) if keep]
+
+        if len({name for name, _ in chosen}) < max(OPTION_COUNTS):
+            metrics.record('detective datasets skipped', key)
+            continue
+
+        datasets[key] = ([name for name, _ in chosen], [image for _, image in chosen])
+
+    return datasets
+
+
+def _write_data_js(tables: Tables, name: str, packed: bool = True) -> None:
+    """write out the tables to a file"""
+    ns, ts, ss, ds, ps = tables
 
     with open(f'detective/{name}.js', 'w+') as fd:
         print(f'var {name}_names =', ns, file=fd)
-        print(f'var {name}_thumbs =', ts, file=fd)
-        print(f'var {name}_similarities =', ss, file=fd)
-        print(f'var {name}_difficulties =', ds, file=fd)
+
+        if packed:
+            hashes, refs = _pack_thumbs(ts)
+            print(f"var {name}_hashes = '{hashes}'", file=fd)
+            print(f"var {name}_thumbs = '{refs}'", file=fd)
+            print(f"var {name}_similarities = '{_pack_similarities(ss)}'", file=fd)
+            print(f"var {name}_difficulties = '{_encode(_varints(ds))}'", file=fd)
+            print(f"var {name}_pools = '{_pack_pools(ps)}'", file=fd)
+            return
+
+        # This saves 100KB of data, ~20% of the total
+        print(f'var {name}_thumbs =', str(ts).replace(' ', ''), file=fd)
+        print(f'var {name}_similarities =', str(ss).replace(' ', ''), file=fd)
+        print(f'var {name}_difficulties =', str(ds).replace(' ', ''), file=fd)
+        print(f'var {name}_pools =', str(ps).replace(' ', ''), file=fd)
+
+
+def _encode(data: bytes) -> str:
+    """bytes to a string that can be embedded in javascript"""
+    return base64.b64encode(data).decode('ascii')
+
+
+def _varints(values: Iterable[int]) -> bytes:
+    """LEB128, 7 bits per byte with the high bit marking continuation"""
+    out = bytearray()
+    for value in values:
+        assert value >= 0, value
+        while value > 0x7F:
+            out.append((value & 0x7F) | 0x80)
+            value >>= 7
+        out.append(value)
+    return bytes(out)
+
+
+def _pack_similarities(similarities: SimiliarityTable) -> str:
+    """the lower triangular table, row by row, one byte per score"""
+    return _encode(bytes(score for row in similarities for score in row))
+
+
+def _pack_thumbs(thumbs: ThumbsTable) -> tuple[str, str]:
+    """a comma separated dictionary of hashes, and for each name a count
+    followed by indices into that dictionary
+    """
+    lookup: dict[str, int] = {}
+    refs: list[int] = []
+
+    for row in thumbs:
+        refs.append(len(row))
+        refs.extend(lookup.setdefault(thumb, len(lookup)) for thumb in row)
+
+    return ','.join(lookup), _encode(_varints(refs))
+
+
+def _pack_pools(pools: PoolTable) -> str:
+    """for each name and difficulty, a count followed by the candidate indices"""
+    return _encode(_varints(flatten([len(pool), *pool] for row in pools for pool in row)))
 
 
 def _difficulties(names: list[str]) -> DifficultyTable:
@@ -159,31 +286,71 @@ def _filter_images(images: Iterable[Image]) -> tuple[list[str], list[Image]]:
     return all_names, new_images
 
 
-def _similarity_table(names: list[str]) -> SimiliarityTable:
-    """how alike is every name pair"""
+def _similarity_matrix(names: list[str]) -> np.ndarray:
+    """how alike is every name pair, no name is similar to itself"""
     tree = taxonomy.mapping()
-    table: SimiliarityTable = [[] for _ in names]
+    matrix = similarity_matrix([tree[name] for name in names])
+    np.fill_diagonal(matrix, 0)
+    return matrix
+
+
+def _similarity_table(matrix: np.ndarray) -> SimiliarityTable:
+    """the lower triangle of the similarity matrix"""
+    return [matrix[i, : i + 1].tolist() for i in range(len(matrix))]
+
+
+def _distractor_pools(matrix: np.ndarray, names: list[str]) -> PoolTable:
+    """Candidate distractors for every name at every difficulty.
+
+    This is find_similar() from game.js done ahead of time: candidates must
+    fall within the difficulty's similarity band, and the band is widened by 5
+    in both directions until there are enough of them. Large pools are sampled
+    down to POOL_SIZE, seeded by name so the output is stable between builds.
+    """
+    pools: PoolTable = []
 
     for i, name in enumerate(names):
-        for j, other in enumerate(names):
-            if i == j:
-                table[i].append(0)
-                continue
+        row = matrix[i]
+        others = np.arange(len(names)) != i
+        chooser = random.Random(name)
+        pools.append([])
 
-            if j > i:
-                # should already be done
-                continue
+        for lower, upper, count in zip(LOWER_BOUNDS, UPPER_BOUNDS, OPTION_COUNTS):
+            while True:
+                candidates = np.flatnonzero(others & (row >= lower) & (row <= upper))
+                if len(candidates) >= count - 1 or (lower <= 0 and upper >= 100):
+                    break
+                metrics.counter('detective distractor bands widened')
+                lower = max(0, lower - 5)
+                upper = min(100, upper + 5)
 
-            score = similarity(tree[name], tree[other])
-            table[i].append(int(score * 100))
+            pool = candidates.tolist()
+            if len(pool) > POOL_SIZE:
+                pool = sorted(chooser.sample(pool, POOL_SIZE))
+            pools[i].append(pool)
 
-    return table
+    return pools
 
 
-def _html_builder(css: str, game: str, data: str) -> str:
+def _dataset_key(label: str) -> str:
+    """Pacific Northwest -> pacific_northwest, usable as a javascript name"""
+    return label.lower().replace(' ', '_')
+
+
+def _html_builder(css: str, game: str, data: dict[str, str]) -> str:
     """Insert dynamic content into the HTML template"""
     desc = 'Scuba diving picture identification game, identify a picture or choose the image for a name'
     nav = navigation_carousel(Where.Detective)
+    urls = json.dumps({name: f'/{path}' for name, path in data.items()})
+
+    labels = {'main': 'All Regions'}
+    labels.update({_dataset_key(label): label for label in static.detective_datasets})
+    datasets = '\n'.join(
+        f'                    <option value="{key}">{label}</option>'
+        for key, label in labels.items()
+        if key in data
+    )
+    reef = '<option value="reef">Reef</option>' if 'reef' in data else ''
     return f"""
 <!DOCTYPE html>
 <html>
@@ -196,7 +363,8 @@ def _html_builder(css: str, game: str, data: str) -> str:
               content="{desc}">
         <link rel="stylesheet" href="/{css}" />
         <link rel="stylesheet" href="/jquery.fancybox.min.css" />
-        <script src="/{data}"></script>
+        <script>const g_dataset_urls = {urls};</script>
+        <script src="/{data['main']}"></script>
         <script src="/{game}"></script>
         <style>
 body {{
@@ -218,6 +386,7 @@ body {{
                 <select id="game" onchange="choose_game();">
                     <option value="names">Names</option>
                     <option value="images">Images</option>
+                    {reef}
                 </select>
                 <div class="scoring">
                     <h3 id="score"></h3>
@@ -230,6 +399,9 @@ body {{
                     <option value=3>Hard</option>
                     <option value=4>Very Hard</option>
                 </select>
+                <select id="dataset" onchange="choose_game();">
+{datasets}
+                </select>
             </div>
 
             <div id="correct_outer">
@@ -2,15 +2,18 @@
 
 from __future__ import annotations
 
+import hashlib
+import json
+import os
 import statistics
-from collections.abc import Mapping
+from collections.abc import Callable, Iterable, Iterator, Mapping, Sequence
 from dataclasses import dataclass
 from datetime import datetime
-from typing import cast
+from typing import Any, cast
 
 from diving import hypertext, information, locations
 from diving.hypertext import Side, Where
-from diving.util import collection, static, taxonomy
+from diving.util import collection, compress, fingerprint, log, static, taxonomy
 from diving.util.common import (
     Tree,
     extract_leaves,
@@ -21,17 +24,79 @@ from diving.util.common import (
     titlecase,
     tree_size,
 )
+from diving.util.fingerprint import fingerprints
 from diving.util.image import Image
 from diving.util.metrics import metrics
 from diving.util.similarity import similarity
+from diving.util.sitemap import sitemap
+from diving.util.template import Template
 
 # Similar species configuration
 SIMILAR_SPECIES_COUNT = 4
 SIMILAR_SPECIES_THRESHOLD = 0.75  # Excludes weaker order-level matches
 
+# Pages with more images than this inline the first PAGE_IMAGES, the rest are
+# loaded in chunks of the same size as the visitor scrolls
+PAGE_LIMIT = 120
+PAGE_IMAGES = 60
+# ... which are under here, along with a page of every image for each
+MORE_ROOT = 'more'
+
 # Type alias for precomputed similar species
 SimilarSpeciesMap = dict[str, list[tuple[str, float]]]
 
+_SIMILAR_CARD = Template(
+    """\
+    <div class="card">
+      <a href="{link}">
+        <div class="zoom-wrapper">
+          <img class="zoom" height=150 width=200 alt="{name}" src="{thumbnail}">
+        </div>
+        <h4 class="similar">{display_name}</h4>
+      </a>
+    </div>
+    """
+)
+
+_CATEGORY_CARD = Template(
+    """\
+    <div class="card">
+    <a href="{link}">
+        <div class="zoom-wrapper">
+          <img class="zoom" height=225 width=300 alt="{alt}" src="{thumbnail}">
+        </div>
+        <h3 class="label-row">
+          <span> </span>
+          <span>{subject}</span>
+          <span class="count">{hint}</span>
+        </h3>
+    </a>
+    </div>
+    """
+)
+
+_MORE = Template(
+    """\
+    <a class="more" href="/{fallback}" data-chunks="{chunks}">All {count} images</a>
+    <script src="/{more_js}" defer></script>
+    """
+).partial(more_js=static.more_js.path)
+
+_FOOTER = Template(
+    """\
+    {info}
+    {similar_html}
+    </div>
+    <footer>
+      <p><a href="https://goto.anardil.net">goto.anardil.net</a></p>
+      <p>austin@anardil.net {year}</p>
+    </footer>
+    {scripts}
+    </body>
+    </html>
+    """
+).partial(scripts=hypertext.scripts)
+
 
 @dataclass
 class SimilarSpeciesContext:
@@ -88,9 +153,11 @@ def html_similar_species(
     if not similar:
         return ''
 
-    html = '<div class="similar-species">'
-    html += '<p class="similar-header"><b>Similar Species</b></p>'
-    html += '<div class="grid similar-grid">'
+    cards = [
+        '<div class="similar-species">',
+        '<p class="similar-header"><b>Similar Species</b></p>',
+        '<div class="grid similar-grid">',
+    ]
 
     for other_name, _ in similar:
         # Find images for this species
@@ -119,19 +186,17 @@ def html_similar_species(
             link = f'/gallery/{sanitize_link(example.normalized())}'
             display_name = titlecase(other_name)
 
-        html += f"""
-        <div class="card">
-          <a href="{link}">
-            <div class="zoom-wrapper">
-              <img class="zoom" height=150 width=200 alt="{other_name}" src="{example.thumbnail()}">
-            </div>
-            <h4 class="similar">{display_name}</h4>
-          </a>
-        </div>
-        """
+        cards.append(
+            _SIMILAR_CARD.render(
+                link=link,
+                name=other_name,
+                thumbnail=example.thumbnail(),
+                display_name=display_name,
+            )
+        )
 
-    html += '</div></div>'
-    return html
+    cards.append('</div></div>')
+    return ''.join(cards)
 
 
 def _prefer_single_subject(images: list[Image], pick_middle: bool = False) -> Image:
@@ -188,7 +253,7 @@ def get_gallery_info(direct: list[Image]) -> str:
         metrics.counter('lineages with depth distribution')
         parts.append(f"{low}' ~ {high}'")
 
-    regions = sorted({locations.get_region(image.site()) for image in direct})
+    regions = sorted({image.dive.region for image in direct})
     parts.append(', '.join(regions))
 
     distribution = ' '.join(parts)
@@ -229,24 +294,181 @@ def _key_to_subject(key: str, where: Where) -> str:
     return taxonomy.simplify(key, shorten=True)
 
 
-def html_direct_examples(direct: list[Image], where: Where) -> str:
-    """Generate the HTML for the direct examples of a tree."""
+def html_direct_examples(direct: list[Image], more: str = '') -> str:
+    """Generate the HTML for the direct examples of a tree.
+
+    more is placed at the end of the grid, after the images.
+    """
     seen = set()
     unique_count = len({img.identifier() for img in direct})
     grid_class = 'grid grid-compact' if unique_count <= 9 else 'grid'
-    html = f'<div class="{grid_class}">'
+    parts = [f'<div class="{grid_class}">']
 
     for i, image in enumerate(direct):
         identifier = image.identifier()
         if identifier in seen:
             # This prevents 'b fish and b fish eggs' showing up twice on taxonomy pages
             continue
-        html += hypertext.html_direct_image(image, where, i > 16)
+        parts.append(hypertext.html_direct_image(image, i > 16))
         seen.add(identifier)
 
-    html += '</div>'
+    parts.append(more)
+    parts.append('</div>')
+
+    return ''.join(parts)
+
+
+def html_paged_examples(
+    path: str, direct: list[Image], fallback: str
+) -> tuple[str, list[tuple[str, str]]]:
+    """The first images of a heavy page, and the pages that go with it.
+
+    The rest of the images are in JSON chunks for more.js to load, and the
+    fallback page with every image is for crawlers and anything else without
+    javascript. Those are returned to be written along with the page.
+    """
+    unique = _unique(direct)
+    *chunk_paths, fallback_path = paged_paths(path, direct)
+
+    pages = []
+    for chunk_path, start in zip(chunk_paths, range(PAGE_IMAGES, len(unique), PAGE_IMAGES)):
+        images = unique[start : start + PAGE_IMAGES]
+        body = json.dumps([hypertext.html_direct_image(image, True) for image in images])
+        pages.append((chunk_path, body))
+    pages.append((fallback_path, fallback))
+
+    more = _MORE.render(
+        fallback=fallback_path,
+        chunks=' '.join(f'/{chunk}' for chunk in chunk_paths),
+        count=str(len(unique)),
+    )
+    return html_direct_examples(unique[:PAGE_IMAGES], more), pages
+
+
+def paged_paths(path: str, direct: list[Image]) -> list[str]:
+    """The chunks of a heavy page, then its fallback page.
+
+    Chunks are named by the page's fingerprint, so they change whenever the
+    page does and can be listed without rendering them again.
+    """
+    unique = _unique(direct)
+    folder = os.path.join(MORE_ROOT, path.removesuffix('.html'))
+    version = fingerprints.current[path][:10]
+
+    starts = range(PAGE_IMAGES, len(unique), PAGE_IMAGES)
+    paths = [os.path.join(folder, f'{version}-{i}.json') for i in range(1, len(starts) + 1)]
+    paths.append(os.path.join(folder, 'all.html'))
+
+    os.makedirs(folder, exist_ok=True)
+    return paths
+
+
+def is_paged(path: str) -> bool:
+    """Is this a chunk or fallback page of a heavy page, rather than a page?"""
+    return path.startswith(MORE_ROOT + '/')
+
+
+def sweep_paged(paths: Iterable[str]) -> None:
+    """Remove the chunks and fallback pages that weren't produced this build.
+
+    That's older chunks of pages that changed, and everything for pages that
+    are no longer heavy or no longer exist. Their compressed siblings go too.
+    """
+    keep = set(paths)
+    for folder, _, names in os.walk(MORE_ROOT, topdown=False):
+        for name in names:
+            path = os.path.join(folder, name)
+            if path in keep or name.endswith(('.gz', '.br')):
+                continue
+
+            metrics.counter('gallery chunks deleted')
+            os.remove(path)
+            compress.remove(path)
+
+        if not os.listdir(folder):
+            os.rmdir(folder)
+
+
+def _page_inputs(
+    tree: collection.ImageTree | collection.FrozenImageTree,
+    where: Where,
+    lineage: list[str],
+    direct: list[Image],
+    similar_ctx: SimilarSpeciesContext | None,
+    search_data: str,
+) -> list[Any]:
+    """everything a page is rendered from, found without rendering any of it
+
+    the names, taxonomy and locations are data files, which are part of every
+    fingerprint already
+    """
+    assets = [resource.path for resource in (static.stylesheet, static.search_js, static.video_js)]
+    inputs: list[Any] = [
+        where.name,
+        lineage,
+        search_data,
+        assets,
+        datetime.now().year,
+        _tree_digest(tree),
+        # the dive info in sites titles and the depths in gallery info
+        sorted({log.digest(image.directory) for image in direct}),
+    ]
+
+    if where == Where.Taxonomy:
+        inputs.append([information.stamp(name) for name in information.lineage_to_names(lineage)])
+
+    if where == Where.Sites and lineage and not is_date(' '.join(lineage).split(' ')[-1]):
+        inputs.append(locations.find_year_range(lineage))
+
+    if direct and lineage and similar_ctx:
+        similar = similar_ctx.similar_map.get(direct[0].simplified()) or []
+        inputs.append(
+            [(name, _images_digest(similar_ctx.flat_tree.get(name, ()))) for name, _ in similar]
+        )
+
+    return inputs
+
+
+def _tree_digest(tree: collection.ImageTree | collection.FrozenImageTree) -> str:
+    """the images of a tree and all its subtrees, each subtree only read once"""
+    return _remembered(
+        tree,
+        lambda: [
+            fingerprint.images(cast(list[Image], tree.get('data', []))),
+            *(
+                (key, _tree_digest(cast(collection.ImageTree, value)))
+                for key, value in tree.items()
+                if key != 'data'
+            ),
+        ],
+    )
+
+
+def _images_digest(images: Sequence[Image]) -> str:
+    return _remembered(images, lambda: fingerprint.images(images))
+
 
-    return html
+def _remembered(value: object, inputs: Callable[[], Any]) -> str:
+    """a hash of inputs, worked out once per value; trees don't change during a build"""
+    seen = _digests.get(id(value))
+    if seen and seen[0] is value:
+        return seen[1]
+
+    digest = hashlib.md5(repr(inputs()).encode('utf-8')).hexdigest()
+    # holding on to the value keeps its id from being reused
+    _digests[id(value)] = (value, digest)
+    return digest
+
+
+_digests: dict[int, tuple[object, str]] = {}
+
+
+def _unique(direct: list[Image]) -> list[Image]:
+    """the first image for each identifier"""
+    seen: dict[str, Image] = {}
+    for image in direct:
+        seen.setdefault(image.identifier(), image)
+    return list(seen.values())
 
 
 def _render_category_card(
@@ -264,20 +486,9 @@ def _render_category_card(
     alt = example.simplified()
     link = f'/{where.name.lower()}/{hypertext.lineage_to_link(lineage, side, key)}'
     thumbnail = example.thumbnail()
-    return f"""
-        <div class="card">
-        <a href="{link}">
-            <div class="zoom-wrapper">
-              <img class="zoom" height=225 width=300 alt="{alt}" src="{thumbnail}">
-            </div>
-            <h3 class="label-row">
-              <span> </span>
-              <span>{subject}</span>
-              <span class="count">{hint}</span>
-            </h3>
-        </a>
-        </div>
-        """
+    return _CATEGORY_CARD.render(
+        link=link, alt=alt, thumbnail=thumbnail, subject=subject, hint=hint
+    )
 
 
 def _get_similar_species_html(
@@ -303,18 +514,7 @@ def _get_similar_species_html(
 def _page_footer(info: str, similar_html: str) -> str:
     """Generate the page footer HTML."""
     now = datetime.now()
-    return f"""
-      {info}
-      {similar_html}
-      </div>
-      <footer>
-        <p><a href="https://goto.anardil.net">goto.anardil.net</a></p>
-        <p>austin@anardil.net {now.year}</p>
-      </footer>
-      {hypertext.scripts}
-    </body>
-    </html>
-    """
+    return _FOOTER.render(info=info, similar_html=similar_html, year=str(now.year))
 
 
 def _process_category(
@@ -325,9 +525,9 @@ def _process_category(
     side: Side,
     scientific: Mapping[str, str],
     similar_ctx: SimilarSpeciesContext | None,
-) -> tuple[str, list[tuple[str, str]]]:
-    """Process a single category and return (html, child_results)."""
-    new_lineage = [key] + lineage if side == Side.Left else lineage + [key]
+) -> str:
+    """Render the card linking to a single category."""
+    new_lineage = child_lineage(lineage, key, where)
     example = find_representative(value, where, new_lineage)
     assert example.is_image
     subject = _key_to_subject(key, where)
@@ -335,12 +535,24 @@ def _process_category(
     size = tree_size(value)
     subcategories = sum(1 for k in value if k != 'data')
 
-    card_html = _render_category_card(
-        example, subject, where, lineage, side, key, size, subcategories
-    )
+    return _render_category_card(example, subject, where, lineage, side, key, size, subcategories)
+
+
+def children(
+    tree: collection.ImageTree | collection.FrozenImageTree, where: Where
+) -> list[tuple[str, collection.ImageTree]]:
+    """The subtrees of this tree, in page order."""
+    flip = where == Where.Sites and any(is_date(v) for v in tree)
+    return [
+        (key, cast(collection.ImageTree, value))
+        for key, value in sorted(tree.items(), reverse=flip)
+        if key != 'data'
+    ]
+
 
-    child_results = html_tree(value, where, scientific, new_lineage, similar_ctx)
-    return card_html, child_results
+def child_lineage(lineage: list[str], key: str, where: Where) -> list[str]:
+    """The lineage of a subtree, gallery names read right to left."""
+    return [key] + lineage if where == Where.Gallery else lineage + [key]
 
 
 def html_tree(
@@ -349,46 +561,76 @@ def html_tree(
     scientific: Mapping[str, str],
     lineage: list[str] | None = None,
     similar_ctx: SimilarSpeciesContext | None = None,
-) -> list[tuple[str, str]]:
-    """Generate HTML pages for a tree structure."""
+    descend: bool = True,
+    search_data: str = static.search_data_path,
+) -> Iterator[tuple[str, str | None]]:
+    """Generate HTML pages for a tree structure.
+
+    Pages are yielded as they're finished, children before their parent, so
+    only the pages along the current lineage are held in memory. Without
+    descend, only the page for this tree itself is produced. Pages that are
+    unchanged since the last build are yielded without html, and without
+    rendering any of it. A heavy page is preceded by its chunks and fallback
+    page. The top page loads search_data.
+    """
     lineage = lineage or []
     assert similar_ctx is None or where in (Where.Gallery, Where.Taxonomy)
     side = Side.Left if where == Where.Gallery else Side.Right
 
-    html, path = hypertext.title(lineage, where, scientific)
+    path = hypertext.title_path(lineage, where, scientific)
+
+    direct = cast(list[Image], tree.get('data', []))
+    chronological = where != Where.Sites
+    direct = sorted(direct, key=lambda x: x.path(), reverse=chronological)
+    sitemap.add(path, direct)
 
-    results = []
+    unchanged = fingerprints.unchanged(
+        path, *_page_inputs(tree, where, lineage, direct, similar_ctx, search_data)
+    )
+
+    parts = []
     subcategory_count = sum(1 for key in tree.keys() if key != 'data')
     has_subcategories = subcategory_count > 0
     if has_subcategories:
         grid_class = 'grid grid-compact' if subcategory_count <= 9 else 'grid'
-        html += f'<div class="{grid_class}">'
-
-    flip = where == Where.Sites and any(is_date(v) for v in tree.keys())
-    for key, value in sorted(tree.items(), reverse=flip):
-        if key == 'data':
-            continue
-        value = cast(collection.ImageTree, value)
-        card_html, child_results = _process_category(
-            key, value, where, lineage, side, scientific, similar_ctx
-        )
-        html += card_html
-        results.extend(child_results)
+        parts.append(f'<div class="{grid_class}">')
+
+    for key, value in children(tree, where):
+        if not unchanged:
+            parts.append(
+                _process_category(key, value, where, lineage, side, scientific, similar_ctx)
+            )
+        if descend:
+            new_lineage = child_lineage(lineage, key, where)
+            yield from html_tree(value, where, scientific, new_lineage, similar_ctx)
+
+    paged = len(_unique(direct)) > PAGE_LIMIT
+    if unchanged:
+        if paged:
+            for extra in paged_paths(path, direct):
+                yield extra, None
+        yield path, None
+        return
 
     if has_subcategories:
-        html += '</div>'
+        parts.append('</div>')
 
-    direct = cast(list[Image], tree.get('data', []))
-    chronological = where != Where.Sites
-    direct = sorted(direct, key=lambda x: x.path(), reverse=chronological)
     assert not (direct and has_subcategories)
-
-    if direct:
-        html += html_direct_examples(direct, where)
+    html, _ = hypertext.title(lineage, where, scientific, search_data)
+    parts.insert(0, html)
 
     info = get_info(where, lineage, direct)
     similar_html = _get_similar_species_html(direct, lineage, similar_ctx, where)
-    html += _page_footer(info, similar_html)
+    footer = _page_footer(info, similar_html)
+
+    if paged:
+        fallback = ''.join([*parts, html_direct_examples(direct), footer])
+        examples, extras = html_paged_examples(path, direct, fallback)
+        yield from extras
+        parts.append(examples)
+    elif direct:
+        parts.append(html_direct_examples(direct))
+
+    parts.append(footer)
 
-    results.append((path, html))
-    return results
+    yield path, ''.join(parts)
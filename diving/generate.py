@@ -4,20 +4,57 @@ Coordinates building all sections (gallery, sites, taxonomy, timeline, detective
 and writing HTML output.
 """
 
-import textwrap
-from concurrent.futures import ThreadPoolExecutor
+from __future__ import annotations
+
+import gc
+import multiprocessing
+import threading
+from collections.abc import Iterable, Iterator, Mapping
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Self, TypeAlias, cast
 
 from diving import detective, imprecise, locations, search, stats, timeline
-from diving.gallery import SimilarSpeciesContext, build_similar_species_map, html_tree
+from diving.gallery import (
+    SimilarSpeciesContext,
+    build_similar_species_map,
+    child_lineage,
+    children,
+    html_tree,
+    is_paged,
+    sweep_paged,
+)
 from diving.hypertext import Where
-from diving.util import collection, resource, taxonomy
-from diving.util.common import Progress, file_content_matches, tree_size
+from diving.util import collection, compress, database, log, resource, taxonomy
+from diving.util.common import Progress, tree_size
+from diving.util.fingerprint import fingerprints
+from diving.util.links import links
+from diving.util.manifest import Entry, manifest
 from diving.util.metrics import metrics
+from diving.util.sitemap import sitemap
+
+# a tree to render, with the names and similar species used to render it
+Section: TypeAlias = (
+    'tuple[collection.ImageTree | collection.FrozenImageTree, Mapping[str, str], '
+    'SimilarSpeciesContext | None]'
+)
+
+# a subtree, named by the keys that lead to it from the root of its section
+Task = tuple[Where, tuple[str, ...]]
 
+# inherited by forked workers rather than sent to them
+_sections: dict[Where, Section] = {}
 
-def main() -> None:
-    """Generate the complete diving website."""
+
+def main(jobs: int = 1, compressed: bool = False) -> None:
+    """Generate the complete diving website.
+
+    With compressed, gzip and brotli siblings are written alongside the pages
+    and versioned resources for the web server to serve directly.
+    """
     with Progress('loading images'):
+        fingerprints.load()
+        manifest.load()
+        links.load()
         tree = collection.build_image_tree()
         scientific = taxonomy.mapping()
         taxia = taxonomy.gallery_tree(tree)
@@ -32,58 +69,303 @@ def main() -> None:
             scientific_for_links=scientific,
         )
 
-    with Progress('building /gallery'):
-        name_htmls = html_tree(tree, Where.Gallery, scientific, similar_ctx=similar_ctx)
+        scientific_reversed = {v: k for k, v in scientific.items()}
+        sections: dict[Where, Section] = {
+            Where.Gallery: (tree, scientific, similar_ctx),
+            Where.Sites: (locations.sites(), scientific, None),
+            Where.Taxonomy: (taxia, scientific_reversed, similar_ctx),
+        }
+
+    with PageWriter() as writer:
+        if jobs > 1:
+            with Progress('building trees'):
+                paths = _render_forked(sections, writer, jobs)
+        else:
+            paths = {}
+            for where, (root, names, context) in sections.items():
+                with Progress(f'building /{where.name.lower()}'):
+                    paths[where] = writer.write(_below_top(root, where, names, context))
 
-    with Progress('building /sites'):
-        sites = locations.sites()
-        sites_htmls = html_tree(sites, Where.Sites, scientific)
+        # the chunks and fallbacks of heavy pages are written, but aren't pages
+        paged = [path for section in paths.values() for path in section if is_paged(path)]
+        paths = {
+            where: [path for path in section if not is_paged(path)]
+            for where, section in paths.items()
+        }
 
-    with Progress('building /taxonomy'):
-        scientific_reversed = {v: k for k, v in scientific.items()}
-        taxia_htmls = html_tree(taxia, Where.Taxonomy, scientific_reversed, similar_ctx=similar_ctx)
+        # the top pages load the search data, which needs every other page
+        with Progress('building search'):
+            search_data, searches = search.write_search_data(
+                paths[Where.Gallery], paths[Where.Sites], paths[Where.Taxonomy]
+            )
 
-    with Progress('building /timeline'):
-        times_htmls = timeline.timeline()
+            for where, (root, names, context) in sections.items():
+                top = html_tree(
+                    root,
+                    where,
+                    names,
+                    similar_ctx=context,
+                    descend=False,
+                    search_data=search_data,
+                )
+                paths[where] += writer.write(top)
 
-    with Progress('building /detective'):
-        detective.writer()
+        with Progress('building /timeline'):
+            times_paths = writer.write(timeline.timeline())
 
-    with Progress('building /stats'):
-        stats.writer()
+        with Progress('building /detective'):
+            detective.writer()
 
-    metrics.counter('images loaded', tree_size(tree))
-    metrics.counter('pages in gallery', len(name_htmls))
-    metrics.counter('pages in sites', len(sites_htmls))
-    metrics.counter('pages in taxonomy', len(taxia_htmls))
-    metrics.counter('pages in timeline', len(times_htmls))
-    metrics.counter('imprecise labels', imprecise.total_imprecise())
+        with Progress('building /stats'):
+            stats.writer()
 
-    for vr in resource.registry:
-        vr.cleanup()
-        vr.write()
+        metrics.counter('images loaded', tree_size(tree))
+        metrics.counter('pages in gallery', len(paths[Where.Gallery]))
+        metrics.counter('pages in sites', len(paths[Where.Sites]))
+        metrics.counter('pages in taxonomy', len(paths[Where.Taxonomy]))
+        metrics.counter('pages in timeline', len(times_paths))
+        metrics.counter('imprecise labels', imprecise.total_imprecise())
 
-    with Progress('writing html'), ThreadPoolExecutor() as pool:
-        all_htmls = name_htmls + sites_htmls + taxia_htmls + times_htmls
-        list(pool.map(_pool_writer, all_htmls))
+        for vr in resource.registry:
+            vr.cleanup()
+            vr.write()
+
+        with Progress('writing html'):
+            writer.wait()
+            fingerprints.save()
+            links.save()
+            manifest.save(
+                path for section in (*paths.values(), times_paths, paged) for path in section
+            )
+            sweep_paged(paged)
+
+        with Progress('writing sitemap'):
+            sitemap.write()
+
+    with Progress('compressing'):
+        outputs = [path for section in (*paths.values(), times_paths) for path in section]
+        outputs += paged
+        outputs += ['detective/index.html', 'stats/index.html']
+        outputs += [vr.path for vr in resource.registry]
+        outputs += searches
+        compress.outputs(outputs, compressed)
 
-    search.write_search_data(
-        _get_paths(name_htmls), _get_paths(sites_htmls), _get_paths(taxia_htmls)
-    )
+
+class PageWriter:
+    """Write pages on a thread pool while later pages are still rendering.
+
+    At most `pending` pages wait in memory to be written, beyond that the
+    renderer blocks until the writers catch up. Only the paths are kept.
+    """
+
+    def __init__(self, pending: int = 256) -> None:
+        self.pool = ThreadPoolExecutor()
+        self.slots = threading.BoundedSemaphore(pending)
+        self.failures: list[BaseException] = []
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.pool.shutdown(wait=True)
+
+    def write(self, pages: Iterable[tuple[str, str | None]]) -> list[str]:
+        """queue each page as it's produced, returning the paths
+
+        pages without html are unchanged and already on disk
+        """
+        paths = []
+        for path, html in pages:
+            paths.append(path)
+            links.add(path, html)
+            if html is None:
+                continue
+
+            self.slots.acquire()
+            self.pool.submit(_pool_writer, (path, html)).add_done_callback(self._done)
+        return paths
+
+    def wait(self) -> None:
+        """block until everything queued is on disk"""
+        self.pool.shutdown(wait=True)
+        if self.failures:
+            raise self.failures[0]
+
+    def _done(self, future: Future[None]) -> None:
+        self.slots.release()
+        error = future.exception()
+        if error:
+            self.failures.append(error)
 
 
 def _pool_writer(args: tuple[str, str]) -> None:
     """Callback for HTML writer pool."""
     path, html = args
-    html = textwrap.dedent(html)
+    manifest.write(path, html)
+
+
+def _render_forked(
+    sections: dict[Where, Section], writer: PageWriter, jobs: int
+) -> dict[Where, list[str]]:
+    """Render everything but the top pages across forked worker processes.
 
-    if file_content_matches(path, html):
+    Each section is split into a few subtrees per worker, always splitting the
+    largest. Workers render and write the subtrees, sending back only the
+    paths, their metrics and what they wrote. The pages above the splits are
+    rendered here in the meantime.
+    """
+    _sections.update(sections)
+
+    # anything loaded lazily during rendering is worth loading once up front,
+    # rather than once in every worker
+    log.all_photo_dives()
+    collection.all_valid_names()
+
+    splits = {where: _partition(where, jobs * 4) for where in sections}
+    tasks = [(where, keys) for where, (_, leaves) in splits.items() for keys in leaves]
+    tasks.sort(key=lambda task: tree_size(_subtree(*task)[0]), reverse=True)
+
+    # the workers share the parent's memory until they write to it, which
+    # includes the garbage collector's bookkeeping
+    gc.freeze()
+    try:
+        context = multiprocessing.get_context('fork')
+        with ProcessPoolExecutor(jobs, mp_context=context, initializer=_worker_init) as pool:
+            results = pool.map(_render_subtree, tasks)
+
+            upper: dict[Task, str] = {}
+            for where, (expanded, _) in splits.items():
+                for keys in expanded[1:]:
+                    root, lineage = _subtree(where, keys)
+                    _, names, context_ = sections[where]
+                    pages = html_tree(root, where, names, lineage, context_, descend=False)
+                    (upper[where, keys],) = writer.write(pages)
+
+            lower: dict[Task, list[str]] = {}
+            for task, (paths, recorded, fingerprinted, written, pages, linked) in zip(
+                tasks, results
+            ):
+                lower[task] = paths
+                metrics.merge(recorded)
+                fingerprints.merge(fingerprinted)
+                manifest.merge(written)
+                sitemap.merge(pages)
+                links.merge(linked)
+
+        return {
+            where: [
+                path
+                for key, _ in children(_subtree(where, ())[0], where)
+                for path in _page_order((where, (key,)), upper, lower)
+            ]
+            for where in sections
+        }
+    finally:
+        gc.unfreeze()
+        _sections.clear()
+
+
+def _below_top(
+    root: collection.ImageTree | collection.FrozenImageTree,
+    where: Where,
+    names: Mapping[str, str],
+    context: SimilarSpeciesContext | None,
+) -> Iterator[tuple[str, str | None]]:
+    """every page in a section but the top one"""
+    for key, value in children(root, where):
+        yield from html_tree(value, where, names, child_lineage([], key, where), context)
+
+
+def _subtree(
+    where: Where, keys: tuple[str, ...]
+) -> tuple[collection.ImageTree | collection.FrozenImageTree, list[str]]:
+    """find a subtree and its lineage"""
+    tree, *_ = _sections[where]
+    lineage: list[str] = []
+    for key in keys:
+        tree = cast(collection.ImageTree, tree[key])
+        lineage = child_lineage(lineage, key, where)
+    return tree, lineage
+
+
+def _partition(where: Where, want: int) -> tuple[list[tuple[str, ...]], list[tuple[str, ...]]]:
+    """split a section until there are enough subtrees to go around
+
+    returns the keys of the trees that were split, starting with the root,
+    and of the subtrees
+    """
+    root = _subtree(where, ())[0]
+    expanded: list[tuple[str, ...]] = [()]
+    leaves: list[tuple[str, ...]] = [(key,) for key, _ in children(root, where)]
+    sizes: dict[tuple[str, ...], int] = {
+        (key,): tree_size(value) for key, value in children(root, where)
+    }
+
+    while len(leaves) < want:
+        splittable = [keys for keys in leaves if children(_subtree(where, keys)[0], where)]
+        if not splittable:
+            break
+
+        largest = max(splittable, key=sizes.__getitem__)
+        leaves.remove(largest)
+        expanded.append(largest)
+
+        for key, value in children(_subtree(where, largest)[0], where):
+            leaves.append(largest + (key,))
+            sizes[largest + (key,)] = tree_size(value)
+
+    return expanded, leaves
+
+
+def _page_order(task: Task, upper: dict[Task, str], lower: dict[Task, list[str]]) -> Iterator[str]:
+    """paths in the same order that html_tree produces them"""
+    if task in lower:
+        yield from lower[task]
         return
 
-    with open(path, 'w+') as f:
-        print(html, file=f, end='')
+    where, keys = task
+    for key, _ in children(_subtree(where, keys)[0], where):
+        yield from _page_order((where, keys + (key,)), upper, lower)
+    yield upper[task]
+
+
+def _worker_init() -> None:
+    """drop state inherited from the parent that isn't ours"""
+    metrics.take()
+    fingerprints.take()
+    manifest.take()
+    sitemap.take()
+    links.take()
+    database.database.forked()
 
 
-def _get_paths(htmls: list[tuple[str, str]]) -> list[str]:
-    """Extract paths from html tuples."""
-    return [p for p, _ in htmls]
+def _render_subtree(
+    task: Task,
+) -> tuple[
+    list[str],
+    dict[str, Any],
+    dict[str, str],
+    dict[str, Entry],
+    dict[str, list[str]],
+    dict[str, list[str]],
+]:
+    """render and write all the pages of a subtree"""
+    where, keys = task
+    _, names, context = _sections[where]
+    tree, lineage = _subtree(where, keys)
+
+    paths = []
+    for path, html in html_tree(tree, where, names, lineage, context):
+        paths.append(path)
+        links.add(path, html)
+        if html is not None:
+            _pool_writer((path, html))
+
+    return (
+        paths,
+        metrics.take(),
+        fingerprints.take(),
+        manifest.take(),
+        sitemap.take(),
+        links.take(),
+    )
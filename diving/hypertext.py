@@ -23,12 +23,13 @@ from diving.util.common import (
 from diving.util.image import Image, categorize, split, uncategorize
 from diving.util.metrics import metrics
 from diving.util.static import search_data_path, search_js, stylesheet, video_js
+from diving.util.template import Template, chunk
 
 Where = enum.Enum('Where', 'Gallery Taxonomy Sites Timeline Detective Stats')
 Side = enum.Enum('Side', 'Left Right')
 
 
-scripts = (
+scripts = chunk(
     """
     <!-- fancybox is excellent, this project is not commercial -->
     <link rel="stylesheet" href="/jquery.fancybox.min.css"/>
@@ -92,23 +93,145 @@ scripts = (
 
 blurb = 'Explore high quality scuba diving pictures'
 
+_HEAD = Template(
+    """\
+    <!DOCTYPE html>
+    <html lang="en">
+      <head>
+        <title>{display}</title>
+        <link rel="canonical" href="{canonical}"/>
+        <meta charset="UTF-8">
+        <meta name="viewport" content="width=device-width, initial-scale=1">
+        <meta name=description content="{desc}">
+        <link rel="stylesheet" href="/{stylesheet}"/>
+      </head>
+      <body>
+      <div class="wrapper">
+      <div class="title">
+    """
+).partial(stylesheet=stylesheet.path)
 
-def title(lineage: list[str], where: Where, scientific: Mapping[str, Any]) -> tuple[str, str]:
-    """html head and target path"""
-    if not lineage:
-        impl: type[Title] = TopTitle
-    else:
-        assert lineage
-        impl = {
-            Where.Gallery: GalleryTitle,
-            Where.Taxonomy: TaxonomyTitle,
-            Where.Sites: SitesTitle,
-        }[where]
-
-    html, path = impl(where, lineage, scientific).run()
+_PILL = Template(
+    """\
+    <a href="{link}">
+        <h1 class="nav-pill">{name}</h1>
+    </a>
+    """
+)
+
+_DIRECT_IMAGE = Template(
+    """\
+    <a class="thumb" data-fancybox="gallery" data-caption="{caption}" href="{fullsize}">
+        <img class="zoom" height=225 width=300 {lazy_load} alt="{name}" src="{thumbnail}">
+    </a>
+    """
+)
+
+_GALLERY_PILLS = chunk(
+    """\
+    <div class="nav-pill spacer"></div>
+
+    <a href="/gallery/">
+        <h1 class="nav-pill active gallery">Gallery</h1>
+    </a>
+    """
+)
+
+_TAXONOMY_PILLS = chunk(
+    """\
+    <a href="/taxonomy/">
+        <h1 class="nav-pill active taxonomy">Taxonomy</h1>
+    </a>
+    <div class="nav-pill spacer"></div>
+    """
+)
+
+_SITES_PILLS = chunk(
+    """\
+    <a href="/sites/">
+        <h1 class="nav-pill active sites">Sites</h1>
+    </a>
+    <div class="nav-pill spacer"></div>
+    """
+)
+
+_SCIENTIFIC_LINK = Template(
+    """\
+    <a href="/{where}/{link}" class="scientific crosslink">{name}</a>
+    """
+)
+
+_SCIENTIFIC = Template(
+    """\
+    <p class="scientific">{name}</p>
+    """
+)
+
+_SWITCHER = Template(
+    """\
+    <a href="/{path}/">
+        <h1 class="nav-pill active{extra_class}">{name}</h1>
+    </a>
+    """
+)
+
+_SEARCH = Template(
+    """\
+    <div class="search">
+        <form class="search-random" action="javascript:;" onsubmit="randomPage()">
+            <button type="submit">Random</button>
+        </form>
+        <form class="search-text" autocomplete="off" action="javascript:;" onsubmit="searcher()">
+            <input type="text" id="search-bar" placeholder="">
+            <button type="submit">Search</button>
+        </form>
+    </div>
+    <div id="search-results" class="search-results">
+
+    <script src="/{search_data_path}" defer></script>
+    <script src="/{search_js}" defer></script>
+    </div>
+    """
+).partial(search_js=search_js.path)
+
+_CLOSE = chunk('</div>\n')
+
+# disableRemotePlayback is to stop Android from suggesting a cast
+# playsinline is get iOS to play the video at all
+_DIRECT_VIDEO = Template(
+    """\
+    <a class="thumb" aria-label="{name} video" data-fancybox="gallery" data-caption="{caption}" href="#{unique}">
+        <video class="video" height=225 width=300
+          disableRemotePlayback preload playsinline muted loop>
+            <source src="{thumbnail}" type="video/mp4">
+        </video>
+    </a>
+    <video controls muted preload="none" id="{unique}" style="display:none;">
+        <source src="{fullsize}" type="video/mp4">
+    </video>
+    """
+)
+
+
+def title(
+    lineage: list[str],
+    where: Where,
+    scientific: Mapping[str, Any],
+    search_data: str = search_data_path,
+) -> tuple[str, str]:
+    """html head and target path
+
+    top pages load search_data, the versioned path of the search data
+    """
+    html, path = _title(lineage, where, scientific, search_data).run()
     return html, path + '.html'
 
 
+def title_path(lineage: list[str], where: Where, scientific: Mapping[str, Any]) -> str:
+    """the target path of title, without rendering anything"""
+    return _title(lineage, where, scientific).path() + '.html'
+
+
 def head(display: str, path: str, where: Where) -> str:
     """top of the document"""
     if display.endswith('Gallery'):
@@ -137,21 +260,7 @@ def head(display: str, path: str, where: Where) -> str:
     path = path.replace('index', '')
     canonical = f'https://diving.anardil.net/{path}'
 
-    return f"""
-    <!DOCTYPE html>
-    <html lang="en">
-      <head>
-        <title>{display}</title>
-        <link rel="canonical" href="{canonical}"/>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1">
-        <meta name=description content="{desc}">
-        <link rel="stylesheet" href="/{stylesheet.path}"/>
-      </head>
-      <body>
-      <div class="wrapper">
-      <div class="title">
-      """
+    return _HEAD.render(display=display, canonical=canonical, desc=desc)
 
 
 def _description_sites(title: str) -> str:
@@ -213,57 +322,84 @@ def lineage_to_link(lineage: list[str], side: Side, key: str | None = None) -> s
     return sanitize_link(name)
 
 
-def html_direct_image(image: Image, where: Where, lazy: bool) -> str:
-    if image.is_image:
-        return _direct_image_html(image, where, lazy)
+def html_direct_image(image: Image, lazy: bool) -> str:
+    """the thumbnail and caption for an image, the same in every section"""
+    key = (image.identifier(), image.name, lazy and image.is_image)
+    fragment = _fragments.get(key)
+
+    if fragment is None:
+        if image.is_image:
+            fragment = _direct_image_html(image, lazy)
+        else:
+            fragment = _direct_video_html(image)
+        _fragments[key] = fragment
     else:
-        return _direct_video_html(image, where)
+        metrics.counter('html direct fragments reused')
+
+    return fragment
 
 
 # PRIVATE
 
 
-def _direct_image_html(image: Image, where: Where, lazy: bool) -> str:
+def _title(
+    lineage: list[str],
+    where: Where,
+    scientific: Mapping[str, Any],
+    search_data: str = search_data_path,
+) -> 'Title':
+    if not lineage:
+        return TopTitle(where, lineage, scientific, search_data)
+
+    impl: type[Title] = {
+        Where.Gallery: GalleryTitle,
+        Where.Taxonomy: TaxonomyTitle,
+        Where.Sites: SitesTitle,
+    }[where]
+    return impl(where, lineage, scientific)
+
+
+# multiple subject images are split into one Image per subject, which share an
+# identifier but not a name
+_fragments: dict[tuple[str, str, bool], str] = {}
+
+
+def _direct_image_html(image: Image, lazy: bool) -> str:
     assert image.is_image
     metrics.counter('html direct images')
 
     lazy_load = 'loading="lazy"' if lazy else ''
     fullsize = image.fullsize()
     thumbnail = image.thumbnail()
-    caption = html_module.escape(_caption_html(image, where), quote=True)
+    caption = html_module.escape(_caption_html(image), quote=True)
 
-    return f"""
-    <a class="thumb" data-fancybox="gallery" data-caption="{caption}" href="{fullsize}">
-        <img class="zoom" height=225 width=300 {lazy_load} alt="{image.name}" src="{thumbnail}">
-    </a>
-    """
+    return _DIRECT_IMAGE.render(
+        caption=caption,
+        fullsize=fullsize,
+        lazy_load=lazy_load,
+        name=image.name,
+        thumbnail=thumbnail,
+    )
 
 
-def _direct_video_html(image: Image, where: Where) -> str:
+def _direct_video_html(image: Image) -> str:
     assert image.is_video
     metrics.counter('html direct videos')
 
     fullsize = image.fullsize()
     thumbnail = image.thumbnail()
-    caption = html_module.escape(_caption_html(image, where), quote=True)
+    caption = html_module.escape(_caption_html(image), quote=True)
 
     allowed = string.ascii_letters + string.digits
     unique = 'video_' + ''.join(c for c in image.identifier() if c in allowed)
 
-    # disableRemotePlayback is to stop Android from suggesting a cast
-    # playsinline is get iOS to play the video at all
-
-    return f"""
-    <a class="thumb" aria-label="{image.name} video" data-fancybox="gallery" data-caption="{caption}" href="#{unique}">
-        <video class="video" height=225 width=300
-          disableRemotePlayback preload playsinline muted loop>
-            <source src="{thumbnail}" type="video/mp4">
-        </video>
-    </a>
-    <video controls muted preload="none" id="{unique}" style="display:none;">
-        <source src="{fullsize}" type="video/mp4">
-    </video>
-    """
+    return _DIRECT_VIDEO.render(
+        name=image.name,
+        caption=caption,
+        unique=unique,
+        thumbnail=thumbnail,
+        fullsize=fullsize,
+    )
 
 
 def _image_to_gallery_link(image: Image) -> str | None:
@@ -283,11 +419,10 @@ def _image_to_gallery_link(image: Image) -> str | None:
 
 def _image_to_sites_link(image: Image) -> str:
     """get the /sites/ link"""
-    when, where = image.location().split(' ', 1)
-    return locations.sites_link(when, where)
+    return image.dive.sites_link
 
 
-def _caption_html(image: Image, where: Where) -> str:
+def _caption_html(image: Image) -> str:
     """Generate HTML caption for Fancybox with clickable links."""
     parts = []
 
@@ -301,16 +436,12 @@ def _caption_html(image: Image, where: Where) -> str:
 
     # Location - always show as site link (orange) with region
     site_url = _image_to_sites_link(image)
-    site_name = image.site()
-    region = locations.get_region(site_name)
-    site_with_region = f'{site_name}, {region}'
+    site_with_region = f'{image.dive.site}, {image.dive.region}'
     escaped_site = html_module.escape(site_with_region)
     parts.append(f'<a class="caption-site" href="{site_url}">{escaped_site}</a>')
 
     # Date - always show, use pretty_date (grey, non-clickable)
-    location = image.location()
-    date = location.split(' ', 1)[0]
-    parts.append(f'<span class="caption-date">{pretty_date(date)}</span>')
+    parts.append(f'<span class="caption-date">{image.dive.pretty_date}</span>')
 
     return ' '.join(parts)
 
@@ -327,34 +458,46 @@ class Title:
         """Produce html, path"""
         raise NotImplementedError
 
+    def path(self) -> str:
+        """Produce path"""
+        raise NotImplementedError
+
 
 class GalleryTitle(Title):
     """html head and title section for gallery pages"""
 
-    def run(self) -> tuple[str, str]:
-        side = Side.Left
-
-        # check for scientific name for gallery
+    def names(self) -> tuple[str, str, bool, list[str]]:
+        """scientific name, its link, if it ends with the common name, and the lineage shown"""
         slink = sname = taxonomy.gallery_scientific(self.lineage, self.scientific)
-        sname = taxonomy.simplify(sname)
         if slink.endswith(' sp.'):
             slink = slink.replace(' sp.', '')
 
         scientific_common_name = slink.lower().endswith(self.lineage[0].lower())
 
         if scientific_common_name:
-            self.lineage = [slink[-len(self.lineage[0]) :]] + [
-                titlecase(e) for e in self.lineage[1:]
-            ]
+            lineage = [slink[-len(self.lineage[0]) :]] + [titlecase(e) for e in self.lineage[1:]]
         else:
-            self.lineage = [titlecase(e) for e in self.lineage]
+            lineage = [titlecase(e) for e in self.lineage]
+
+        return sname, slink, scientific_common_name, lineage
+
+    def path(self) -> str:
+        *_, lineage = self.names()
+        return sanitize_link(f'gallery/{" ".join(lineage).lower()}')
+
+    def run(self) -> tuple[str, str]:
+        side = Side.Left
+
+        # check for scientific name for gallery
+        sname, slink, scientific_common_name, self.lineage = self.names()
+        sname = taxonomy.simplify(sname)
 
         _title = ' '.join(self.lineage)
         display = uncategorize(_title)
 
         slink = sanitize_link(slink)
         path = sanitize_link(f'gallery/{_title.lower()}')
-        html = head(display, path, Where.Gallery)
+        parts = [head(display, path, Where.Gallery)]
 
         # create the buttons for each part of our name lineage
         for i, name in enumerate(self.lineage):
@@ -363,34 +506,18 @@ class GalleryTitle(Title):
 
             partial = self.lineage[i:]
             _link = f'/gallery/{lineage_to_link(partial, side)}'.lower()
+            parts.append(_PILL.render(link=_link, name=name))
 
-            html += f"""
-            <a href="{_link}">
-                <h1 class="nav-pill">{name}</h1>
-            </a>
-            """
-
-        html += """
-            <div class="nav-pill spacer"></div>
-
-            <a href="/gallery/">
-                <h1 class="nav-pill active gallery">Gallery</h1>
-            </a>
-        """
+        parts.append(_GALLERY_PILLS)
 
         if slink:
-            html += f"""
-            <a href="/taxonomy/{slink}" class="scientific crosslink">{sname}</a>
-            </div>
-            """
+            parts.append(_SCIENTIFIC_LINK.render(where='taxonomy', link=slink, name=sname))
         else:
             metrics.counter('titles in gallery without taxonomy link')
-            html += f"""
-            <p class="scientific">{sname}</p>
-            </div>
-            """
+            parts.append(_SCIENTIFIC.render(name=sname))
+        parts.append(_CLOSE)
 
-        return html, path
+        return ''.join(parts), path
 
 
 class TaxonomyTitle(Title):
@@ -416,30 +543,21 @@ class TaxonomyTitle(Title):
         assert names, lineage
         return ' '.join(names)
 
+    def path(self) -> str:
+        return sanitize_link(f'taxonomy/{" ".join(self.lineage)}')
+
     def run(self) -> tuple[str, str]:
-        _title = ' '.join(self.lineage)
         side = Side.Right
-        path = sanitize_link(f'taxonomy/{_title}')
+        path = self.path()
 
-        html = head(' '.join(self.lineage[-2:]), path, Where.Taxonomy)
-        html += """
-            <a href="/taxonomy/">
-                <h1 class="nav-pill active taxonomy">Taxonomy</h1>
-            </a>
-            <div class="nav-pill spacer"></div>
-        """
+        parts = [head(' '.join(self.lineage[-2:]), path, Where.Taxonomy), _TAXONOMY_PILLS]
 
         # create the buttons for each part of our name lineage
         for i, name in enumerate(self.lineage):
             name = taxonomy.simplify(name)
             partial = self.lineage[: i + 1]
             link = f'/taxonomy/{lineage_to_link(partial, side)}'
-
-            html += f"""
-            <a href="{link}">
-                <h1 class="nav-pill">{name}</h1>
-            </a>
-            """
+            parts.append(_PILL.render(link=link, name=name))
 
         # check for common name for taxonomy
         name = ''
@@ -455,20 +573,14 @@ class TaxonomyTitle(Title):
         english = self.translate_lineage()
 
         if link:
-            html += f"""
-            <a href="/gallery/{link}" class="scientific crosslink">{name}</a>
-            <p class="scientific">{english}</p>
-            </div>
-            """
+            parts.append(_SCIENTIFIC_LINK.render(where='gallery', link=link, name=name))
         else:
             metrics.counter('titles in taxonomy without gallery link')
             assert not name, name
-            html += f"""
-            <p class="scientific">{english}</p>
-            </div>
-            """
+        parts.append(_SCIENTIFIC.render(name=english))
+        parts.append(_CLOSE)
 
-        return html, path
+        return ''.join(parts), path
 
 
 class SitesTitle(Title):
@@ -491,17 +603,14 @@ class SitesTitle(Title):
 
         return self.lineage[-2]
 
+    def path(self) -> str:
+        return sanitize_link(f'sites/{" ".join(self.lineage)}')
+
     def run(self) -> tuple[str, str]:
         _title = ' '.join(self.lineage)
-        path = sanitize_link(f'sites/{_title}')
-
-        html = head(_title, path, Where.Sites)
-        html += """
-            <a href="/sites/">
-                <h1 class="nav-pill active sites">Sites</h1>
-            </a>
-            <div class="nav-pill spacer"></div>
-        """
+        path = self.path()
+
+        parts = [head(_title, path, Where.Sites), _SITES_PILLS]
         dive_info = None
         site_info = None
         name = ''
@@ -521,25 +630,16 @@ class SitesTitle(Title):
 
             partial = self.lineage[: i + 1]
             link = f'/sites/{lineage_to_link(partial, Side.Right)}'
+            parts.append(_PILL.render(link=link, name=strip_date(_name)))
 
-            html += f"""
-            <a href="{link}">
-                <h1 class="nav-pill">{strip_date(_name)}</h1>
-            </a>
-            """
-
-        html += f"""\
-        <h3 class="center">{name}</h3>
-        """
+        parts.append(f'<h3 class="center">{name}</h3>\n')
         if dive_info:
-            html += log.dive_info_html(dive_info)
+            parts.append(log.dive_info_html(dive_info))
         if site_info:
-            html += site_info
-        html += """\
-        </div>
-        """
+            parts.append(site_info)
+        parts.append(_CLOSE)
 
-        return html, path
+        return ''.join(parts), path
 
 
 def switcher_button(where: Where, long: bool = False) -> str:
@@ -554,11 +654,7 @@ def switcher_button(where: Where, long: bool = False) -> str:
         Where.Stats: ' stats',
     }[where]
     path = where.name.lower()
-    return f"""
-        <a href="/{path}/">
-            <h1 class="nav-pill active{extra_class}">{name}</h1>
-        </a>
-    """
+    return _SWITCHER.render(path=path, extra_class=extra_class, name=name)
 
 
 def long_name(where: Where) -> str:
@@ -609,26 +705,24 @@ class TopTitle(Title):
     part of this is the switcher, which allows us to move between the sites
     """
 
+    def __init__(
+        self,
+        where: Where,
+        lineage: list[str],
+        scientific: Mapping[str, Any],
+        search_data: str = search_data_path,
+    ) -> None:
+        super().__init__(where, lineage, scientific)
+        self.search_data = search_data
+
     def sub_line(self) -> str:
         if self.where == Where.Timeline:
             return ''
 
-        return f"""
-        <div class="search">
-            <form class="search-random" action="javascript:;" onsubmit="randomPage()">
-                <button type="submit">Random</button>
-            </form>
-            <form class="search-text" autocomplete="off" action="javascript:;" onsubmit="searcher()">
-                <input type="text" id="search-bar" placeholder="">
-                <button type="submit">Search</button>
-            </form>
-        </div>
-        <div id="search-results" class="search-results">
-
-        <script src="/{search_data_path}" defer></script>
-        <script src="/{search_js.path}" defer></script>
-        </div>
-        """
+        return _SEARCH.render(search_data_path=self.search_data)
+
+    def path(self) -> str:
+        return sanitize_link(self.where.name.lower() + '/index')
 
     def run(self) -> tuple[str, str]:
         _title = titlecase(self.where.name)
@@ -637,14 +731,12 @@ class TopTitle(Title):
         if self.where == Where.Gallery:
             display = titlecase(display)
 
-        path = sanitize_link(self.where.name.lower() + '/index')
-
-        html = head(display, path, self.where)
-        html += navigation_carousel(self.where)
-        html += self.sub_line()
-
-        html += """
-        </div>
-        """
+        path = self.path()
 
-        return html, path
+        parts = [
+            head(display, path, self.where),
+            navigation_carousel(self.where),
+            self.sub_line(),
+            _CLOSE,
+        ]
+        return ''.join(parts), path
@@ -30,9 +30,9 @@ WORKFLOW:
 import operator
 import os
 from collections import Counter
+from collections.abc import Iterable
 
-from diving import locations
-from diving.util import collection, common, taxonomy
+from diving.util import collection, common, naming, taxonomy
 from diving.util.image import Image, split
 
 
@@ -41,20 +41,8 @@ def total_imprecise() -> int:
 
 
 def count_imprecise_names() -> Counter[str]:
-    all_names = collection.all_names()
-    imprecise_names: set[str] = set()
-
-    # Find which names are imprecise (have longer variations)
-    for name in all_names:
-        if ' egg' in name:
-            continue
-
-        # Check if it appears as a suffix in other longer names
-        for other in all_names:
-            # Only check if the other name is longer and ends with this name preceded by a space
-            if len(other) > len(name) and other.endswith(' ' + name):
-                imprecise_names.add(name)
-                break
+    counts = naming.split_counts()
+    imprecise_names = {name for name in longer_variants(counts) if ' egg' not in name}
 
     allowed = {
         'boat',
@@ -68,15 +56,25 @@ def count_imprecise_names() -> Counter[str]:
     imprecise_names -= allowed
 
     # Count how many images have each imprecise name
-    named_images = collection.expand_names(collection.named())
-    imprecise: Counter[str] = Counter()
+    return Counter({name: count for name, count in counts.items() if name in imprecise_names})
 
-    for i in named_images:
-        name = split(i.simplified())
-        if name in imprecise_names:
-            imprecise[name] += 1
 
-    return imprecise
+def longer_variants(names: Iterable[str]) -> set[str]:
+    """Names that another name ends with, after a space, like 'crab' for 'hermit crab'.
+
+    Every name's word suffixes are collected in one pass, so this is linear in
+    the total length of the names rather than comparing every pair.
+    """
+    names = list(names)
+    suffixes: set[str] = set()
+
+    for name in names:
+        space = name.find(' ')
+        while space != -1:
+            suffixes.add(name[space + 1 :])
+            space = name.find(' ', space + 1)
+
+    return {name for name in names if name in suffixes}
 
 
 def get_imprecise_names() -> set[str]:
@@ -119,7 +117,7 @@ def save_imprecise(name: str) -> None:
 
     for n, image in enumerate(images):
         src = image.path()
-        where = locations.get_region(image.site())
+        where = image.dive.region
 
         _, extension = os.path.splitext(image.label)
         tgt = os.path.join(root, f'{n:03d} {where}{extension}')
@@ -130,6 +130,16 @@ def lookup(subject: str, update: bool = True, again: bool = True) -> dict[str, s
     return out
 
 
+def stamp(subject: str) -> str:
+    """the url and time of the entry html would use, '' without one"""
+    key = subject.lower()
+    if is_invalid_subject(key):
+        return ''
+
+    value = database.get(*db_root, 'valid', get_mapped_subject(key) or key)
+    return f'{value["url"]} {value["time"]}' if value else ''
+
+
 def reference(entry: dict[str, Any], style: str = 'apa') -> str:
     """reference info"""
     url = entry['url']
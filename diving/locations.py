@@ -5,8 +5,9 @@ collecting dive locations
 """
 
 import os
+from collections.abc import Iterator
 from functools import lru_cache
-from typing import cast
+from typing import Any, cast
 
 from frozendict import frozendict
 
@@ -27,20 +28,18 @@ def sites_link(when: str, where: str) -> str:
     return f'/sites/{link}-{when}'
 
 
-@lru_cache(maxsize=1024)
+@lru_cache(None)
 def _find_location(site: str) -> tuple[str, str | None] | None:
-    """Find site in locations hierarchy, return (region, subregion) or None."""
-    for region, value in static.locations.items():
-        if isinstance(value, tuple):
-            for place in value:
-                if place == site or site.startswith(place):
-                    return (region, None)
-        else:
-            for subregion, places in value.items():
-                for place in places:
-                    if place == site or site.startswith(place):
-                        return (region, subregion)
-    return None
+    """Find site in locations hierarchy, return (region, subregion) or None.
+
+    Every place the site starts with is a match, the first in static.yml wins
+    """
+    matches = [found for _, found in _place_trie().prefixes(site)]
+    if not matches:
+        return None
+
+    _, region, subregion = min(matches)
+    return region, subregion
 
 
 def get_region(site: str) -> str:
@@ -74,7 +73,7 @@ def sites() -> ImageTree:
 
 def where_to_words(where: str) -> list[str]:
     """Split location string into logical components using greedy tokenization"""
-    multi_word_phrases = _get_multi_word_phrases()
+    phrases = _phrase_trie()
     words = []
     remaining = where
 
@@ -83,21 +82,17 @@ def where_to_words(where: str) -> list[str]:
         if not remaining:
             break
 
-        matched = False
-
-        # Try multi-word phrases first (longest to shortest)
-        for phrase in multi_word_phrases:
-            if remaining.startswith(phrase):
-                # Ensure phrase is word-bounded (followed by space, end of string)
-                next_char_idx = len(phrase)
-                if next_char_idx >= len(remaining) or remaining[next_char_idx] == ' ':
-                    words.append(phrase)
-                    remaining = remaining[len(phrase) :]
-                    matched = True
-                    break
-
-        # Fall back to single word
-        if not matched:
+        # The longest multi-word phrase, as long as it ends on a word boundary
+        end = 0
+        for length, _ in phrases.prefixes(remaining):
+            if length == len(remaining) or remaining[length] == ' ':
+                end = length
+
+        if end:
+            words.append(remaining[:end])
+            remaining = remaining[end:]
+        else:
+            # Fall back to single word
             parts = remaining.split(' ', 1)
             words.append(parts[0])
             remaining = parts[1] if len(parts) > 1 else ''
@@ -114,32 +109,77 @@ def find_year_range(lineage: list[str]) -> str:
 # PRIVATE
 
 
+class _Trie:
+    """Character trie, each key ending in a node with its value."""
+
+    _END = ''
+
+    def __init__(self) -> None:
+        self.root: dict[str, Any] = {}
+
+    def add(self, key: str, value: Any) -> None:
+        """the first value added for a key is kept"""
+        node = self.root
+        for char in key:
+            node = node.setdefault(char, {})
+        node.setdefault(self._END, value)
+
+    def prefixes(self, text: str) -> Iterator[tuple[int, Any]]:
+        """the length and value of every key that text starts with, shortest first"""
+        node = self.root
+        for i, char in enumerate(text):
+            node = node.get(char)
+            if node is None:
+                return
+            if self._END in node:
+                yield i + 1, node[self._END]
+
+
 @lru_cache(None)
-def _get_multi_word_phrases() -> tuple[str, ...]:
-    """Extract all multi-word phrases from locations hierarchy, sorted longest first"""
-    phrases: list[str] = []
+def _place_trie() -> _Trie:
+    """every place, with its position in the hierarchy, region and subregion"""
+    trie = _Trie()
+    order = 0
+
+    for region, value in static.locations.items():
+        if isinstance(value, tuple):
+            for place in value:
+                trie.add(place, (order, region, None))
+                order += 1
+        else:
+            for subregion, places in value.items():
+                for place in places:
+                    trie.add(place, (order, region, subregion))
+                    order += 1
+
+    return trie
+
+
+@lru_cache(None)
+def _phrase_trie() -> _Trie:
+    """Extract all multi-word phrases from locations hierarchy"""
+    trie = _Trie()
 
     for region, value in static.locations.items():
         # Add multi-word region names
         if ' ' in region:
-            phrases.append(region)
+            trie.add(region, region)
 
         if isinstance(value, tuple):
             # Flat structure: add multi-word site names
             for site in value:
                 if ' ' in site:
-                    phrases.append(site)
+                    trie.add(site, site)
         else:
             # Nested structure: add sub-regions and sites
             for subregion, sites in value.items():
                 if ' ' in subregion:
-                    phrases.append(subregion)
+                    trie.add(subregion, subregion)
                 for site in sites:
                     if ' ' in site:
-                        phrases.append(site)
+                        trie.add(site, site)
 
-    # Sort by length descending to match longest phrases first
-    return tuple(sorted(set(phrases), key=len, reverse=True))
+    return trie
 
 
 @lru_cache(None)
@@ -147,15 +187,10 @@ def _region_year_ranges() -> frozendict[str, frozenset[int]]:
     out: dict[str, set[int]] = {}
 
     for path in collection.dive_listing():
-        dive = os.path.basename(path)
-
-        year, *_ = dive.split('-')
-        year = int(year)
-
-        where = image.dive_to_location(dive)
-        where = add_context(where)
+        dive = image.dive_directory(os.path.basename(path))
+        year = dive.date.year
 
-        parts = where_to_words(where)
+        parts = where_to_words(dive.context)
         for i, part in enumerate(parts):
             region = ' '.join(parts[: i + 1])
             out.setdefault(region, set())
@@ -190,10 +225,8 @@ def _make_tree() -> ImageTree:
     out: ImageTree = {}
 
     for image_ in images:
-        when, *where = image_.location().split(' ')
-        where = ' '.join(where)
-        where = add_context(where) or where
-        words = where_to_words(where)
+        when = image_.dive.when
+        words = where_to_words(image_.dive.context)
 
         sub = out
         for word in words:
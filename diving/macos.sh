@@ -32,7 +32,8 @@ start_database() {
 
 clean() {
   cd "$www"
-  find gallery sites taxonomy timeline -name '*.html' -delete
+  find gallery sites taxonomy timeline \( -name '*.html' -o -name '*.html.gz' -o -name '*.html.br' \) -delete
+  rm -rf more
 }
 
 build() {
@@ -134,18 +135,4 @@ sync() {
     # walnut:/mnt/web/diving/
 }
 
-sitemap() {
-  images() {
-    rg \
-      --sort path \
-      --only-matching '/imgs/.*.webp' \
-      --glob '*.html' \
-      taxonomy sites gallery
-  }
-
-  cd "$www"
-  images | awk -f "$src"/diving/util/sitemap.awk > sitemap.xml
-  xmllint --noout sitemap.xml
-}
-
 "$@"
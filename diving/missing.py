@@ -19,96 +19,43 @@ USAGE:
 
 import operator
 from collections import Counter
-from collections.abc import Mapping
 from typing import Set
 
-from diving.util import collection, static, taxonomy
-from diving.util.image import split
-
-
-def _lookup_scientific(name: str, mapping: Mapping[str, str]) -> str:
-    """Lookup scientific name, reusing gallery_scientific for normalization.
-
-    Pre-applies split() then lets gallery_scientific handle:
-    - unsplit (angel fish -> angelfish)
-    - uncategorize (seaweed algae -> seaweed)
-    """
-    return taxonomy.gallery_scientific([split(name)], mapping)
+from diving.util import naming, static
 
 
 def count_missing_names() -> Counter[str]:
     """Names in images with no taxonomy.yml entry."""
-    scientific = taxonomy.mapping()
-    named_images = collection.expand_names(collection.named())
-
     missing: Counter[str] = Counter()
 
-    for image in named_images:
-        name = image.simplified()
-
+    for entry in naming.table().values():
         # Skip if in no-taxonomy lists
-        if taxonomy.no_taxonomy([name]):
+        if entry.no_taxonomy:
             continue
 
         # Skip if any word is in static.ignore (non-species like "reef", "site")
-        if any(word in static.ignore for word in name.split()):
+        if any(word in static.ignore for word in entry.name.split()):
             continue
 
-        # Check if name has a scientific mapping (try multiple normalizations)
-        if not _lookup_scientific(name, scientific):
-            missing[name] += 1
+        # Check if name has a scientific mapping (after split, unsplit and uncategorize)
+        if not entry.exact:
+            missing[entry.name] += entry.images
 
     return missing
 
 
 def count_incomplete_names() -> Counter[str]:
     """Names in images with taxonomy but no exact genus+species."""
-    scientific = taxonomy.mapping()
-    named_images = collection.expand_names(collection.named())
-
     incomplete: Counter[str] = Counter()
 
-    for image in named_images:
-        name = image.simplified()
-
+    for entry in naming.table().values():
         # Must have a scientific mapping to be "incomplete" (vs "missing")
-        sci_name = _lookup_scientific(name, scientific)
-        if not sci_name:
-            continue
-
-        # Check if scientific name is incomplete
-        if _is_incomplete(sci_name):
-            incomplete[name] += 1
+        if entry.exact and not entry.complete:
+            incomplete[entry.name] += entry.images
 
     return incomplete
 
 
-def _is_incomplete(sci_name: str) -> bool:
-    """Check if scientific name lacks a proper species epithet.
-
-    A complete scientific name ends with a lowercase species epithet.
-    Incomplete examples:
-    - 'Animalia Chordata Actinopterygii sp.' (ends with sp.)
-    - 'Animalia Annelida Polychaeta Leodice' (ends with genus, capitalized)
-    """
-    parts = sci_name.split()
-    if not parts:
-        return True
-
-    last = parts[-1]
-
-    # Explicit 'sp.' means unidentified species
-    if last == 'sp.':
-        return True
-
-    # If last part is capitalized, it's a genus/family/etc, not a species
-    # Species epithets are always lowercase
-    if last[0].isupper():
-        return True
-
-    return False
-
-
 def get_missing_names() -> Set[str]:
     return set(count_missing_names().keys())
 
@@ -1,43 +1,113 @@
 #!/usr/bin/python3
 
+"""
+search index for gallerySearch
+
+each section's page names are indexed by token, including the pieces of
+compound words like 'lionfish' that search.js splits queries into, which
+come from static.yml and are passed along in search-data.js. the index
+is sharded by the first character of the token, so a search only loads the
+one shard it needs, and search-data.js is just the list of shards
+"""
+
 import glob
+import hashlib
+import json
 import os
 import re
-import subprocess
-from collections.abc import Iterable
+from collections import defaultdict
+from collections.abc import Iterable, Iterator
 
+from diving.util import static
+from diving.util.metrics import metrics
 from diving.util.resource import VersionedResource
 from diving.util.static import search_data_path
 
+# shard -> ([page name], [(token, [page index])])
+Shards = dict[str, tuple[list[str], list[tuple[str, list[int]]]]]
+
+SAMPLE_SIZE = 20
+
 
 def write_search_data(
     gallery_pages: list[str], sites_pages: list[str], taxonomy_pages: list[str]
-) -> None:
-    """JSON site map for gallerySearch"""
-
-    gallery_pages = list(_cleaner(gallery_pages))
-    sites_pages = list(_cleaner(sites_pages))
-    taxonomy_pages = list(_cleaner(taxonomy_pages))
+) -> tuple[str, list[str]]:
+    """sharded index for gallerySearch
+
+    returns the versioned path of search-data.js for the top pages to load,
+    and the paths of the shards
+    """
+    os.makedirs('search', exist_ok=True)
+    sections = {
+        'gallery': gallery_pages,
+        'taxonomy': taxonomy_pages,
+        'sites': sites_pages,
+    }
+
+    written: list[str] = []
+    manifest: dict[str, dict[str, object]] = {}
+    for where, pages in sections.items():
+        names = list(_cleaner(pages))
+        shards = {}
+
+        for key, (shard_names, entries) in build_index(names).items():
+            shards[key] = _write_json(where, {'pages': shard_names, 'tokens': entries})
+
+        everything = _write_json(where, names)
+        manifest[where] = {
+            'pages': everything,
+            'shards': shards,
+            'sample': names[:: max(1, len(names) // SAMPLE_SIZE)][:SAMPLE_SIZE],
+        }
+        written += [everything, *shards.values()]
+
+    for path in glob.glob('search/*.json'):
+        if path not in written:
+            metrics.counter('search shards deleted')
+            os.remove(path)
 
     with open(search_data_path, 'w') as fd:
-        fd.write('var gallery_pages = [')
-        fd.write(','.join(gallery_pages))
-        fd.write('];\n')
-
-        fd.write('var taxonomy_pages = [')
-        fd.write(','.join(taxonomy_pages))
-        fd.write('];\n')
-
-        fd.write('var sites_pages = [')
-        fd.write(','.join(sites_pages))
-        fd.write('];\n')
+        fd.write(_search_data(manifest))
 
     vr = VersionedResource(search_data_path)
     vr.cleanup()
     vr.write()
 
-    indices = glob.glob('*/index.html')
-    subprocess.run(['sed', '-i', '', f's/{search_data_path}/{vr.path}/', *indices])
+    return vr.path, written
+
+
+def build_index(names: list[str]) -> Shards:
+    """the pages containing each token, sharded by the token's first character"""
+    postings: dict[str, dict[str, list[str]]] = defaultdict(lambda: defaultdict(list))
+    for name in names:
+        for token in dict.fromkeys(tokens(name)):
+            postings[token[0]][token].append(name)
+
+    shards: Shards = {}
+    for key, index in sorted(postings.items()):
+        pages = sorted({name for found in index.values() for name in found})
+        position = {name: i for i, name in enumerate(pages)}
+        shards[key] = (
+            pages,
+            [(token, [position[name] for name in index[token]]) for token in sorted(index)],
+        )
+    return shards
+
+
+def tokens(name: str) -> Iterator[str]:
+    """the words in a name, and the pieces of compound words"""
+    for word in name.lower().replace("'", '').split(' '):
+        if not word:
+            continue
+        yield word
+
+        for split in static.splits:
+            if split in word:
+                prefix, suffix = word.split(split, 1)
+                if prefix:
+                    yield prefix
+                    yield split + suffix
+                break
 
 
 # PRIVATE
@@ -56,4 +126,27 @@ def _cleaner(pages: list[str]) -> Iterable[str]:
 
         name = page.replace('.html', '').replace('-', ' ')
         name = DATE_PATTERN.sub(lambda m: m.group(0).replace(' ', '-'), name)
-        yield f'"{name}"'
+        yield name
+
+
+def _search_data(manifest: dict[str, dict[str, object]]) -> str:
+    """the shards of each section, and the compound word pieces for search.js
+    to split queries into, the same ones tokens() split the names into
+    """
+    index = json.dumps(manifest, separators=(',', ':'))
+    splits = json.dumps(static.splits, separators=(',', ':'))
+    return f'var search_index = {index};\nvar search_splits = {splits};\n'
+
+
+def _write_json(where: str, value: object) -> str:
+    """write out a versioned json file, unless it's already there"""
+    body = json.dumps(value, separators=(',', ':'))
+    digest = hashlib.md5(body.encode('utf-8')).hexdigest()[:10]
+    path = f'search/{where}-{digest}.json'
+
+    if not os.path.exists(path):
+        metrics.counter('search shards written')
+        with open(path, 'w') as fd:
+            fd.write(body)
+
+    return path
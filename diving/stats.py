@@ -9,19 +9,23 @@ Extracts statistics from dive logs and generates a stats page with:
 - Location analytics (dives per region)
 """
 
+import hashlib
 import json
 import os
 import shutil
 from collections import Counter
-from collections.abc import Sequence
-from statistics import mean as average
-from typing import Any, Dict, Set, TypeAlias
+from collections.abc import Mapping, Sequence
+from typing import Any, Self, TypeAlias
+
+import numpy as np
 
 from diving import locations
 from diving.hypertext import Where, navigation_carousel
-from diving.util import log, static
+from diving.util import database, fingerprint, log, static
 from diving.util.collection import dive_listing
-from diving.util.image import dive_to_location
+from diving.util.image import dive_directory
+from diving.util.links import links
+from diving.util.metrics import metrics
 from diving.util.resource import VersionedResource
 
 StatsBundle: TypeAlias = dict[str, Any]
@@ -29,104 +33,287 @@ Record: TypeAlias = dict[str, Any]
 Distribution: TypeAlias = list[list[int | float]]
 LocationStats: TypeAlias = dict[str, dict[str, int | float]]
 DiveData: TypeAlias = log.DiveInfo | log.FrozenDiveInfo
+Density: TypeAlias = dict[str, Any]
+
+
+# record name -> dive field, unit, whether larger values win
+_RECORDS = {
+    'Deepest Dive': ('depth', 'ft', True),
+    'Longest Dive': ('duration', 'min', True),
+    'Shallowest Dive': ('depth', 'ft', False),
+    'Shortest Dive': ('duration', 'min', False),
+    'Coldest Dive': ('temp_low', '°F', False),
+    'Warmest Dive': ('temp_low', '°F', True),
+}
+
+# histogram name -> bucket size
+_BUCKETS = {
+    'depth': 10,  # ft
+    'duration': 10,  # min
+    'temperature': 5,  # °F
+    'sac': 5,  # PSI/min
+    'air': 250,  # PSI
+    'end': 250,  # PSI
+    'start': 250,  # PSI
+}
+
+# histogram name -> chart container, title, color
+_CHARTS = {
+    'depth': ('depth-chart', 'Max Depth (ft)', '#4a90d9'),
+    'duration': ('duration-chart', 'Duration (mins)', '#5cb85c'),
+    'temperature': ('temp-chart', 'Temperature (&deg;F)', '#d9534f'),
+    'sac': ('sac-chart', 'Surface Air Consumption (PSI/min)', '#bf46ca'),
+    'start': ('start-chart', 'Starting Pressure (PSI)', '#f0ad4e'),
+    'air': ('air-chart', 'Total Air Consumption (PSI)', '#f0ad4e'),
+    'end': ('end-chart', 'Ending Pressure (PSI)', '#f0ad4e'),
+    'density': ('density-chart', 'Time at Depth (mins)', '#4a90d9'),
+}
+
+# the dive values the stats are built from
+_DIGESTED = (
+    'date',
+    'directory',
+    'depth',
+    'depths',
+    'duration',
+    'temp_low',
+    'sacs',
+    'tank_start',
+    'tank_end',
+)
+
+# depth vs. elapsed time bins
+_DENSITY_FEET = 10
+_DENSITY_MINUTES = 5
+
+# chart layout, in svg units
+_ROW_HEIGHT = 26
+_BAR_HEIGHT = 20
+_BAR_LEFT = 75
+_BAR_WIDTH = 280
+_CELL_HEIGHT = 16
+_GRID_LEFT = 45
+
+
+class StatsAccumulator:
+    """Everything on the stats page, gathered in a single pass over the dives.
+
+    The state is plain JSON, so it can be kept in the database between builds.
+    A build then only adds the dives it hasn't seen before, unless one of those
+    it has seen is gone or has changed. Dives are kept by number and a digest
+    of the values read from them, so a corrected log changes its key.
+    """
 
+    def __init__(self) -> None:
+        self.version = fingerprint.version()
+        self.photo: set[str] = set()
+        self.logged: set[str] = set()
+
+        # record name -> [value, directory, date]
+        self.records: dict[str, list[Any]] = {}
+        # date -> [dives, first directory]
+        self.days: dict[str, list[Any]] = {}
+        # histogram name -> bucket start -> count
+        self.buckets: dict[str, dict[int, int]] = {name: {} for name in _BUCKETS}
+        # site -> [dives, depth, temperature, sac, sac samples, seconds]
+        self.sites: dict[str, list[float]] = {}
+        self.unmatched: list[float] = [0] * 6
+        self.photo_dives = 0
+        self.logged_dives = 0
+        self.bottom_time = 0
+
+    @classmethod
+    def load(cls) -> Self:
+        """the accumulator from the last build, if it's still current"""
+        stats = cls()
+        state = database.database.get('diving', 'stats', 'accumulator')
+        if not state or state['version'] != stats.version:
+            return stats
+
+        stats.photo = set(state['photo'])
+        stats.logged = set(state['logged'])
+        stats.records = state['records']
+        stats.days = state['days']
+        stats.buckets = {
+            name: {int(start): count for start, count in buckets.items()}
+            for name, buckets in state['buckets'].items()
+        }
+        stats.sites = state['sites']
+        stats.unmatched = state['unmatched']
+        stats.photo_dives = state['photo_dives']
+        stats.logged_dives = state['logged_dives']
+        stats.bottom_time = state['bottom_time']
+        return stats
+
+    def save(self) -> None:
+        """keep the state for the next build"""
+        state = {
+            'version': self.version,
+            'photo': sorted(self.photo),
+            'logged': sorted(self.logged),
+            'records': self.records,
+            'days': self.days,
+            'buckets': self.buckets,
+            'sites': self.sites,
+            'unmatched': self.unmatched,
+            'photo_dives': self.photo_dives,
+            'logged_dives': self.logged_dives,
+            'bottom_time': self.bottom_time,
+        }
+        database.database.set('diving', 'stats', 'accumulator', value=state)
+
+    def extends(
+        self, logged_photo_dives: Sequence[DiveData], all_logged_dives: Sequence[DiveData]
+    ) -> bool:
+        """are these dives a superset of what's been added so far?"""
+        photo = {_photo_key(dive) for dive in logged_photo_dives}
+        logged = {_logged_key(dive) for dive in all_logged_dives}
+        without_photos = {_number(key) for key in self.logged} - {
+            _number(key) for key in self.photo
+        }
 
-def _make_sites_link(dive: DiveData) -> str:
-    """Build a sites link from dive data, or empty string if not possible."""
-    site = dive_to_location(dive['directory'])
-    date = dive['date'].strftime('%Y-%m-%d')
-    return locations.sites_link(date, site)
-
+        return (
+            self.photo <= photo
+            and self.logged <= logged
+            and not without_photos & {_number(key) for key in photo}
+        )
+
+    def update(
+        self, logged_photo_dives: Sequence[DiveData], all_logged_dives: Sequence[DiveData]
+    ) -> None:
+        """add the dives that haven't been seen yet"""
+        seen = set()
+        for dive in logged_photo_dives:
+            seen.add(dive['number'])
+            key = _photo_key(dive)
+            if key not in self.photo:
+                self.photo.add(key)
+                self.add_photo_dive(dive)
+
+        for dive in all_logged_dives:
+            key = _logged_key(dive)
+            if key not in self.logged:
+                self.logged.add(key)
+                self.add_logged_dive(dive, dive['number'] in seen)
+
+    def add_photo_dive(self, dive: DiveData) -> None:
+        """records, histograms and sites come from the dives with photos"""
+        directory = dive.get('directory', '')
+        date = dive['date'].strftime('%Y-%m-%d')
+
+        for name, (field, _, larger) in _RECORDS.items():
+            value = dive[field]
+            current = self.records.get(name)
+            if not current or (value > current[0] if larger else value < current[0]):
+                self.records[name] = [value, directory, date]
+
+        day = self.days.setdefault(date, [0, directory])
+        day[0] += 1
+        day[1] = min(day[1], directory)
+
+        self._count('depth', dive['depth'])
+        self._count('duration', dive['duration'] / 60)
+        self._count('temperature', dive['temp_low'])
+        for sac in dive['sacs'] or []:
+            self._count('sac', sac)
+
+        start, end = dive['tank_start'], dive['tank_end']
+        if start > 0 and end > 0 and start > end:
+            self._count('air', start - end)
+            self._count('end', end)
+            self._count('start', start)
+
+        site = self.sites.setdefault(dive_directory(directory).site, [0] * 6)
+        _add_to_site(site, dive)
+        self.photo_dives += 1
+
+    def add_logged_dive(self, dive: DiveData, photo: bool) -> None:
+        """totals come from all the logged dives, with or without photos"""
+        if not photo:
+            _add_to_site(self.unmatched, dive)
+
+        self.logged_dives += 1
+        self.bottom_time += dive['duration']
+
+    def build_records(self) -> dict[str, Record]:
+        records: dict[str, Record] = {}
+        for name, (field, unit, _) in _RECORDS.items():
+            if name not in self.records:
+                continue
+
+            value, directory, date = self.records[name]
+            records[name] = {
+                'value': value // 60 if field == 'duration' else value,
+                'unit': unit,
+                'dive': _make_site_name(directory),
+                'date': date,
+                'link': _make_sites_link(directory, date),
+            }
+
+        if self.days:
+            # the first day wins a tie
+            most_day = max(self.days, key=lambda date: self.days[date][0])
+            count, directory = self.days[most_day]
+            records['Most Dives in a Day'] = {
+                'value': count,
+                'unit': 'dives',
+                'dive': dive_directory(directory).region,
+                'date': most_day,
+                'link': _make_sites_link(directory, most_day),
+            }
+
+        return records
+
+    def build_distributions(self) -> dict[str, Distribution]:
+        return {name: _histogram(self.buckets[name], size) for name, size in _BUCKETS.items()}
+
+    def build_location_stats(self) -> LocationStats:
+        regions: dict[str, list[float]] = {}
+        for site, totals in self.sites.items():
+            _add_totals(regions.setdefault(locations.get_region(site), [0] * 6), totals)
+
+        if self.unmatched[0]:
+            # Dump all other non-photo dives into Washington
+            _add_totals(regions.setdefault('Washington', [0] * 6), self.unmatched)
+
+        result: LocationStats = {}
+        for region, (dives, depth, temp, sac, samples, time) in regions.items():
+            result[region] = {
+                'dives': int(dives),
+                'avg_depth': round(depth / dives),
+                'avg_temp': round(temp / dives),
+                'avg_sac': sac / samples if samples else 0,  # ~20 for everything, boring!
+                'bottom_time': round(time / 3600, 1),
+            }
+        return result
+
+    def build_totals(self) -> dict[str, int | float]:
+        total_dives = self.logged_dives
+        total_dives += 150  # pre Perdix
+        total_dives += len(static.dives_without_computer)
+        total_dives += len(static.dives_without_camera)
+
+        return {
+            'Total Dives': total_dives,
+            'Photo Dives': len(dive_listing()),
+            'Logged Dives': self.logged_dives,
+            'Logged Photo Dives': self.photo_dives,
+            'Bottom Time (hrs)': round(self.bottom_time / 3600, 1),
+            'Unique Sites': len(self.sites),
+        }
 
-def _make_site_name(dive: DiveData) -> str:
-    location = dive_to_location(dive['directory'])
-    region = locations.get_region(location)
-    return f'{location}, {region}'
+    def _count(self, name: str, value: float) -> None:
+        size = _BUCKETS[name]
+        bucket = int(value // size) * size
+        self.buckets[name][bucket] = self.buckets[name].get(bucket, 0) + 1
 
 
 def build_records(logged_photo_dives: Sequence[DiveData]) -> dict[str, Record]:
     """Compute personal records from dive data."""
-    records: dict[str, Record] = {}
-
-    # Deepest dive
-    deepest = max(logged_photo_dives, key=lambda d: d['depth'])
-    records['Deepest Dive'] = {
-        'value': deepest['depth'],
-        'unit': 'ft',
-        'dive': _make_site_name(deepest),
-        'date': deepest['date'].strftime('%Y-%m-%d'),
-        'link': _make_sites_link(deepest),
-    }
-
-    # Longest dive
-    longest = max(logged_photo_dives, key=lambda d: d['duration'])
-    records['Longest Dive'] = {
-        'value': longest['duration'] // 60,
-        'unit': 'min',
-        'dive': _make_site_name(longest),
-        'date': longest['date'].strftime('%Y-%m-%d'),
-        'link': _make_sites_link(longest),
-    }
-
-    # Shallowest dive
-    shallowest = min(logged_photo_dives, key=lambda d: d['depth'])
-    records['Shallowest Dive'] = {
-        'value': shallowest['depth'],
-        'unit': 'ft',
-        'dive': _make_site_name(shallowest),
-        'date': shallowest['date'].strftime('%Y-%m-%d'),
-        'link': _make_sites_link(shallowest),
-    }
-
-    # Shortest dive
-    shortest = min(logged_photo_dives, key=lambda d: d['duration'])
-    records['Shortest Dive'] = {
-        'value': shortest['duration'] // 60,
-        'unit': 'min',
-        'dive': _make_site_name(shortest),
-        'date': shortest['date'].strftime('%Y-%m-%d'),
-        'link': _make_sites_link(shortest),
-    }
-
-    # Coldest dive
-    coldest = min(logged_photo_dives, key=lambda d: d['temp_low'])
-    records['Coldest Dive'] = {
-        'value': coldest['temp_low'],
-        'unit': '°F',
-        'dive': _make_site_name(coldest),
-        'date': coldest['date'].strftime('%Y-%m-%d'),
-        'link': _make_sites_link(coldest),
-    }
-
-    # Warmest dive
-    warmest = max(logged_photo_dives, key=lambda d: d['temp_low'])
-    records['Warmest Dive'] = {
-        'value': warmest['temp_low'],
-        'unit': '°F',
-        'dive': _make_site_name(warmest),
-        'date': warmest['date'].strftime('%Y-%m-%d'),
-        'link': _make_sites_link(warmest),
-    }
-
-    # Most dives in a single day
-    dates = [d['date'].strftime('%Y-%m-%d') for d in logged_photo_dives]
-    date_counts = Counter(dates)
-    if date_counts:
-        most_day, count = date_counts.most_common(1)[0]
-        # Find first dive on that day (by directory order)
-        day_dives = [d for d in logged_photo_dives if d['date'].strftime('%Y-%m-%d') == most_day]
-        first_dive = min(day_dives, key=lambda d: d.get('directory', ''))
-        region = locations.get_region(dive_to_location(first_dive['directory']))
-
-        records['Most Dives in a Day'] = {
-            'value': count,
-            'unit': 'dives',
-            'dive': region,
-            'date': most_day,
-            'link': _make_sites_link(first_dive),
-        }
-
-    return records
+    stats = StatsAccumulator()
+    for dive in logged_photo_dives:
+        stats.add_photo_dive(dive)
+    return stats.build_records()
 
 
 def build_distribution(values: list[float], bucket_size: int) -> Distribution:
@@ -134,137 +321,181 @@ def build_distribution(values: list[float], bucket_size: int) -> Distribution:
 
     Returns list of [min, max, count] for each bucket.
     """
-    if not values:
-        return []
-
-    min_val = int(min(values) // bucket_size) * bucket_size
-    max_val = int(max(values) // bucket_size + 1) * bucket_size
-
-    buckets: dict[int, int] = {}
-    for v in values:
-        bucket = int(v // bucket_size) * bucket_size
-        buckets[bucket] = buckets.get(bucket, 0) + 1
-
-    result: Distribution = []
-    for start in range(min_val, max_val, bucket_size):
-        count = buckets.get(start, 0)
-        result.append([start, start + bucket_size, count])
-
-    return result
+    buckets = Counter(int(v // bucket_size) * bucket_size for v in values)
+    return _histogram(buckets, bucket_size)
 
 
 def build_distributions(logged_photo_dives: Sequence[DiveData]) -> dict[str, Distribution]:
     """Build all distribution histograms."""
-    depths = [d['depth'] for d in logged_photo_dives]
-    durations = [d['duration'] / 60 for d in logged_photo_dives]  # Convert to minutes
-    temps = [d['temp_low'] for d in logged_photo_dives]
-
-    dives_with_valid_tank_info = [
-        d
-        for d in logged_photo_dives
-        if d['tank_start'] > 0 and d['tank_end'] > 0 and d['tank_start'] > d['tank_end']
-    ]
-
-    air_consumption = [d['tank_start'] - d['tank_end'] for d in dives_with_valid_tank_info]
-    sacs = [d['sacs'] for d in logged_photo_dives if d['sacs']]
-    sacs = [sac for sublist in sacs for sac in sublist]
-
-    ending_pressure = [d['tank_end'] for d in dives_with_valid_tank_info]
-    starting_pressure = [d['tank_start'] for d in dives_with_valid_tank_info]
-
-    return {
-        'depth': build_distribution(depths, 10),  # 10ft buckets
-        'duration': build_distribution(durations, 10),  # 10min buckets
-        'temperature': build_distribution(temps, 5),  # 5°F buckets
-        'sac': build_distribution(sacs, 5),  # 5 PSI/min buckets
-        'air': build_distribution(air_consumption, 250),  # 250 PSI buckets
-        'end': build_distribution(ending_pressure, 250),  # 250 PSI buckets
-        'start': build_distribution(starting_pressure, 250),  # 250 PSI buckets
-    }
-
-
-def update_region_info(region_data: Dict[str, Any], region: str, dive: DiveData) -> None:
-    region_data.setdefault(region, {'depths': [], 'temps': [], 'count': [], 'sacs': [], 'time': []})
-    region_data[region]['depths'].append(dive['depth'])
-    region_data[region]['temps'].append(dive['temp_low'])
-    region_data[region]['sacs'].extend(dive['sacs'])
-    region_data[region]['count'].append(1)
-    region_data[region]['time'].append(dive['duration'])
+    stats = StatsAccumulator()
+    for dive in logged_photo_dives:
+        stats.add_photo_dive(dive)
+    return stats.build_distributions()
 
 
 def build_location_stats(
     logged_photo_dives: Sequence[DiveData], all_logged_dives: Sequence[DiveData]
 ) -> LocationStats:
     """Aggregate statistics by region."""
-    region_data: dict[str, dict[str, list[float]]] = {}
-    seen: Set[int] = set()
-
-    for dive in logged_photo_dives:
-        seen.add(dive['number'])
-        site = dive_to_location(dive['directory'])
-        region = locations.get_region(site)
-        update_region_info(region_data, region, dive)
-
-    for dive in all_logged_dives:
-        # Dump all other non-photo dives into Washington
-        if dive['number'] in seen:
-            continue
-        update_region_info(region_data, 'Washington', dive)
-
-    result: LocationStats = {}
-    for region, data in region_data.items():
-        result[region] = {
-            'dives': len(data['count']),
-            'avg_depth': round(average(data['depths'])),
-            'avg_temp': round(average(data['temps'])),
-            'avg_sac': average(data['sacs']),  # ~20 for everything, boring!
-            'bottom_time': round(sum(data['time']) / 3600, 1),
-        }
-
-    return result
+    stats = StatsAccumulator()
+    stats.update(logged_photo_dives, all_logged_dives)
+    return stats.build_location_stats()
 
 
 def build_totals(
     all_logged_dives: Sequence[DiveData], all_logged_photo_dives: Sequence[DiveData]
 ) -> dict[str, int | float]:
     """Compute aggregate totals."""
-    total_time = sum(d['duration'] for d in all_logged_dives)
-    sites = set(dive_to_location(d['directory']) for d in all_logged_photo_dives)
+    stats = StatsAccumulator()
+    stats.update(all_logged_photo_dives, all_logged_dives)
+    return stats.build_totals()
 
-    logged_dives = len(all_logged_dives)
-    photo_dives = len(dive_listing())
-    logged_photo_dives = len(all_logged_photo_dives)
 
-    total_dives = logged_dives
-    total_dives += 150  # pre Perdix
-    total_dives += len(static.dives_without_computer)
-    total_dives += len(static.dives_without_camera)
+def build_density(logged_photo_dives: Sequence[DiveData]) -> Density:
+    """Minutes spent in each depth and elapsed time bin, across every profile.
+
+    The grid has a row per depth bin starting at the surface, and a column per
+    time bin starting at the beginning of the dive.
+    """
+    depths, times, weights = [], [], []
+    for dive in logged_photo_dives:
+        if not dive.get('depths'):
+            continue
+
+        # each waypoint is (position in the dive, depth), evenly spaced in time
+        profile = np.asarray(dive['depths'], dtype=float)
+        minutes = dive['duration'] / 60
+        times.append(profile[:, 0] * minutes)
+        depths.append(profile[:, 1])
+        weights.append(np.full(len(profile), minutes / len(profile)))
+
+    if not depths:
+        return {'feet': _DENSITY_FEET, 'minutes': _DENSITY_MINUTES, 'grid': []}
+
+    depth = np.clip(np.concatenate(depths), 0, None)
+    time = np.concatenate(times)
+    grid, _, _ = np.histogram2d(
+        depth,
+        time,
+        bins=(_edges(depth.max(), _DENSITY_FEET), _edges(time.max(), _DENSITY_MINUTES)),
+        weights=np.concatenate(weights),
+    )
 
     return {
-        'Total Dives': total_dives,
-        'Photo Dives': photo_dives,
-        'Logged Dives': logged_dives,
-        'Logged Photo Dives': logged_photo_dives,
-        'Bottom Time (hrs)': round(total_time / 3600, 1),
-        'Unique Sites': len(sites),
+        'feet': _DENSITY_FEET,
+        'minutes': _DENSITY_MINUTES,
+        'grid': np.round(grid, 1).tolist(),
     }
 
 
 def build_stats_bundle() -> StatsBundle:
-    """Build the complete stats data bundle."""
+    """Build the complete stats data bundle.
+
+    Only the dives that are new since the last build are added, unless the
+    ones from before have changed.
+    """
     all_dives = log.all_dives()
     all_photo_dives = log.all_photo_dives()
 
+    stats = StatsAccumulator.load()
+    if not stats.extends(all_photo_dives, all_dives):
+        metrics.counter('stats recomputed')
+        stats = StatsAccumulator()
+
+    stats.update(all_photo_dives, all_dives)
+    stats.save()
+
     return {
-        'records': build_records(all_photo_dives),
-        'distributions': build_distributions(all_photo_dives),
-        'locations': build_location_stats(all_photo_dives, all_dives),
-        'totals': build_totals(all_dives, all_photo_dives),
+        'records': stats.build_records(),
+        'distributions': stats.build_distributions(),
+        'locations': stats.build_location_stats(),
+        'totals': stats.build_totals(),
+        'density': _cached_density(all_photo_dives),
     }
 
 
-def writer() -> None:
-    """Write out all stats page artifacts."""
+def svg_histogram(distribution: Distribution, color: str) -> str:
+    """A horizontal bar chart of the buckets, the same as stats.js draws."""
+    if not distribution:
+        return '<p>No data available</p>'
+
+    largest = max(count for _, _, count in distribution)
+    height = len(distribution) * _ROW_HEIGHT
+
+    parts = [
+        f'<svg class="bar-svg" viewBox="0 0 400 {height}" role="img">',
+    ]
+    for i, (start, end, count) in enumerate(distribution):
+        y = i * _ROW_HEIGHT
+        middle = y + _BAR_HEIGHT // 2
+        width = round(count / largest * _BAR_WIDTH, 1) if largest else 0
+        label = f'{start}–{end}'
+
+        parts.append(f'<g><title>{label}: {count}</title>')
+        parts.append(f'<text x="{_BAR_LEFT - 5}" y="{middle}" text-anchor="end">{label}</text>')
+        parts.append(
+            f'<rect class="bar-track" x="{_BAR_LEFT}" y="{y}" width="{_BAR_WIDTH}" '
+            f'height="{_BAR_HEIGHT}" rx="4"/>'
+        )
+        parts.append(
+            f'<rect x="{_BAR_LEFT}" y="{y}" width="{width}" height="{_BAR_HEIGHT}" rx="4" '
+            f'fill="{color}"/>'
+        )
+        parts.append(f'<text x="{_BAR_LEFT + _BAR_WIDTH + 7}" y="{middle}">{count}</text></g>')
+    parts.append('</svg>')
+
+    return ''.join(parts)
+
+
+def svg_density(density: Density, color: str) -> str:
+    """A heat map of the density grid, the same as stats.js draws."""
+    grid = density['grid']
+    if not grid:
+        return '<p>No data available</p>'
+
+    feet, minutes = density['feet'], density['minutes']
+    largest = max(max(row) for row in grid) or 1
+    width = (400 - _GRID_LEFT) / len(grid[0])
+    height = len(grid) * _CELL_HEIGHT
+
+    parts = [f'<svg class="bar-svg" viewBox="0 0 400 {height + 20}" role="img">']
+    parts.append(
+        f'<rect class="bar-track" x="{_GRID_LEFT}" y="0" width="{400 - _GRID_LEFT}" '
+        f'height="{height}"/>'
+    )
+    for i, row in enumerate(grid):
+        y = i * _CELL_HEIGHT
+        parts.append(
+            f'<text x="{_GRID_LEFT - 5}" y="{y + _CELL_HEIGHT // 2}" '
+            f'text-anchor="end">{i * feet}</text>'
+        )
+
+        for j, value in enumerate(row):
+            if not value:
+                continue
+            x = round(_GRID_LEFT + j * width, 1)
+            opacity = round((value / largest) ** 0.5, 2)
+            parts.append(
+                f'<rect x="{x}" y="{y}" width="{round(width, 1)}" height="{_CELL_HEIGHT}" '
+                f'fill="{color}" fill-opacity="{opacity}">'
+                f'<title>{i * feet}–{(i + 1) * feet}ft, {j * minutes}–{(j + 1) * minutes}min: '
+                f'{value}</title></rect>'
+            )
+
+    for j in range(0, len(grid[0]), 3):
+        x = round(_GRID_LEFT + j * width, 1)
+        parts.append(f'<text x="{x}" y="{height + 10}" text-anchor="middle">{j * minutes}</text>')
+    parts.append('</svg>')
+
+    return ''.join(parts)
+
+
+def writer(prerender: bool = True) -> None:
+    """Write out all stats page artifacts.
+
+    With prerender, the histograms are drawn into the page as SVG, rather than
+    by stats.js once it has loaded.
+    """
     os.makedirs('stats', exist_ok=True)
 
     bundle = build_stats_bundle()
@@ -286,14 +517,121 @@ def writer() -> None:
 
     # Write index.html
     with open('stats/index.html', 'w+') as fd:
-        html = _html_builder(static.stylesheet.path, stats_css.path, stats_js.path, data.path)
+        charts = {}
+        for name, (_, _, color) in _CHARTS.items():
+            if not prerender:
+                charts[name] = ''
+            elif name == 'density':
+                charts[name] = svg_density(bundle['density'], color)
+            else:
+                charts[name] = svg_histogram(bundle['distributions'][name], color)
+        html = _html_builder(
+            static.stylesheet.path, stats_css.path, stats_js.path, data.path, charts
+        )
         print(html, file=fd, end='')
+    links.add('stats/index.html', html)
+
+
+# PRIVATE
+
+
+def _photo_key(dive: DiveData) -> str:
+    """a dive with photos is also identified by the directory it was matched to"""
+    return f'{dive["number"]} {_digest(dive)} {dive["directory"]}'
+
+
+def _logged_key(dive: DiveData) -> str:
+    return f'{dive["number"]} {_digest(dive)}'
+
+
+def _number(key: str) -> str:
+    return key.split(' ', 1)[0]
+
+
+def _digest(dive: DiveData) -> str:
+    """the values of a dive that the stats read, so a corrected log is noticed"""
+    values = [dive.get(field) for field in _DIGESTED]
+    return hashlib.md5(json.dumps(values, default=str).encode('utf-8')).hexdigest()[:10]
+
+
+def _make_sites_link(directory: str, date: str) -> str:
+    """Build a sites link from dive data, or empty string if not possible."""
+    return locations.sites_link(date, dive_directory(directory).site)
+
+
+def _make_site_name(directory: str) -> str:
+    dive = dive_directory(directory)
+    return f'{dive.site}, {dive.region}'
+
+
+def _add_to_site(totals: list[float], dive: DiveData) -> None:
+    """dives, depth, temperature, sac, sac samples, seconds"""
+    _add_totals(
+        totals,
+        [
+            1,
+            dive['depth'],
+            dive['temp_low'],
+            sum(dive['sacs']),
+            len(dive['sacs']),
+            dive['duration'],
+        ],
+    )
+
+
+def _add_totals(totals: list[float], more: Sequence[float]) -> None:
+    for i, value in enumerate(more):
+        totals[i] += value
+
+
+def _cached_density(logged_photo_dives: Sequence[DiveData]) -> Density:
+    """build_density, unless the dive logs are the same as last time"""
+    profiles = [_logged_key(dive) for dive in logged_photo_dives]
+    key = hashlib.md5(repr((fingerprint.version(), profiles)).encode('utf-8')).hexdigest()
+
+    cached = database.database.get('diving', 'stats', 'density')
+    if cached and cached['fingerprint'] == key:
+        metrics.counter('stats density cached')
+        return cached['density']
+
+    density = build_density(logged_photo_dives)
+    database.database.set(
+        'diving', 'stats', 'density', value={'fingerprint': key, 'density': density}
+    )
+    return density
+
+
+def _edges(largest: float, size: int) -> np.ndarray:
+    """bin edges from zero, with the last bin containing largest"""
+    return np.arange(0, (largest // size + 1) * size + 1, size)
 
 
-def _html_builder(main_css: str, stats_css: str, stats_js: str, data_js: str) -> str:
+def _histogram(buckets: Mapping[int, int], bucket_size: int) -> Distribution:
+    """[min, max, count] for every bucket between the first and last"""
+    if not buckets:
+        return []
+
+    return [
+        [start, start + bucket_size, buckets.get(start, 0)]
+        for start in range(min(buckets), max(buckets) + bucket_size, bucket_size)
+    ]
+
+
+def _html_builder(
+    main_css: str, stats_css: str, stats_js: str, data_js: str, charts: dict[str, str]
+) -> str:
     """Build the stats page HTML."""
     desc = 'Scuba diving statistics: personal records, dive distributions, and location analytics'
     nav = navigation_carousel(Where.Stats)
+    sections = ''.join(
+        f"""
+            <div class="stats-section">
+                <h2>{title}</h2>
+                <div class="chart-container" id="{container}">{charts[name]}</div>
+            </div>
+"""
+        for name, (container, title, _) in _CHARTS.items()
+    )
     return f"""\
 <!DOCTYPE html>
 <html lang="en">
@@ -330,42 +668,7 @@ def _html_builder(main_css: str, stats_css: str, stats_js: str, data_js: str) ->
                 <h2>Locations</h2>
                 <table class="locations-table" id="locations"></table>
             </div>
-
-            <div class="stats-section">
-                <h2>Max Depth (ft)</h2>
-                <div class="chart-container" id="depth-chart"></div>
-            </div>
-
-            <div class="stats-section">
-                <h2>Duration (mins)</h2>
-                <div class="chart-container" id="duration-chart"></div>
-            </div>
-
-            <div class="stats-section">
-                <h2>Temperature (&deg;F)</h2>
-                <div class="chart-container" id="temp-chart"></div>
-            </div>
-
-            <div class="stats-section">
-                <h2>Surface Air Consumption (PSI/min)</h2>
-                <div class="chart-container" id="sac-chart"></div>
-            </div>
-
-            <div class="stats-section">
-                <h2>Starting Pressure (PSI)</h2>
-                <div class="chart-container" id="start-chart"></div>
-            </div>
-
-            <div class="stats-section">
-                <h2>Total Air Consumption (PSI)</h2>
-                <div class="chart-container" id="air-chart"></div>
-            </div>
-
-            <div class="stats-section">
-                <h2>Ending Pressure (PSI)</h2>
-                <div class="chart-container" id="end-chart"></div>
-            </div>
-        </div>
+{sections}        </div>
     </body>
 </html>
 """
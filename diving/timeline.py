@@ -4,37 +4,93 @@
 Python implementation of runner.sh
 """
 
+import glob
+import hashlib
+import itertools
+import json
 import operator
 import os
+from collections.abc import Iterator
 from typing import Any
 
-from diving import hypertext, locations
+from diving import hypertext
 from diving.hypertext import Where
-from diving.util import collection, common, log, static
-
-
-def timeline() -> list[tuple[str, str]]:
-    """generate all the timeline html"""
+from diving.util import collection, common, fingerprint, log, static
+from diving.util.fingerprint import fingerprints
+from diving.util.image import dive_directory
+from diving.util.metrics import metrics
+from diving.util.template import Template, chunk
+
+# dives per bundle
+BUNDLE_DIVES = 6
+
+_SITE_LINK = Template(
+    """\
+    <a href="{link}">
+        <h2 class="site-pill sites pad-down">{title}</h2>
+    </a>
+    """
+)
+_SITE = Template('<h2 class="center">{title}</h2>\n')
+_WHEN = Template('<h3 class="center">{when} - {region}</h3>\n')
+_GRID_OPEN = chunk('<div class="grid">\n')
+_GRID_CLOSE = chunk('</div>\n')
+_ITEM = Template('<div class="timeline-item isloaded">\n{content}</div>\n')
+
+
+def timeline() -> Iterator[tuple[str, str | None]]:
+    """generate all the timeline html, the index page last
+
+    the dives of each month are also bundled together, a few at a time, so
+    scrolling through the timeline fetches a bundle rather than every dive. the
+    newest bundle is inlined into the index, and the rest are listed for
+    timeline.js to load. a bundle's name includes a hash of its dives, so
+    browsers never see a stale one, and bundles no longer listed are removed
+    """
     dives = [d for d in sorted(os.listdir(static.image_root), reverse=True) if d.startswith('20')]
-    results = []
-
-    for dive in dives:
-        results.append(_subpage(dive))
+    bundles = []
+
+    for month, group in itertools.groupby(dives, key=lambda dive: dive[:7]):
+        month_dives = list(group)
+        for i, start in enumerate(range(0, len(month_dives), BUNDLE_DIVES), start=1):
+            rendered = []
+            for dive in month_dives[start : start + BUNDLE_DIVES]:
+                path, html = _subpage(dive)
+                rendered.append((path, html))
+                yield path, html
+
+            bundle = _bundle(f'{month}-{i}', rendered)
+            bundles.append(bundle)
+            yield bundle
+
+    current = {path for path, _ in bundles}
+    for path in glob.glob('timeline/bundle-*.html'):
+        if path not in current:
+            metrics.counter('timeline bundles deleted')
+            os.remove(path)
 
     fake_scientific: dict[str, Any] = {}
     title, _ = hypertext.title([], Where.Timeline, fake_scientific)
-    paths = [f'/{path}' for (path, _) in results]
 
     with open(static.timeline_js_path) as fd:
         timeline_js = fd.read()
 
+    first, *rest = [path for path, _ in bundles] or ['']
+    later = json.dumps([f'/{path}' for path in rest])
+
+    path = 'timeline/index.html'
+    if fingerprints.unchanged(path, title, fingerprints.current.get(first), later, timeline_js):
+        yield path, None
+        return
+
     html = '\n'.join(
         [
             title,
+            _contents(*bundles[0]) if bundles else '',
             '</div>',
             hypertext.scripts,
             '  <script>',
-            f'const timelineUrls = {paths};',
+            f'const timelineBundles = {later};',
             timeline_js,
             '  </script>',
             '  </body>',
@@ -42,51 +98,57 @@ def timeline() -> list[tuple[str, str]]:
         ]
     )
 
-    results.append(('timeline/index.html', html))
-    return results
+    yield path, html
 
 
-def _subpage(dive: str) -> tuple[str, str]:
-    """build the sub page for this dive"""
-    when, title = dive.split(' ', 1)
+# PRIVATE
 
-    while title and (title[0].isdigit() or title[0] == ' '):
-        title = title[1:]
 
-    sites_link = locations.sites_link(when, title)
-    when = common.pretty_date(when)
+def _bundle(name: str, rendered: list[tuple[str, str | None]]) -> tuple[str, str | None]:
+    """these dives together, unless none of them have changed"""
+    dives = [fingerprints.current[dive] for dive, _ in rendered]
+    digest = hashlib.md5(repr(dives).encode('utf-8')).hexdigest()[:10]
 
-    region = locations.get_region(title)
-    if sites_link:
-        name = f"""\
-<a href="{sites_link}">
-    <h2 class="site-pill sites pad-down">{title}</h2>
-</a>
-"""
+    path = f'timeline/bundle-{name}-{digest}.html'
+    if fingerprints.unchanged(path, dives):
+        return path, None
+
+    return path, ''.join(_ITEM.render(content=_contents(*dive)) for dive in rendered)
+
+
+def _contents(path: str, html: str | None) -> str:
+    """html that was just rendered, or is already on disk"""
+    if html is not None:
+        return html
+
+    with open(path) as fd:
+        return fd.read()
+
+
+def _subpage(dive: str) -> tuple[str, str | None]:
+    """build the sub page for this dive, unless it hasn't changed"""
+    record = dive_directory(dive)
+    title = record.site
+
+    if record.sites_link:
+        parts = [_SITE_LINK.render(link=record.sites_link, title=title)]
     else:
-        name = f"""\
-    <h2 class="center">{title}</h2>
-"""
+        parts = [_SITE.render(title=title)]
+    parts.append(_WHEN.render(when=record.pretty_date, region=record.region))
 
-    html = f"""\
-{name}
-<h3 class="center">{when} - {region}</h3>
-"""
     info = log.lookup(dive)
     if info:
-        html += log.dive_info_html(info)
+        parts.append(log.dive_info_html(info))
 
-    html += """\
-<div class="grid">
-"""
+    directory = os.path.join(static.image_root, dive)
+    images = sorted(collection.delve(directory), key=operator.attrgetter('number'))
 
-    path = os.path.join(static.image_root, dive)
-    images = sorted(collection.delve(path), key=operator.attrgetter('number'))
-    html += '\n'.join(hypertext.html_direct_image(image, Where.Timeline, True) for image in images)
+    path = 'timeline/' + common.sanitize_link(dive) + '.html'
+    if fingerprints.unchanged(path, parts, fingerprint.images(images)):
+        return path, None
 
-    html += """\
-</div>
-"""
+    parts.append(_GRID_OPEN)
+    parts.extend(hypertext.html_direct_image(image, True) for image in images)
+    parts.append(_GRID_CLOSE)
 
-    path = common.sanitize_link(dive) + '.html'
-    return f'timeline/{path}', html
+    return path, ''.join(parts)
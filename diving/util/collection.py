@@ -16,7 +16,7 @@ from frozendict import frozendict
 from diving.util import static
 from diving.util.common import flatten, tree_size
 from diving.util.freeze import deep_freeze
-from diving.util.image import Image, reorder_eggs, split
+from diving.util.image import Image, reorder_eggs
 from diving.util.metrics import metrics
 
 ImageTree: TypeAlias = 'dict[str, list[Image] | ImageTree]'
@@ -29,12 +29,6 @@ def named() -> tuple[Image, ...]:
     return tuple(flatten([[y for y in z if y.name] for z in _collect_all_images()]))
 
 
-@lru_cache(None)
-def all_names() -> frozenset[str]:
-    """all simplified, split names"""
-    return frozenset(split(i.simplified()) for i in expand_names(named()))
-
-
 @lru_cache(None)
 def all_valid_names() -> frozenset[str]:
     return frozenset(single_level(build_image_tree()).keys())
@@ -7,7 +7,6 @@ dict and list functions
 import datetime
 import functools
 import itertools
-import os
 import time
 from collections.abc import Callable, Iterable, Mapping
 from typing import Any
@@ -27,20 +26,6 @@ def kelvin_to_fahrenheit(m: float) -> int:
     return int((m - 273.15) * 1.8 + 32)
 
 
-def file_content_matches(path: str, content: str) -> bool:
-    size = -1
-    try:
-        size = os.stat(path).st_size
-    except OSError:
-        pass
-
-    if size != len(content):
-        return False
-
-    with open(path) as fd:
-        return content == fd.read()
-
-
 def titlecase(xs: str) -> str:
     """xs.title() but a bit smarter"""
     return xs.title().replace("'S", "'s")
@@ -122,6 +107,8 @@ def hmap(arg: Any, *fns: Callable[[Any], Any]) -> Any:
 
 def is_date(x: str) -> bool:
     """is this a date?"""
+    if not isinstance(x, str) or len(x) != 10 or x[4] != '-' or x[7] != '-':
+        return False
     try:
         _ = datetime.datetime.strptime(x, '%Y-%m-%d')
         return True
@@ -0,0 +1,108 @@
+#!/usr/bin/python3
+
+"""
+precompressed siblings of the output, so the web server doesn't have to
+
+page.html gets page.html.gz, and page.html.br when brotli is installed, both
+at the highest compression level. the hash, size and modification time of
+each source are kept in the database, and its siblings are only compressed
+again when the source changes. when compression is off, siblings that no
+longer match their source are removed rather than served stale
+"""
+
+import gzip
+import hashlib
+import os
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+
+from diving.util import database
+from diving.util.manifest import Entry
+from diving.util.metrics import metrics
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def outputs(paths: Iterable[str], enabled: bool) -> None:
+    """compress these outputs, or just remove out of date siblings"""
+    stored = database.database.get('diving', 'compressed', 'files') or {}
+    entries = {path: tuple(entry) for path, entry in stored.items()}
+
+    entries = refresh(entries, paths if enabled else [], enabled)
+    database.database.set('diving', 'compressed', 'files', value=entries)
+
+
+def refresh(entries: dict[str, Entry], paths: Iterable[str], enabled: bool) -> dict[str, Entry]:
+    """bring the siblings of these paths and those already compressed up to
+    date, returning the new entries
+    """
+    todo = sorted(set(paths) | set(entries))
+
+    def work(path: str) -> Entry | None:
+        return _refresh(path, entries.get(path), enabled)
+
+    with ThreadPoolExecutor() as pool:
+        results = zip(todo, pool.map(work, todo))
+        return {path: entry for path, entry in results if entry}
+
+
+def suffixes() -> tuple[str, ...]:
+    """the siblings written for each output"""
+    if brotli:
+        return '.gz', '.br'
+    return ('.gz',)
+
+
+def remove(path: str) -> None:
+    """remove any siblings of this path"""
+    for suffix in ('.gz', '.br'):
+        try:
+            os.remove(path + suffix)
+        except FileNotFoundError:
+            pass
+
+
+# PRIVATE
+
+
+def _refresh(path: str, entry: Entry | None, enabled: bool) -> Entry | None:
+    """compress this path if it's changed, returning its entry"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        remove(path)
+        return None
+
+    present = all(os.path.exists(path + suffix) for suffix in suffixes())
+    if entry and present and entry[1:] == (stat.st_size, stat.st_mtime_ns):
+        return entry
+
+    with open(path, 'rb') as fd:
+        data = fd.read()
+    digest = hashlib.md5(data).hexdigest()
+
+    if entry and present and entry[0] == digest:
+        # rewritten with the same content
+        return digest, stat.st_size, stat.st_mtime_ns
+
+    if not enabled:
+        metrics.counter('compressed siblings removed')
+        remove(path)
+        return None
+
+    metrics.counter('outputs compressed')
+    _write(path, data)
+    return digest, stat.st_size, stat.st_mtime_ns
+
+
+def _write(path: str, data: bytes) -> None:
+    """write out the siblings"""
+    with open(path + '.gz', 'wb') as fd:
+        fd.write(gzip.compress(data, compresslevel=9, mtime=0))
+
+    if brotli:
+        with open(path + '.br', 'wb') as fd:
+            fd.write(brotli.compress(data, quality=11))
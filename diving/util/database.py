@@ -2,6 +2,7 @@
 Database interface
 """
 
+import threading
 from typing import Any
 
 import apocrypha.client
@@ -18,6 +19,9 @@ class Database:
         """Get an image's hash"""
         raise NotImplementedError
 
+    def forked(self) -> None:
+        """Called in a child process after fork"""
+
     # Low Level
 
     def get(self, *keys: str, default: Any | None = None) -> Any:
@@ -59,6 +63,12 @@ class RealDatabase(Database):
     def get_image_hash(self, identifier: str) -> str | None:
         return self.get('diving', 'cache', identifier, default={}).get('hash')
 
+    def forked(self) -> None:
+        # the connection belongs to the parent, closing it here would close it
+        # there too. forget it and open a new one on the next query
+        self.database.sock = None
+        self.database.lock = threading.Lock()
+
     def get(self, *keys: str, default: Any | None = None) -> Any:
         *context, target = keys
         ckey = ' '.join(context)
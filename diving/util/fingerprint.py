@@ -0,0 +1,91 @@
+#!/usr/bin/python3
+
+"""
+page fingerprints, for skipping pages whose inputs haven't changed
+
+a fingerprint is a hash of everything that goes into a page: the images and
+their hashes, the lineage, the dive logs, wikipedia entries, versioned assets
+and so on, found without rendering any of it. the fingerprints from the last
+build are kept in the database, and a page whose fingerprint matches and
+whose output still exists isn't rendered again
+
+the source code and data files are part of every fingerprint, so changing
+either renders everything
+"""
+
+from __future__ import annotations
+
+import glob
+import hashlib
+import os
+from collections.abc import Iterable
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any
+
+from diving.util import database, static
+from diving.util.metrics import metrics
+
+if TYPE_CHECKING:
+    from diving.util.image import Image
+
+
+class Fingerprints:
+    def __init__(self) -> None:
+        self.previous: dict[str, str] = {}
+        self.current: dict[str, str] = {}
+
+    def load(self) -> None:
+        """fetch the fingerprints from the last build"""
+        self.previous = database.database.get('diving', 'fingerprints', 'pages') or {}
+
+    def save(self) -> None:
+        """keep the fingerprints of this build for the next"""
+        database.database.set('diving', 'fingerprints', 'pages', value=self.current)
+
+    def unchanged(self, path: str, *inputs: Any) -> bool:
+        """record this page's fingerprint, is it the same as last time?"""
+        fingerprint = hashlib.md5(repr((version(), inputs)).encode('utf-8')).hexdigest()
+        self.current[path] = fingerprint
+
+        if self.previous.get(path) != fingerprint or not os.path.exists(path):
+            return False
+
+        metrics.counter('pages unchanged since last build')
+        return True
+
+    def take(self) -> dict[str, str]:
+        """everything recorded so far, starting over empty"""
+        current, self.current = self.current, {}
+        return current
+
+    def merge(self, current: dict[str, str]) -> None:
+        """fold in what another process recorded"""
+        self.current.update(current)
+
+
+def images(images: Iterable[Image]) -> list[tuple[str, ...]]:
+    """what about these images can change a page"""
+    return [
+        (image.identifier(), image.label, image.name, image.hashed(), str(image.position))
+        for image in images
+    ]
+
+
+@lru_cache(None)
+def version() -> str:
+    """the code and data that render every page"""
+    paths = glob.glob(static.source_root + 'diving/**/*.py', recursive=True)
+    paths += glob.glob(static.source_root + 'data/*.yml')
+
+    digest = hashlib.md5()
+    for path in sorted(paths):
+        with open(path, 'rb') as fd:
+            digest.update(fd.read())
+
+    return digest.hexdigest()
+
+
+# PRIVATE
+
+
+fingerprints = Fingerprints()
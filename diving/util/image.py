@@ -4,24 +4,81 @@
 base class for a diving image
 """
 
+import datetime
 import os
-from functools import lru_cache
+from functools import cached_property, lru_cache
 
-from diving.util import database, log, static
+from diving.util import common, database, log, static
 from diving.util.common import Tree
 from diving.util.grammar import singular
 
 
-def dive_to_location(dive: str) -> str:
-    _, where = dive.split(' ', 1)
+class DiveDirectory:
+    """a dive folder's name, like '2021-01-01 2 Sund Rock', parsed once
+
+    there's one per folder, shared by every image in it. the parts that need
+    the locations hierarchy are looked up the first time they're used
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.when, where = name.split(' ', 1)
+
+        i = 0
+        for i, char in enumerate(where):
+            if char in '0123456789 ':
+                continue
+            break
+
+        self.site = where[i:]
+        self.ordinal = int(where[:i]) if where[:i].strip().isdigit() else None
+        self.location = f'{self.when} {self.site}'
+
+    def __repr__(self) -> str:
+        return self.name
+
+    @cached_property
+    def date(self) -> datetime.date:
+        return datetime.date.fromisoformat(self.when)
+
+    @cached_property
+    def pretty_date(self) -> str:
+        return common.pretty_date(self.when)
+
+    @cached_property
+    def region(self) -> str:
+        from diving import locations
 
-    i = 0
-    for i, char in enumerate(where):
-        if char in '0123456789 ':
-            continue
-        break
+        return locations.get_region(self.site)
 
-    return where[i:]
+    @cached_property
+    def subregion(self) -> str | None:
+        from diving import locations
+
+        return locations.get_subregion(self.site)
+
+    @cached_property
+    def context(self) -> str:
+        """the site within its region and subregion"""
+        from diving import locations
+
+        return locations.add_context(self.site)
+
+    @cached_property
+    def sites_link(self) -> str:
+        from diving import locations
+
+        return locations.sites_link(self.when, self.site)
+
+
+@lru_cache(None)
+def dive_directory(name: str) -> DiveDirectory:
+    """the shared record for this folder"""
+    return DiveDirectory(name)
+
+
+def dive_to_location(dive: str) -> str:
+    return dive_directory(dive).site
 
 
 @lru_cache(maxsize=4096)
@@ -98,6 +155,7 @@ class Image:
         self.name = reorder_eggs(name)
         self.number = number
         self.directory = directory
+        self.dive = dive_directory(directory)
         self.position = position
         self.database = database.database
         self.is_image = ext == '.jpg'
@@ -111,15 +169,11 @@ class Image:
 
     def location(self) -> str:
         """directory minus numbering"""
-        when, _ = self.directory.split(' ', 1)
-        where = dive_to_location(self.directory)
-
-        return f'{when} {where}'
+        return self.dive.location
 
     def site(self) -> str:
         """directory minus numbering and date"""
-        _, where = self.location().split(' ', 1)
-        return where
+        return self.dive.site
 
     def identifier(self) -> str:
         """unique ID"""
@@ -0,0 +1,118 @@
+#!/usr/bin/python3
+
+"""
+internal links between the generated pages, for finding broken ones
+
+each page's links are recorded as it's rendered, so checking them doesn't
+read anything back from the output. pages that weren't rendered again keep
+the links from the last build, which are kept in the database. a link is good
+if it names a generated page, or a file that's already on disk like an image
+or a versioned resource
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+from collections.abc import Iterable
+
+from diving.util import database, static
+from diving.util.metrics import metrics
+
+_LINK = re.compile(r'(?:href|src)="(.+?)"')
+
+
+class Links:
+    def __init__(self) -> None:
+        self.previous: dict[str, list[str]] = {}
+        self.pages: dict[str, list[str]] = {}
+
+    def load(self) -> None:
+        """fetch the links from the last build"""
+        self.previous = database.database.get('diving', 'links', 'pages') or {}
+
+    def save(self) -> None:
+        """keep the links of this build for the next"""
+        database.database.set('diving', 'links', 'pages', value=self.pages)
+
+    def add(self, path: str, html: str | None) -> None:
+        """record the internal links of a page, or the last build's if it wasn't rendered"""
+        if html is None:
+            self.pages[path] = self.previous.get(path, [])
+            return
+
+        if path.endswith('.json'):
+            # a heavy page's chunk of images
+            html = ''.join(json.loads(html))
+        self.pages[path] = list(dict.fromkeys(internal(html)))
+
+    def take(self) -> dict[str, list[str]]:
+        """everything recorded so far, starting over empty"""
+        pages, self.pages = self.pages, {}
+        return pages
+
+    def merge(self, pages: dict[str, list[str]]) -> None:
+        """fold in what another process recorded"""
+        self.pages.update(pages)
+
+    def broken(self) -> list[str]:
+        """every link that isn't a page or a file on disk, with a page it's on"""
+        checked: set[str] = set()
+        listings: dict[str, set[str]] = {}
+        broken = []
+
+        for path, targets in sorted(self.pages.items()):
+            for link in targets:
+                metrics.counter('links considered')
+                if link in checked:
+                    continue
+                checked.add(link)
+
+                if any(self._exists(attempt, listings) for attempt in _attempts(link)):
+                    metrics.counter('links verified')
+                else:
+                    broken.append(f'broken {link} in {path}')
+
+        return broken
+
+    def _exists(self, path: str, listings: dict[str, set[str]]) -> bool:
+        """a generated page, or in its directory's listing, which is read once"""
+        if path in self.pages:
+            return True
+
+        directory, name = os.path.split(path)
+        if directory not in listings:
+            try:
+                listings[directory] = set(os.listdir(directory or '.'))
+            except OSError:
+                listings[directory] = set()
+
+        return name in listings[directory]
+
+
+def internal(html: str) -> Iterable[str]:
+    """the links in a page to this site, relative to the root
+
+    only absolute paths and links to the site itself count, fragments like
+    the videos' '#video_...' and other schemes and hosts are skipped
+    """
+    for link in _LINK.findall(html):
+        if link.startswith(static.site_url + '/'):
+            link = link[len(static.site_url) :]
+
+        if not link.startswith('/') or link.startswith('//'):
+            continue
+
+        yield link[1:].split('#', 1)[0].split('?', 1)[0]
+
+
+# PRIVATE
+
+
+def _attempts(link: str) -> tuple[str, ...]:
+    """the paths a link could be served from"""
+    return (link + '.html', link + 'index.html', link)
+
+
+links = Links()
@@ -6,6 +6,8 @@ Parsing UDDF files
 https://www.streit.cc/extern/uddf_v321/en/index.html
 """
 
+import hashlib
+import json
 import math
 import os
 from collections.abc import Iterator
@@ -60,6 +62,16 @@ def lookup(dive: str) -> FrozenDiveInfo | None:
     return _matched_dives().get(dive)
 
 
+@lru_cache(None)
+def digest(dive: str) -> str:
+    """a short hash of the log matched to this directory, '' without one"""
+    info = lookup(dive)
+    if not info:
+        return ''
+    encoded = json.dumps(dict(info), default=str, sort_keys=True)
+    return hashlib.md5(encoded.encode('utf-8')).hexdigest()[:10]
+
+
 def search(date: str, hint: str) -> FrozenDiveInfo | None:
     dates_only: dict[str, list[str]] = {}
     for dive in _matched_dives():
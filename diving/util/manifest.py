@@ -0,0 +1,87 @@
+#!/usr/bin/python3
+
+"""
+output manifest, for skipping writes of pages that are already on disk
+
+the manifest records the hash, size and modification time of every page
+written. a page whose hash matches and whose file hasn't been touched since
+isn't read back or written again. files that aren't in the manifest, or were
+modified by something else, are compared against the disk instead
+"""
+
+import hashlib
+import os
+from collections.abc import Iterable
+
+from diving.util import database
+from diving.util.metrics import metrics
+
+# content hash, size in bytes, modification time in nanoseconds
+Entry = tuple[str, int, int]
+
+
+class Manifest:
+    def __init__(self) -> None:
+        self.entries: dict[str, Entry] = {}
+        self.updated: dict[str, Entry] = {}
+
+    def load(self) -> None:
+        """fetch the manifest from the last build"""
+        stored = database.database.get('diving', 'manifest', 'pages') or {}
+        self.entries = {path: tuple(entry) for path, entry in stored.items()}
+
+    def save(self, paths: Iterable[str]) -> None:
+        """keep the entries for these pages for the next build"""
+        entries = {path: self.entries[path] for path in paths if path in self.entries}
+        database.database.set('diving', 'manifest', 'pages', value=entries)
+
+    def write(self, path: str, content: str) -> None:
+        """write this page, unless it's already there"""
+        data = content.encode('utf-8')
+        digest = hashlib.md5(data).hexdigest()
+
+        try:
+            stat = os.stat(path)
+        except OSError:
+            stat = None
+
+        if stat:
+            entry = (digest, stat.st_size, stat.st_mtime_ns)
+            if self.entries.get(path) == entry:
+                metrics.counter('pages already on disk')
+                return
+
+            if stat.st_size == len(data) and _disk_matches(path, data):
+                metrics.counter('pages compared on disk')
+                self._record(path, entry)
+                return
+
+        with open(path, 'wb') as fd:
+            fd.write(data)
+
+        stat = os.stat(path)
+        self._record(path, (digest, stat.st_size, stat.st_mtime_ns))
+
+    def take(self) -> dict[str, Entry]:
+        """everything recorded so far, starting over empty"""
+        updated, self.updated = self.updated, {}
+        return updated
+
+    def merge(self, updated: dict[str, Entry]) -> None:
+        """fold in what another process recorded"""
+        self.entries.update(updated)
+
+    def _record(self, path: str, entry: Entry) -> None:
+        self.entries[path] = entry
+        self.updated[path] = entry
+
+
+# PRIVATE
+
+
+def _disk_matches(path: str, data: bytes) -> bool:
+    with open(path, 'rb') as fd:
+        return fd.read() == data
+
+
+manifest = Manifest()
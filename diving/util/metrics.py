@@ -19,6 +19,20 @@ class Metrics:
         self.data.setdefault(key, 0)
         self.data[key] += n
 
+    def take(self) -> dict[str, Any]:
+        """everything recorded so far, starting over empty"""
+        data, self.data = self.data, {}
+        return data
+
+    def merge(self, data: dict[str, Any]) -> None:
+        """fold in what another process recorded"""
+        for key, value in data.items():
+            if isinstance(value, set):
+                self.data.setdefault(key, set())
+                self.data[key] |= value
+            else:
+                self.counter(key, value)
+
     def summary(self, label: str) -> None:
         if not self.data:
             return
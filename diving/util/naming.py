@@ -0,0 +1,159 @@
+#!/usr/bin/python3
+
+"""
+what's known about every distinct name in the images
+
+missing, imprecise, verify and taxonomy all ask the same questions of the
+same names: how many images have it, what's its scientific name, is that down
+to the species, is it known not to have one. each distinct name is answered
+once and the table is kept in the database, so after the first run the
+command line tools only have to look at the dive folders' modification times
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+from collections import Counter
+from collections.abc import Iterable, Mapping
+from dataclasses import astuple, dataclass
+from functools import lru_cache
+
+from frozendict import frozendict
+
+from diving.util import collection, database, fingerprint, taxonomy
+from diving.util.image import Image, split
+from diving.util.metrics import metrics
+
+
+@dataclass(frozen=True)
+class NameEntry:
+    """one simplified name, like 'angel fish', and what it resolves to"""
+
+    name: str
+    # split form, like 'angelfish'
+    split: str
+    images: int
+    # the closest classification, falling back to fewer words; '' if none
+    scientific: str
+    # the split form itself has a taxonomy entry
+    exact: bool
+    # ... and that entry names a species
+    complete: bool
+    # known not to have a taxonomy entry
+    no_taxonomy: bool
+
+
+@lru_cache(None)
+def table() -> frozendict[str, NameEntry]:
+    """every simplified name, from the database when the images haven't changed"""
+    key = _fingerprint()
+
+    cached = database.database.get('diving', 'names', 'table')
+    if cached and cached['fingerprint'] == key:
+        metrics.counter('name table cached')
+        return frozendict((row[0], NameEntry(*row)) for row in cached['rows'])
+
+    entries = build_table(collection.expand_names(collection.named()))
+    database.database.set(
+        'diving',
+        'names',
+        'table',
+        value={'fingerprint': key, 'rows': [astuple(entry) for entry in entries.values()]},
+    )
+    return entries
+
+
+def build_table(images: Iterable[Image]) -> frozendict[str, NameEntry]:
+    """resolve each distinct name in these images once"""
+    labels: Counter[str] = Counter()
+    examples: dict[str, Image] = {}
+    for image in images:
+        labels[image.name] += 1
+        examples.setdefault(image.name, image)
+
+    # each label is only simplified once
+    counts: Counter[str] = Counter()
+    for label, count in labels.items():
+        counts[examples[label].simplified()] += count
+
+    scientific = taxonomy.mapping()
+    return frozendict(
+        {name: _resolve(name, count, scientific) for name, count in sorted(counts.items())}
+    )
+
+
+@lru_cache(None)
+def split_counts() -> frozendict[str, int]:
+    """how many images there are of each simplified, split name"""
+    counts: Counter[str] = Counter()
+    for entry in table().values():
+        counts[entry.split] += entry.images
+    return frozendict(counts)
+
+
+@lru_cache(None)
+def all_names() -> frozenset[str]:
+    """all simplified, split names"""
+    return frozenset(split_counts())
+
+
+@lru_cache(None)
+def classifications() -> frozendict[str, str]:
+    """the closest classification of each simplified, split name"""
+    return frozendict({entry.split: entry.scientific for entry in table().values()})
+
+
+# PRIVATE
+
+
+def _resolve(name: str, count: int, scientific: Mapping[str, str]) -> NameEntry:
+    """everything about a name that depends only on the name
+
+    the names without taxonomy are left for the pages that show them to report
+    """
+    simple = split(name)
+    exact = bool(taxonomy.gallery_scientific([simple], scientific, record=False))
+    closest = taxonomy.gallery_scientific(simple.split(' '), scientific, record=False)
+
+    return NameEntry(
+        name=name,
+        split=simple,
+        images=count,
+        scientific=closest,
+        exact=exact,
+        complete=exact and not _is_incomplete(closest),
+        no_taxonomy=taxonomy.no_taxonomy([name], record=False),
+    )
+
+
+def _is_incomplete(sci_name: str) -> bool:
+    """Check if scientific name lacks a proper species epithet.
+
+    A complete scientific name ends with a lowercase species epithet.
+    Incomplete examples:
+    - 'Animalia Chordata Actinopterygii sp.' (ends with sp.)
+    - 'Animalia Annelida Polychaeta Leodice' (ends with genus, capitalized)
+    """
+    parts = sci_name.split()
+    if not parts:
+        return True
+
+    last = parts[-1]
+
+    # Explicit 'sp.' means unidentified species
+    if last == 'sp.':
+        return True
+
+    # If last part is capitalized, it's a genus/family/etc, not a species
+    # Species epithets are always lowercase
+    if last[0].isupper():
+        return True
+
+    return False
+
+
+def _fingerprint() -> str:
+    """the code, the data, and when each dive folder's contents last changed"""
+    folders = [(path, os.stat(path).st_mtime_ns) for path in collection.dive_listing()]
+    return hashlib.md5(repr((fingerprint.version(), folders)).encode('utf-8')).hexdigest()
@@ -1,7 +1,10 @@
 """Position-weighted taxonomy similarity scoring."""
 
+from collections.abc import Sequence
 from functools import lru_cache
 
+import numpy as np
+
 
 @lru_cache(maxsize=2048)
 def _split_taxonomy(s: str) -> tuple[str, ...]:
@@ -28,3 +31,50 @@ def similarity(a: str, b: str) -> float:
     total_weight = max_len * (max_len + 1) // 2
     match_weight = sum(max_len - i for i, (x, y) in enumerate(zip(at, bt)) if x == y)
     return match_weight / total_weight
+
+
+def encode_lineages(lineages: Sequence[str]) -> tuple[np.ndarray, np.ndarray]:
+    """Encode taxonomy strings as integer rank arrays.
+
+    Every distinct word is assigned a small integer, and each lineage becomes a
+    row of those integers padded with -1 out to the deepest lineage. Returns
+    (ranks, lengths).
+    """
+    ranks: dict[str, int] = {}
+    splits = [_split_taxonomy(lineage) for lineage in lineages]
+    depth = max((len(words) for words in splits), default=0)
+
+    encoded = np.full((len(splits), depth), -1, dtype=np.int32)
+    for i, words in enumerate(splits):
+        encoded[i, : len(words)] = [ranks.setdefault(word, len(ranks)) for word in words]
+
+    lengths = np.array([len(words) for words in splits], dtype=np.int64)
+    return encoded, lengths
+
+
+def similarity_matrix(lineages: Sequence[str]) -> np.ndarray:
+    """All pairs similarity() scores as a percentage, computed with broadcasting.
+
+    Entry [i, j] is int(similarity(lineages[i], lineages[j]) * 100), and the
+    matrix is symmetric. Memory is O(n^2) regardless of taxonomy depth since
+    matches are accumulated one rank at a time.
+    """
+    encoded, lengths = encode_lineages(lineages)
+    max_len = np.maximum(lengths[:, None], lengths[None, :])
+
+    # sum(max_len - k) over matching positions == max_len * matches - sum(k)
+    matches = np.zeros(max_len.shape, dtype=np.int64)
+    positions = np.zeros(max_len.shape, dtype=np.int64)
+    for k in range(encoded.shape[1]):
+        column = encoded[:, k]
+        equal = (column[:, None] == column[None, :]) & (column >= 0)[:, None]
+        matches += equal
+        positions += equal * k
+
+    match_weight = max_len * matches - positions
+    total_weight = max_len * (max_len + 1) // 2
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scores = np.where(total_weight > 0, match_weight / total_weight, 0.0)
+
+    return (scores * 100).astype(np.int64)
@@ -0,0 +1,128 @@
+#!/usr/bin/python3
+
+"""
+image sitemap, https://developers.google.com/search/docs/crawling-indexing/sitemaps/image-sitemaps
+
+html_tree records each page and the images on it as it goes, rendered or not.
+the pages are written out in gzipped shards under the sitemap size limit,
+listed by sitemap.xml. shards are only rewritten when their content changes
+"""
+
+from __future__ import annotations
+
+import datetime
+import glob
+import gzip
+import os
+from collections.abc import Iterable
+from typing import TYPE_CHECKING
+from xml.sax.saxutils import escape
+
+from diving.util import static
+from diving.util.metrics import metrics
+
+if TYPE_CHECKING:
+    from diving.util.image import Image
+
+SHARD_URLS = 50_000
+
+
+class Sitemap:
+    def __init__(self) -> None:
+        self.pages: dict[str, list[str]] = {}
+
+    def add(self, path: str, images: Iterable[Image]) -> None:
+        """record a page and the images it shows"""
+        self.pages[path] = list(
+            dict.fromkeys(image.thumbnail() for image in images if image.is_image)
+        )
+
+    def take(self) -> dict[str, list[str]]:
+        """everything recorded so far, starting over empty"""
+        pages, self.pages = self.pages, {}
+        return pages
+
+    def merge(self, pages: dict[str, list[str]]) -> None:
+        """fold in what another process recorded"""
+        self.pages.update(pages)
+
+    def write(self) -> None:
+        """write out the shards and the index"""
+        paths = sorted(self.pages)
+        shards = []
+
+        for i, start in enumerate(range(0, len(paths), SHARD_URLS), start=1):
+            name = f'sitemap-{i}.xml.gz'
+            _write_if_changed(name, _shard(paths[start : start + SHARD_URLS], self.pages))
+            shards.append(name)
+
+        for name in glob.glob('sitemap-*.xml.gz'):
+            if name not in shards:
+                metrics.counter('sitemap shards deleted')
+                os.remove(name)
+
+        with open('sitemap.xml', 'w') as fd:
+            fd.write(_index(shards))
+
+
+# PRIVATE
+
+
+def _shard(paths: list[str], pages: dict[str, list[str]]) -> bytes:
+    """the urlset for these pages, compressed"""
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"',
+        '        xmlns:image="http://www.google.com/schemas/sitemap-image/1.1">',
+    ]
+    for path in paths:
+        lines.append('<url>')
+        lines.append(f'<loc>{escape(_location(path))}</loc>')
+        for image in pages[path]:
+            lines.append('<image:image>')
+            lines.append(f'<image:loc>{static.site_url}{escape(image)}</image:loc>')
+            lines.append('</image:image>')
+        lines.append('</url>')
+    lines.append('</urlset>\n')
+
+    return gzip.compress('\n'.join(lines).encode('utf-8'), compresslevel=9, mtime=0)
+
+
+def _index(shards: list[str]) -> str:
+    """the sitemap index, with when each shard last changed"""
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">',
+    ]
+    for name in shards:
+        mtime = os.stat(name).st_mtime
+        lastmod = datetime.date.fromtimestamp(mtime).isoformat()
+        lines.append('<sitemap>')
+        lines.append(f'<loc>{static.site_url}/{name}</loc>')
+        lines.append(f'<lastmod>{lastmod}</lastmod>')
+        lines.append('</sitemap>')
+    lines.append('</sitemapindex>\n')
+
+    return '\n'.join(lines)
+
+
+def _location(path: str) -> str:
+    """the canonical url of a page"""
+    path = path.removesuffix('.html')
+    return f'{static.site_url}/{path.removesuffix("index")}'
+
+
+def _write_if_changed(name: str, data: bytes) -> None:
+    try:
+        with open(name, 'rb') as fd:
+            if fd.read() == data:
+                return
+    except FileNotFoundError:
+        pass
+
+    metrics.counter('sitemap shards written')
+    with open(name, 'wb') as fd:
+        fd.write(data)
+
+
+sitemap = Sitemap()
@@ -50,6 +50,7 @@ no_taxonomy_any: frozenset[str] = frozenset(_static['no-taxonomy-any'])
 # Nested structures -> frozen trees
 categories: FrozenListTree = _freeze_list_tree(_static['categories'])
 difficulty: FrozenListTree = _freeze_list_tree(_static['difficulty'])
+detective_datasets: FrozenListTree = _freeze_list_tree(_static['detective-datasets'])
 locations: FrozenListTree = _freeze_list_tree(_static['locations'])
 
 
@@ -74,6 +75,8 @@ location_map: frozendict[str, str] = _invert(locations)
 stylesheet = VersionedResource(os.path.join(source_root, 'web/style.css'))
 search_js = VersionedResource(os.path.join(source_root, 'web/search.js'))
 video_js = VersionedResource(os.path.join(source_root, 'web/video.js'))
+more_js = VersionedResource(os.path.join(source_root, 'web/more.js'))
 
 timeline_js_path = os.path.join(source_root, 'web/timeline.js')
 search_data_path = 'search-data.js'
+site_url = 'https://diving.anardil.net'
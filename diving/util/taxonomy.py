@@ -20,11 +20,10 @@ from typing import Any, TypeAlias
 import yaml
 from frozendict import frozendict
 
-from diving.util import static
+from diving.util import naming, static
 from diving.util.collection import (
     FrozenImageTree,
     ImageTree,
-    all_names,
     build_image_tree,
     single_level,
 )
@@ -41,9 +40,12 @@ NameMapping: TypeAlias = frozendict[str, str]
 
 
 def gallery_scientific(
-    lineage: list[str], scientific: Mapping[str, str], debug: bool = False
+    lineage: list[str], scientific: Mapping[str, str], debug: bool = False, record: bool = True
 ) -> str:
-    """attempt to find a scientific name for this page"""
+    """attempt to find a scientific name for this page
+
+    without record, lineages without one aren't added to the metrics
+    """
 
     def lookup(names: list[str], *fns: Callable[..., Any]) -> str | None:
         base = ' '.join(names).lower()
@@ -62,24 +64,22 @@ def gallery_scientific(
         if name:
             break
 
-    if not name and not no_taxonomy(lineage):
+    if record and not name and not no_taxonomy(lineage):
         metrics.record('no scientific name', ' '.join(lineage))
 
     return name or ''
 
 
-def no_taxonomy(lineage: list[str]) -> bool:
+def no_taxonomy(lineage: list[str], record: bool = True) -> bool:
     """is this lineage not in the taxonomy?"""
     name = ' '.join(lineage)
-    if unqualify(uncategorize(name)) in static.no_taxonomy_exact:
-        metrics.counter('lineages known to not have taxonomy')
-        return True
+    known = unqualify(uncategorize(name)) in static.no_taxonomy_exact or any(
+        i in name for i in static.no_taxonomy_any
+    )
 
-    if any(i in name for i in static.no_taxonomy_any):
+    if known and record:
         metrics.counter('lineages known to not have taxonomy')
-        return True
-
-    return False
+    return known
 
 
 def simplify(name: str, shorten: bool = False) -> str:
@@ -235,11 +235,6 @@ def names_cache() -> NameMapping:
     return frozendict(cache)
 
 
-def _to_classification(name: str, mappings: NameMapping) -> str:
-    """find a suitable classification for this common name"""
-    return gallery_scientific(name.split(' '), mappings)
-
-
 def _filter_exact(tree: TaxiaTree | FrozenTaxiaTree) -> TaxiaTree:
     """remove all sp. entries"""
     assert isinstance(tree, (dict, frozendict)), tree
@@ -342,10 +337,6 @@ def _ordered_simple_names(tree: ImageTree) -> Iterable[str]:
 
 def _find_imprecise() -> Iterable[str]:
     """find names with classifications that could be more specific"""
-    names = all_names()
-    m = mapping()
-
-    for name in names:
-        c = _to_classification(name, m)
-        if ' sp.' in c:
+    for name, classification in naming.classifications().items():
+        if ' sp.' in classification:
             yield name
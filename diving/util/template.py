@@ -0,0 +1,68 @@
+#!/usr/bin/python3
+
+"""
+precompiled html templates
+
+Templates are dedented and split into static chunks and named slots once, when
+the module defining them is imported. Rendering a page is then a list join of
+those chunks and the provided values, rather than formatting a large f-string
+and dedenting the whole document afterwards.
+"""
+
+from __future__ import annotations
+
+import string
+import sys
+import textwrap
+
+
+def chunk(text: str) -> str:
+    """dedent and intern a static piece of html"""
+    return sys.intern(textwrap.dedent(text))
+
+
+class Template:
+    """
+    A str.format style template. Only plain {name} slots are supported, no
+    conversions or format specs, and {{ }} escape literal braces.
+    """
+
+    def __init__(self, text: str, dedent: bool = True) -> None:
+        if dedent:
+            text = textwrap.dedent(text)
+
+        self.chunks: list[str] = []
+        self.slots: list[str] = []
+        literal = ''
+
+        for static, slot, spec, conversion in string.Formatter().parse(text):
+            literal += static
+            if slot is None:
+                continue
+
+            assert slot.isidentifier(), slot
+            assert not spec and not conversion, (slot, spec, conversion)
+            self.chunks.append(sys.intern(literal))
+            self.slots.append(slot)
+            literal = ''
+
+        self.chunks.append(sys.intern(literal))
+
+    def render(self, **values: str) -> str:
+        """fill in every slot"""
+        parts = [self.chunks[0]]
+        for slot, literal in zip(self.slots, self.chunks[1:]):
+            parts.append(values[slot])
+            parts.append(literal)
+        return ''.join(parts)
+
+    def partial(self, **values: str) -> Template:
+        """fill in some slots now, typically values that are known at import"""
+        text = self.chunks[0].replace('{', '{{').replace('}', '}}')
+        for slot, literal in zip(self.slots, self.chunks[1:]):
+            if slot in values:
+                text += values[slot].replace('{', '{{').replace('}', '}}')
+            else:
+                text += '{' + slot + '}'
+            text += literal.replace('{', '{{').replace('}', '}}')
+        return Template(text, dedent=False)
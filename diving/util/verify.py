@@ -7,13 +7,14 @@ Check for broken links, misspelled names, and more
 import difflib
 import os
 import re
-from collections.abc import Callable, Iterable, Set as AbstractSet
-from concurrent.futures import ThreadPoolExecutor
+from collections.abc import Callable, Iterable, Mapping, Set as AbstractSet
 from typing import Any
 
-from diving.util import collection, common, static, taxonomy
+import numpy as np
+
+from diving.util import collection, common, naming, static, taxonomy
 from diving.util.common import Progress
-from diving.util.metrics import metrics
+from diving.util.links import links
 
 
 def verify_before() -> None:
@@ -189,17 +190,23 @@ def _find_wrong_name_order(tree: Any) -> Iterable[tuple[str, str]]:
 
 def _spelling() -> None:
     """actual check"""
-    found = set(_find_misspellings(collection.all_names()))
+    found = set(_find_misspellings(naming.all_names(), naming.classifications()))
     if found:
         assert False, f'{found} may be mispelled'
 
-    found = set(_illegal_names(collection.all_names()))
+    found = set(_illegal_names(naming.all_names()))
     if found:
         assert False, f'{found} illegal names'
 
 
-def _find_misspellings(names: AbstractSet[str]) -> Iterable[str]:
-    """check for misspellings"""
+def _find_misspellings(
+    names: AbstractSet[str], classified: Mapping[str, str] | None = None
+) -> Iterable[str]:
+    """check for misspellings
+
+    classified has the scientific names of any that are already known
+    """
+    classified = classified or {}
     candidates = _possible_misspellings(names)
     scientific = taxonomy.mapping()
     ignores = (
@@ -212,7 +219,11 @@ def _find_misspellings(names: AbstractSet[str]) -> Iterable[str]:
 
     for group in candidates:
         for candidate in group:
-            if taxonomy.gallery_scientific(candidate.split(' '), scientific):
+            # those without one are looked up again, which records them
+            known = classified.get(candidate) or taxonomy.gallery_scientific(
+                candidate.split(' '), scientific
+            )
+            if known:
                 continue
             if any(i in candidate for i in ignores):
                 continue
@@ -223,26 +234,25 @@ def _find_misspellings(names: AbstractSet[str]) -> Iterable[str]:
 def _possible_misspellings(names: AbstractSet[str]) -> Iterable[list[str]]:
     """Look for edit distance, filtering by length for efficiency.
 
-    For 0.8 cutoff, strings must have similar lengths.
+    For 0.8 cutoff, strings must have similar lengths, and similar letters.
     Uses sorted iteration for deterministic results.
     """
     skip = set(static.ignore) | {'unknown'}
-    names = {name for name in names if not any(name.endswith(i) for i in skip)}
-    remaining = set(names)  # Track unprocessed names
-
-    for name in sorted(names):  # Deterministic order
-        if name not in remaining:
-            continue
-        remaining.discard(name)
+    index = _LetterIndex(sorted(name for name in names if not any(name.endswith(i) for i in skip)))
 
+    for row, name in enumerate(index.names):  # Deterministic order
         name_len = len(name)
 
         # For 0.8 cutoff: 2*min(a,b)/(a+b) >= 0.8 → lengths within ~50%
         min_len = int(name_len * 0.67)
         max_len = int(name_len * 1.5)
 
-        # Filter candidates by length before expensive comparison
-        candidates = [n for n in remaining if min_len <= len(n) <= max_len]
+        # and 2*common letters/(a+b) >= 0.8 → a+b-2*common <= 0.2*(a+b),
+        # plus one so rounding never loses a match
+        radius = int(0.2 * (name_len + max_len)) + 1
+
+        # Only compare against the names after this one
+        candidates = index.later(row, radius, min_len, max_len)
 
         similars = difflib.get_close_matches(name, candidates, cutoff=0.8)
         similars = [other for other in similars if other not in name and name not in other]
@@ -257,6 +267,33 @@ def _illegal_names(names: AbstractSet[str]) -> Iterable[str]:
             yield name
 
 
+class _LetterIndex:
+    """Names by how many of each letter they have.
+
+    difflib only computes a ratio once quick_ratio, which counts the letters
+    two names share regardless of order, passes the cutoff. The names that can
+    pass are those with close letter counts, found for each name with one
+    comparison against every row rather than one quick_ratio per name.
+    """
+
+    def __init__(self, names: list[str]) -> None:
+        self.names = names
+        self.lengths = np.array([len(name) for name in names])
+
+        alphabet = {char: i for i, char in enumerate(sorted(set(''.join(names))))}
+        self.counts = np.zeros((len(names), len(alphabet)), dtype=np.int32)
+        for row, name in enumerate(names):
+            for char in name:
+                self.counts[row, alphabet[char]] += 1
+
+    def later(self, row: int, radius: int, shortest: int, longest: int) -> list[str]:
+        """names after this row within radius letters of it, between the lengths"""
+        distance = np.abs(self.counts[row + 1 :] - self.counts[row]).sum(axis=1)
+        lengths = self.lengths[row + 1 :]
+        found = (distance <= radius) & (lengths >= shortest) & (lengths <= longest)
+        return [self.names[row + 1 + i] for i in np.flatnonzero(found)]
+
+
 # AFTER
 
 
@@ -287,67 +324,8 @@ def _important_files() -> None:
 
 
 def _links() -> None:
-    """check the html directory for broken links by extracting all the
-    internal links from the written files and looking for those as paths
+    """check the links recorded while rendering, each distinct link once, against
+    the generated pages and what's on disk
     """
-
-    def check_link_exists(args: tuple[str, str]) -> str | None:
-        path, link = args
-
-        for attempt in (link + '.html', link + 'index.html', link):
-            if os.path.exists(attempt):
-                metrics.counter('links verified')
-                return None
-        return f'broken {link} in {path}'
-
-    with ThreadPoolExecutor() as executor:
-        broken = list(filter(None, executor.map(check_link_exists, _deduped_links())))
-
+    broken = links.broken()
     assert not broken, broken
-
-
-def _deduped_links() -> Iterable[tuple[str, str]]:
-    seen = set()
-
-    for path, link in _find_links():
-        metrics.counter('links considered')
-        if path in seen:
-            continue
-        seen.add(path)
-        yield path, link
-
-
-def _find_links() -> Iterable[tuple[str, str]]:
-    """check the html directory for internal links"""
-
-    def extract_from(path: str) -> list[tuple[str, str]]:
-        """get links from a file"""
-        links = []
-        with open(path) as fd:
-            content = fd.read()
-
-            for link in re.findall(r'(?:href|src)=\"(.+?)\"', content):
-                if link.startswith('http'):
-                    if 'diving.anardil.net' in link:
-                        _, link = link.split('https://diving.anardil.net')
-                    else:
-                        continue
-
-                link = link[1:]
-                links.append((path, link))
-        return links
-
-    def process_file(directory: str, filename: str) -> list[tuple[str, str]]:
-        path = os.path.join(directory, filename)
-        return extract_from(path)
-
-    workers = (os.cpu_count() or 4) * 2
-    with ThreadPoolExecutor(max_workers=workers) as executor:
-        file_list = [
-            (directory, filename)
-            for directory in ('taxonomy', 'gallery', 'sites', 'detective')
-            for filename in os.listdir(directory)
-            if filename.endswith('.html')
-        ]
-        for result in executor.map(lambda args: process_file(*args), file_list):
-            yield from result
@@ -0,0 +1,66 @@
+import gzip
+import os
+from pathlib import Path
+
+from diving.util import compress
+
+
+class TestCompress:
+    """Precompressed siblings of the output."""
+
+    def test_compressed(self, tmp_path: Path) -> None:
+        path = tmp_path / 'a.html'
+        path.write_text('<p>hello</p>' * 100)
+
+        entries = compress.refresh({}, [str(path)], True)
+
+        assert set(entries) == {str(path)}
+        for suffix in compress.suffixes():
+            assert os.path.exists(str(path) + suffix)
+        assert gzip.decompress(Path(str(path) + '.gz').read_bytes()) == path.read_bytes()
+
+    def test_unchanged_not_compressed(self, tmp_path: Path) -> None:
+        path = tmp_path / 'a.html'
+        path.write_text('a')
+
+        entries = compress.refresh({}, [str(path)], True)
+        sibling = str(path) + '.gz'
+        os.utime(sibling, ns=(0, 0))
+
+        assert compress.refresh(entries, [str(path)], True) == entries
+        assert os.stat(sibling).st_mtime_ns == 0
+
+    def test_changed_compressed(self, tmp_path: Path) -> None:
+        path = tmp_path / 'a.html'
+        path.write_text('a')
+        entries = compress.refresh({}, [str(path)], True)
+
+        path.write_text('bb')
+        compress.refresh(entries, [str(path)], True)
+
+        assert gzip.decompress(Path(str(path) + '.gz').read_bytes()) == b'bb'
+
+    def test_disabled_removes_stale(self, tmp_path: Path) -> None:
+        """compression was turned off, so changed pages lose their siblings"""
+        same = tmp_path / 'a.html'
+        changed = tmp_path / 'b.html'
+        same.write_text('a')
+        changed.write_text('b')
+        entries = compress.refresh({}, [str(same), str(changed)], True)
+
+        changed.write_text('bb')
+        entries = compress.refresh(entries, [], False)
+
+        assert set(entries) == {str(same)}
+        assert os.path.exists(str(same) + '.gz')
+        assert not os.path.exists(str(changed) + '.gz')
+
+    def test_removed_source(self, tmp_path: Path) -> None:
+        path = tmp_path / 'a.html'
+        path.write_text('a')
+        entries = compress.refresh({}, [str(path)], True)
+
+        path.unlink()
+
+        assert compress.refresh(entries, [], True) == {}
+        assert not os.path.exists(str(path) + '.gz')
@@ -0,0 +1,149 @@
+import base64
+import os
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from diving import detective
+from diving.util import taxonomy
+from diving.util.image import Image
+from diving.util.similarity import similarity
+
+
+class TestDetective:
+    """detective.py"""
+
+    def test_similarity_table(self) -> None:
+        """the vectorized table matches the pairwise similarity function"""
+        tree = taxonomy.mapping()
+        names = ['caribbean reef octopus', 'giant pacific octopus', 'red octopus']
+        table = detective._similarity_table(detective._similarity_matrix(names))
+
+        assert [len(row) for row in table] == [1, 2, 3]
+        for i, row in enumerate(table):
+            assert row[i] == 0
+            for j, score in enumerate(row[:i]):
+                expected = int(similarity(tree[names[i]], tree[names[j]]) * 100)
+                assert score == expected
+
+    def test_table_builder(self) -> None:
+        images = [
+            Image('001 - Red Octopus.jpg', '2023-01-01 Rockaway Beach'),
+            Image('002 - Giant Pacific Octopus.jpg', '2023-01-01 Rockaway Beach'),
+            Image('003 - Red Octopus.jpg', '2023-01-01 Rockaway Beach'),
+            Image('004 - Juvenile Red Octopus.jpg', '2023-01-01 Rockaway Beach'),
+        ]
+        names, thumbs, similarities, difficulties, pools = detective.table_builder(images)
+
+        assert names == ['Giant Pacific Octopus', 'Red Octopus']
+        assert [len(t) for t in thumbs] == [1, 2]
+        assert len(similarities) == 2
+        assert len(difficulties) == 2
+        assert pools == [[[1]] * 5, [[0]] * 5]
+
+    def test_distractor_pools_bands(self) -> None:
+        """candidates fall within each difficulty's similarity band"""
+        matrix = np.array(
+            [
+                [0, 10, 40, 60, 90],
+                [10, 0, 10, 10, 10],
+                [40, 10, 0, 10, 10],
+                [60, 10, 10, 0, 10],
+                [90, 10, 10, 10, 0],
+            ]
+        )
+        pools = detective._distractor_pools(matrix, list('abcde'))
+
+        assert pools[0][0] == [1]
+        assert pools[0][1] == [2]
+        assert pools[1][0] == [0, 2, 3, 4]
+
+    def test_distractor_pools_widen(self) -> None:
+        """bands are relaxed until there are enough candidates"""
+        matrix = np.array(
+            [
+                [0, 60, 62, 64, 66, 68, 72, 74, 100],
+                *[[60] + [0] * 8] * 8,
+            ]
+        )
+        pools = detective._distractor_pools(matrix, list('abcdefghi'))
+
+        # very hard needs 7 distractors between 80 and 100, only one exists
+        assert len(pools[0][4]) >= detective.OPTION_COUNTS[4] - 1
+        assert 8 in pools[0][4]
+
+    def test_distractor_pools_sampled(self) -> None:
+        size = detective.POOL_SIZE * 2
+        matrix = np.zeros((size, size), dtype=int)
+        names = [str(i) for i in range(size)]
+
+        pools = detective._distractor_pools(matrix, names)
+        assert len(pools[0][0]) == detective.POOL_SIZE
+        assert pools == detective._distractor_pools(matrix, names)
+
+    def test_varints(self) -> None:
+        assert detective._varints([0, 4, 127]) == bytes([0, 4, 127])
+        assert detective._varints([128, 300]) == bytes([0x80, 0x01, 0xAC, 0x02])
+
+    def test_pack_similarities(self) -> None:
+        packed = detective._pack_similarities([[0], [40, 0], [90, 12, 0]])
+        assert base64.b64decode(packed) == bytes([0, 40, 0, 90, 12, 0])
+
+    def test_pack_thumbs(self) -> None:
+        hashes, refs = detective._pack_thumbs([['aa', 'bb'], ['cc', 'aa'], []])
+        assert hashes == 'aa,bb,cc'
+        assert base64.b64decode(refs) == bytes([2, 0, 1, 2, 2, 0, 0])
+
+    def test_write_data_js_packed(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.chdir(tmp_path)
+        os.mkdir('detective')
+        images = [
+            Image('001 - Red Octopus.jpg', '2023-01-01 Rockaway Beach'),
+            Image('002 - Giant Pacific Octopus.jpg', '2023-01-01 Rockaway Beach'),
+        ]
+
+        detective._write_data_js(detective.table_builder(images), 'main')
+        content = (tmp_path / 'detective' / 'main.js').read_text()
+
+        assert "var main_names = ['Giant Pacific Octopus', 'Red Octopus']" in content
+        assert "var main_hashes = 'test'" in content
+        assert "var main_thumbs = 'AQABAA=='" in content
+
+    def test_master_matrix_slicing(self) -> None:
+        """slicing the shared matrix matches building a dataset from scratch"""
+        names = ['caribbean reef octopus', 'giant pacific octopus', 'red octopus']
+        master = detective._master_matrix(names)
+        images = [
+            Image('001 - Red Octopus.jpg', '2023-01-01 Rockaway Beach'),
+            Image('002 - Caribbean Reef Octopus.jpg', '2023-01-01 Rockaway Beach'),
+        ]
+        assert detective.table_builder(images, master) == detective.table_builder(images)
+
+    def test_datasets(self) -> None:
+        north = [f'north {i}' for i in range(8)]
+        south = [f'south {i}' for i in range(8)]
+        images = [Image(f'00{i} - Fish.jpg', '2023-01-01 Rockaway Beach') for i in range(8)]
+        images += [Image(f'00{i} - Fish.jpg', '2023-01-02 Playa Grandi') for i in range(8)]
+
+        datasets = detective._datasets(north + south, images)
+        assert set(datasets) == {'main', 'pacific_northwest', 'caribbean'}
+
+        assert datasets['main'] == (north + south, images)
+        assert datasets['pacific_northwest'] == (north, images[:8])
+        assert datasets['caribbean'] == (south, images[8:])
+
+    def test_datasets_too_small(self) -> None:
+        images = [Image('001 - Lingcod.jpg', '2023-01-01 Rockaway Beach')] * 10
+        datasets = detective._datasets(['lingcod'] * 10, images)
+        assert not datasets
+
+    def test_html_builder_datasets(self) -> None:
+        data = {'main': 'detective/main-1.js', 'caribbean': 'detective/caribbean-2.js'}
+        html = detective._html_builder('style.css', 'detective/game.js', data)
+
+        assert '<script src="/detective/main-1.js"></script>' in html
+        assert '"caribbean": "/detective/caribbean-2.js"' in html
+        assert '<option value="caribbean">Caribbean</option>' in html
+        assert 'pacific_northwest' not in html
+        assert '<option value="reef">' not in html
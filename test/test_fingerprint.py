@@ -0,0 +1,50 @@
+from pathlib import Path
+
+from diving.util.fingerprint import Fingerprints
+
+
+class TestFingerprints:
+    """Skipping pages with unchanged inputs."""
+
+    def test_first_build(self, tmp_path: Path) -> None:
+        """nothing to compare against, everything is rendered"""
+        path = tmp_path / 'a.html'
+        path.write_text('a')
+
+        fingerprints = Fingerprints()
+        assert not fingerprints.unchanged(str(path), 'title', ['image'])
+        assert str(path) in fingerprints.current
+
+    def test_unchanged(self, tmp_path: Path) -> None:
+        path = str(tmp_path / 'a.html')
+        Path(path).write_text('a')
+
+        before = Fingerprints()
+        before.unchanged(path, 'title', ['image'])
+
+        after = Fingerprints()
+        after.previous = before.take()
+        assert after.unchanged(path, 'title', ['image'])
+        assert not after.unchanged(path, 'title', ['image', 'new image'])
+
+    def test_missing_output(self, tmp_path: Path) -> None:
+        """the page was deleted, so it's rendered again"""
+        path = str(tmp_path / 'a.html')
+
+        before = Fingerprints()
+        before.unchanged(path, 'title')
+
+        after = Fingerprints()
+        after.previous = before.take()
+        assert not after.unchanged(path, 'title')
+
+    def test_merge(self) -> None:
+        worker = Fingerprints()
+        worker.unchanged('a.html', 1)
+
+        parent = Fingerprints()
+        parent.unchanged('b.html', 2)
+        parent.merge(worker.take())
+
+        assert worker.current == {}
+        assert set(parent.current) == {'a.html', 'b.html'}
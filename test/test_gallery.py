@@ -1,8 +1,14 @@
+import json
+import os
 import re
+from pathlib import Path
 
-from diving import gallery
+import pytest
+
+from diving import gallery, hypertext
 from diving.hypertext import Where
-from diving.util import collection, taxonomy
+from diving.util import collection, fingerprint, log, taxonomy
+from diving.util.fingerprint import Fingerprints, fingerprints
 from diving.util.image import Image
 from diving.util.similarity import similarity
 from diving.util.taxonomy import MappingType
@@ -113,16 +119,118 @@ class TestGallery:
         """basics"""
         tree = collection.build_image_tree()
         sub_tree = tree['coral']
-        htmls = gallery.html_tree(sub_tree, Where.Gallery, g_scientific, ['coral'])  # type: ignore[arg-type]
+        htmls = list(gallery.html_tree(sub_tree, Where.Gallery, g_scientific, ['coral']))  # type: ignore[arg-type]
 
         assert htmls != []
         (path, html) = htmls[-1]
 
         assert path == 'gallery/coral.html'
+        assert html is not None
         assert re.search(r'(?s)<head>.*<title>.*Coral.*</title>.*</head>', html)
         assert re.search(r'(?s)<h3.*Fan.*</h3>', html)
         assert re.search(r'(?s)<h3.*Rhizopsammia wellingtoni.*</h3>', html)
 
+    def test_html_paged_examples(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        """heavy pages inline the first images and load the rest in chunks"""
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setattr(hypertext, '_caption_html', lambda image: image.name)
+        monkeypatch.setattr(hypertext, '_fragments', {})
+        monkeypatch.setitem(fingerprints.current, 'gallery/blue-fish.html', 'abcdef0123456789')
+
+        count = gallery.PAGE_LIMIT + 1
+        images = [
+            Image(f'{i:03} - Blue Fish.jpg', '2023-01-01 Rockaway Beach') for i in range(count)
+        ]
+        folder = tmp_path / 'more' / 'gallery' / 'blue-fish'
+
+        html, pages = gallery.html_paged_examples('gallery/blue-fish.html', images, 'everything')
+
+        assert html.count('<a class="thumb"') == gallery.PAGE_IMAGES
+        assert 'href="/more/gallery/blue-fish/all.html"' in html
+        assert pages[-1] == ('more/gallery/blue-fish/all.html', 'everything')
+
+        # nothing is written here, the pages go through the writer
+        assert os.listdir(folder) == []
+
+        match = re.search(r'data-chunks="([^"]*)"', html)
+        assert match
+        chunks = match.group(1).split()
+        assert chunks == [f'/{path}' for path, _ in pages[:-1]]
+        assert chunks[0] == '/more/gallery/blue-fish/abcdef0123-1.json'
+
+        loaded = sum(len(json.loads(body)) for _, body in pages[:-1])
+        assert loaded == count - gallery.PAGE_IMAGES
+
+        # the same paths can be listed without rendering
+        paths = gallery.paged_paths('gallery/blue-fish.html', images)
+        assert paths == [path for path, _ in pages]
+
+    def test_sweep_paged(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        """what's under more/ and wasn't produced this build is removed"""
+        monkeypatch.chdir(tmp_path)
+        folder = tmp_path / 'more' / 'gallery' / 'blue-fish'
+        gone = tmp_path / 'more' / 'gallery' / 'gray-fish'
+        folder.mkdir(parents=True)
+        gone.mkdir(parents=True)
+
+        for name in ('new-1.json', 'all.html', 'all.html.gz', 'old-1.json', 'old-1.json.gz'):
+            (folder / name).write_text('')
+        (gone / 'all.html').write_text('')
+        (gone / 'all.html.gz').write_text('')
+
+        gallery.sweep_paged(
+            ['more/gallery/blue-fish/new-1.json', 'more/gallery/blue-fish/all.html']
+        )
+
+        assert sorted(os.listdir(folder)) == ['all.html', 'all.html.gz', 'new-1.json']
+        assert not gone.exists()
+
+        gallery.sweep_paged([])
+        assert not (tmp_path / 'more').exists()
+
+    def test_html_tree_unchanged(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        """an unchanged page isn't rendered at all, and each subtree is only read once"""
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setattr(hypertext, '_caption_html', lambda image: image.name)
+        monkeypatch.setattr(hypertext, '_fragments', {})
+        monkeypatch.setattr(Image, 'hashed', lambda self: self.label)
+        monkeypatch.setattr(gallery, 'fingerprints', Fingerprints())
+        monkeypatch.setattr(log, 'lookup', lambda dive: None)
+        monkeypatch.setattr(log, 'digest', lambda dive: '')
+        (tmp_path / 'gallery').mkdir()
+
+        reads: list[Image] = []
+        images = fingerprint.images
+
+        def counted(xs: list[Image]) -> list[tuple[str, ...]]:
+            reads.extend(xs)
+            return images(xs)
+
+        monkeypatch.setattr(fingerprint, 'images', counted)
+
+        tree = {
+            'blue': {'data': [Image('001 - Blue Fish.jpg', '2023-01-01 Rockaway Beach')]},
+            'gray': {'data': [Image('002 - Gray Fish.jpg', '2023-01-01 Rockaway Beach')]},
+        }
+        pages = list(gallery.html_tree(tree, Where.Gallery, g_scientific, ['fish']))  # type: ignore[arg-type]
+        assert [path for path, _ in pages] == [
+            'gallery/blue-fish.html',
+            'gallery/gray-fish.html',
+            'gallery/fish.html',
+        ]
+        assert len(reads) == 2
+
+        for path, html in pages:
+            assert html is not None
+            Path(path).write_text(html)
+
+        gallery.fingerprints.previous = gallery.fingerprints.take()
+        monkeypatch.setattr(hypertext, 'title', None)
+        monkeypatch.setattr(gallery, 'get_info', None)
+
+        again = list(gallery.html_tree(tree, Where.Gallery, g_scientific, ['fish']))  # type: ignore[arg-type]
+        assert again == [(path, None) for path, _ in pages]
+
     def test_taxonomy_distance(self) -> None:
         """similarity score based on shared taxonomy path"""
         chiton = 'Animalia Mollusca Polyplacophora Chitonida Mopaliidae Dendrochiton flectens'
@@ -0,0 +1,86 @@
+from pathlib import Path
+
+import pytest
+
+from diving import generate
+from diving.generate import PageWriter
+from diving.hypertext import Where
+from diving.util.metrics import Metrics
+
+
+class TestPageWriter:
+    """Streaming page writes."""
+
+    def test_writes_and_returns_paths(self, tmp_path: Path) -> None:
+        pages = [(str(tmp_path / f'{i}.html'), f'<p>{i}</p>') for i in range(20)]
+
+        with PageWriter(pending=4) as writer:
+            paths = writer.write(iter(pages))
+            writer.wait()
+
+        assert paths == [path for path, _ in pages]
+        for path, html in pages:
+            assert Path(path).read_text() == html
+
+    def test_failures_raised(self, tmp_path: Path) -> None:
+        pages = [(str(tmp_path / 'missing' / 'a.html'), 'x')]
+
+        with PageWriter() as writer:
+            writer.write(pages)
+            with pytest.raises(FileNotFoundError):
+                writer.wait()
+
+
+g_tree = {
+    'a': {'x': {'data': [1, 2, 3]}, 'y': {'data': [4]}},
+    'b': {'data': [5]},
+}
+
+
+class TestForked:
+    """Splitting the trees between worker processes."""
+
+    def test_partition(self) -> None:
+        generate._sections[Where.Taxonomy] = (g_tree, {}, None)  # type: ignore[assignment]
+        try:
+            expanded, leaves = generate._partition(Where.Taxonomy, 3)
+        finally:
+            generate._sections.clear()
+
+        assert expanded == [(), ('a',)]
+        assert leaves == [('b',), ('a', 'x'), ('a', 'y')]
+
+    def test_page_order(self) -> None:
+        """the same order html_tree would produce, children before parents"""
+        where = Where.Taxonomy
+        upper = {(where, ()): 'root', (where, ('a',)): 'a'}
+        lower = {
+            (where, ('a', 'x')): ['a x'],
+            (where, ('a', 'y')): ['a y'],
+            (where, ('b',)): ['b'],
+        }
+
+        generate._sections[where] = (g_tree, {}, None)  # type: ignore[assignment]
+        try:
+            order = list(generate._page_order((where, ()), upper, lower))
+        finally:
+            generate._sections.clear()
+
+        assert order == ['a x', 'a y', 'a', 'b', 'root']
+
+
+class TestMetrics:
+    """Metrics from other processes."""
+
+    def test_take_and_merge(self) -> None:
+        worker = Metrics()
+        worker.counter('pages', 2)
+        worker.record('odd', 'a')
+
+        parent = Metrics()
+        parent.counter('pages', 3)
+        parent.record('odd', 'b')
+        parent.merge(worker.take())
+
+        assert worker.data == {}
+        assert parent.data == {'pages': 5, 'odd': {'a', 'b'}}
@@ -2,7 +2,8 @@ import pytest
 
 from diving import hypertext
 from diving.hypertext import Side, Where
-from diving.util import taxonomy
+from diving.util import collection, taxonomy
+from diving.util.image import Image
 from diving.util.taxonomy import MappingType
 
 g_scientific = taxonomy.mapping()
@@ -156,6 +157,10 @@ class TestHypertext:
         html, title = hypertext.title([], Where.Gallery, g_scientific)
         assert 'input type="text"' in html
 
+    def test_top_versioned_search_data(self) -> None:
+        html, _ = hypertext.title([], Where.Sites, g_scientific, 'search-data-0123456789.js')
+        assert '<script src="/search-data-0123456789.js" defer></script>' in html
+
 
 class TestTitleGallery:
     def test_title_ordinary(self) -> None:
@@ -267,3 +272,39 @@ class TestTitleSites:
     def test_get_date(self, expected: str, lineage: list[str]) -> None:
         title = hypertext.SitesTitle(Where.Sites, lineage, t_scientific)
         assert title.get_date() == expected
+
+
+class TestDirectImage:
+    """Image fragments are shared between sections"""
+
+    def test_reused(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        captions: list[Image] = []
+
+        def caption(image: Image) -> str:
+            captions.append(image)
+            return image.name
+
+        monkeypatch.setattr(hypertext, '_caption_html', caption)
+        monkeypatch.setattr(hypertext, '_fragments', {})
+
+        image = Image('001 - Fish.jpg', '2021-01-01 1 Rockaway Beach')
+        first = hypertext.html_direct_image(image, lazy=True)
+        assert hypertext.html_direct_image(image, lazy=True) is first
+        assert len(captions) == 1
+
+        eager = hypertext.html_direct_image(image, lazy=False)
+        assert 'loading="lazy"' in first
+        assert 'loading="lazy"' not in eager
+        assert len(captions) == 2
+
+    def test_split_subjects(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """the halves of 'a and b' share an identifier but not a fragment"""
+        monkeypatch.setattr(hypertext, '_caption_html', lambda image: image.name)
+        monkeypatch.setattr(hypertext, '_fragments', {})
+
+        image = Image('001 - Shark and Remora.jpg', '2021-01-01 1 Rockaway Beach')
+        left, right = collection.expand_names([image])
+        assert left.identifier() == right.identifier()
+
+        assert 'alt="Shark"' in hypertext.html_direct_image(left, lazy=True)
+        assert 'alt="Remora"' in hypertext.html_direct_image(right, lazy=True)
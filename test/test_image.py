@@ -166,3 +166,29 @@ class TestImage:
         # Also test with position slightly beyond
         result = image._depth_at(depths, 0.95)
         assert result == 50
+
+
+class TestDiveDirectory:
+    """parsed dive folder names"""
+
+    def test_parts(self) -> None:
+        dive = image.dive_directory('2021-12-16 2 Fort Worden')
+        assert dive.when == '2021-12-16'
+        assert dive.ordinal == 2
+        assert dive.site == 'Fort Worden'
+        assert dive.location == '2021-12-16 Fort Worden'
+        assert dive.date.year == 2021
+        assert dive.pretty_date == 'December 16th, 2021'
+        assert dive.region == 'Washington'
+        assert dive.sites_link == '/sites/Washington-Fort-Worden-2021-12-16'
+
+    def test_no_ordinal(self) -> None:
+        dive = image.dive_directory('2023-01-01 Fort Ward')
+        assert dive.ordinal is None
+        assert dive.site == 'Fort Ward'
+
+    def test_shared(self) -> None:
+        """every image in a folder has the same record"""
+        first = image.Image('001 - Fish.jpg', '2021-01-01 1 Rockaway Beach')
+        second = image.Image('002 - Crab.jpg', '2021-01-01 1 Rockaway Beach')
+        assert first.dive is second.dive
@@ -0,0 +1,14 @@
+from diving import imprecise
+
+
+class TestImprecise:
+    """imprecise.py"""
+
+    def test_longer_variants(self) -> None:
+        names = ['crab', 'hermit crab', 'red hermit crab', 'rockcrab', 'fish']
+        assert imprecise.longer_variants(names) == {'crab', 'hermit crab'}
+
+    def test_longer_variants_whole_words(self) -> None:
+        """'star' isn't imprecise because of 'rockstar', only 'rock star'"""
+        assert imprecise.longer_variants(['star', 'rockstar']) == set()
+        assert imprecise.longer_variants(['star', 'rock star']) == {'star'}
@@ -0,0 +1,118 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from diving import hypertext
+from diving.util.image import Image
+from diving.util.links import Links, internal
+
+g_page = """
+<link rel="stylesheet" href="/style-1234.css">
+<a href="/gallery/fish">Fish</a>
+<a href="/gallery/">Gallery</a>
+<a href="https://diving.anardil.net/sites/reef">Reef</a>
+<a href="https://en.wikipedia.org/wiki/Fish">Wikipedia</a>
+<img src="/imgs/abc.webp">
+<a href="/gallery/fish">Fish, again</a>
+"""
+
+
+class TestLinks:
+    """Links recorded while rendering."""
+
+    def test_internal(self) -> None:
+        """other sites are skipped, this one is relative to the root"""
+        assert list(internal(g_page)) == [
+            'style-1234.css',
+            'gallery/fish',
+            'gallery/',
+            'sites/reef',
+            'imgs/abc.webp',
+            'gallery/fish',
+        ]
+
+    def test_add(self) -> None:
+        """each link is kept once, unrendered pages keep their last links"""
+        graph = Links()
+        graph.previous = {'gallery/old.html': ['gallery/fish']}
+        graph.add('gallery/index.html', g_page)
+        graph.add('gallery/old.html', None)
+        graph.add('gallery/new.html', None)
+
+        assert graph.pages['gallery/index.html'] == [
+            'style-1234.css',
+            'gallery/fish',
+            'gallery/',
+            'sites/reef',
+            'imgs/abc.webp',
+        ]
+        assert graph.pages['gallery/old.html'] == ['gallery/fish']
+        assert graph.pages['gallery/new.html'] == []
+
+    def test_merge(self) -> None:
+        worker = Links()
+        worker.add('gallery/a.html', '')
+
+        parent = Links()
+        parent.add('gallery/b.html', '')
+        parent.merge(worker.take())
+
+        assert worker.pages == {}
+        assert set(parent.pages) == {'gallery/a.html', 'gallery/b.html'}
+
+    def test_broken(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        """pages are found among those generated, anything else on disk"""
+        monkeypatch.chdir(tmp_path)
+        Path('style-1234.css').touch()
+        Path('imgs').mkdir()
+        Path('imgs/abc.webp').touch()
+
+        graph = Links()
+        graph.add('gallery/index.html', g_page)
+        graph.add('gallery/fish.html', '<a href="/sites/wreck">Wreck</a>')
+
+        assert graph.broken() == [
+            'broken sites/wreck in gallery/fish.html',
+            'broken sites/reef in gallery/index.html',
+        ]
+
+    def test_broken_every_link(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        """not just the first link on each page"""
+        monkeypatch.chdir(tmp_path)
+
+        graph = Links()
+        graph.add('gallery/index.html', '<a href="/gallery/index.html"><a href="/nowhere">')
+        assert graph.broken() == ['broken nowhere in gallery/index.html']
+
+    def test_internal_skips_other_links(self) -> None:
+        """fragments, other schemes and other hosts aren't pages on this site"""
+        html = (
+            '<a href="#video_1"><a href="mailto:a@b.c"><img src="data:image/png;base64,AA">'
+            '<a href="javascript:void(0)"><script src="//cdn.example.com/x.js"></script>'
+            '<a href="https://diving.anardil.net.example.com/x"><a href="/sites/reef#top">'
+        )
+        assert list(internal(html)) == ['sites/reef']
+
+    def test_broken_video(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        """a video's thumbnail links to the video element on the same page"""
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setattr(hypertext, '_caption_html', lambda image: image.name)
+        video = Image('001 - Fish.mov', '2023-01-01 1 Rockaway Beach')
+        html = hypertext.html_direct_image(video, lazy=False)
+        assert 'href="#video_' in html
+
+        graph = Links()
+        graph.add('timeline/x.html', html)
+        assert not any(link.startswith('video_') for link in graph.pages['timeline/x.html'])
+        for link in graph.pages['timeline/x.html']:
+            Path(link).parent.mkdir(parents=True, exist_ok=True)
+            Path(link).touch()
+
+        assert graph.broken() == []
+
+    def test_add_chunk(self) -> None:
+        """a heavy page's chunks are JSON lists of html"""
+        graph = Links()
+        graph.add('more/gallery/fish/abc-1.json', json.dumps(['<img src="/imgs/a.webp">']))
+        assert graph.pages['more/gallery/fish/abc-1.json'] == ['imgs/a.webp']
@@ -101,6 +101,21 @@ class TestLocations:
     def test_where_to_words(self, before: str, expected: list[str]) -> None:
         assert locations.where_to_words(before) == expected
 
+    def test_get_region_unknown(self) -> None:
+        assert locations.get_subregion('Nowhere In Particular') is None
+        with pytest.raises(AssertionError):
+            locations.get_region('Nowhere In Particular')
+
+    def test_trie_prefixes(self) -> None:
+        trie = locations._Trie()
+        trie.add('Sund', 1)
+        trie.add('Sund Rock', 2)
+        trie.add('Sund', 3)
+        trie.add('Rock', 4)
+
+        assert list(trie.prefixes('Sund Rock South Wall')) == [(4, 1), (9, 2)]
+        assert list(trie.prefixes('Sun')) == []
+
     def test_region_year_ranges(self) -> None:
         ranges = locations._region_year_ranges()
 
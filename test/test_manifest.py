@@ -0,0 +1,63 @@
+import os
+from pathlib import Path
+
+from diving.util.manifest import Manifest
+
+
+class TestManifest:
+    """Skipping writes of pages already on disk."""
+
+    def test_writes(self, tmp_path: Path) -> None:
+        path = str(tmp_path / 'a.html')
+
+        manifest = Manifest()
+        manifest.write(path, 'café')
+
+        assert Path(path).read_text() == 'café'
+        assert path in manifest.entries
+
+    def test_unchanged_not_written(self, tmp_path: Path) -> None:
+        path = str(tmp_path / 'a.html')
+
+        before = Manifest()
+        before.write(path, 'a')
+        mtime = os.stat(path).st_mtime_ns
+
+        after = Manifest()
+        after.merge(before.take())
+        after.write(path, 'a')
+
+        assert os.stat(path).st_mtime_ns == mtime
+        assert after.take() == {}
+
+    def test_changed_written(self, tmp_path: Path) -> None:
+        path = str(tmp_path / 'a.html')
+
+        manifest = Manifest()
+        manifest.write(path, 'a')
+        manifest.write(path, 'b')
+
+        assert Path(path).read_text() == 'b'
+
+    def test_modified_outside(self, tmp_path: Path) -> None:
+        """the file was touched since, so the disk is checked"""
+        path = tmp_path / 'a.html'
+
+        manifest = Manifest()
+        manifest.write(str(path), 'a')
+
+        path.write_text('x')
+        os.utime(path, ns=(0, 0))
+        manifest.write(str(path), 'a')
+
+        assert path.read_text() == 'a'
+
+    def test_unknown_matching(self, tmp_path: Path) -> None:
+        """no manifest, but the file already has this content"""
+        path = tmp_path / 'a.html'
+        path.write_text('a')
+
+        manifest = Manifest()
+        manifest.write(str(path), 'a')
+
+        assert set(manifest.take()) == {str(path)}
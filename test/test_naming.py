@@ -0,0 +1,66 @@
+from diving.util import naming
+from diving.util.image import Image
+from diving.util.metrics import metrics
+
+g_images = [
+    Image('001 - Lingcod.jpg', '2021-01-01 1 Rockaway Beach'),
+    Image('002 - Lingcod.jpg', '2021-01-01 1 Rockaway Beach'),
+    Image('003 - Hermit Crab.jpg', '2021-01-01 1 Rockaway Beach'),
+    Image('004 - Hairy Hermit Crab.jpg', '2021-01-01 1 Rockaway Beach'),
+    Image('005 - Crab.jpg', '2021-01-01 1 Rockaway Beach'),
+    Image('006 - Orange Pulp Crab.jpg', '2021-01-01 1 Rockaway Beach'),
+]
+
+
+class TestNaming:
+    """naming.py"""
+
+    def test_build_table(self) -> None:
+        table = naming.build_table(g_images)
+        assert set(table) == {
+            'lingcod',
+            'hermit crab',
+            'hairy hermit crab',
+            'crab',
+            'orange pulp crab',
+        }
+        assert table['lingcod'].images == 2
+
+    def test_complete(self) -> None:
+        """an exact entry, down to the species"""
+        entry = naming.build_table(g_images)['lingcod']
+        assert entry.exact
+        assert entry.complete
+        assert entry.scientific.endswith('Ophiodon elongatus')
+
+    def test_incomplete(self) -> None:
+        """an exact entry that stops at the family"""
+        entry = naming.build_table(g_images)['hermit crab']
+        assert entry.exact
+        assert not entry.complete
+
+    def test_closest(self) -> None:
+        """without an exact entry, fewer words are tried"""
+        entry = naming.build_table(g_images)['hairy hermit crab']
+        assert not entry.exact
+        assert not entry.complete
+        assert entry.scientific.endswith('Paguridae sp.')
+
+    def test_no_taxonomy(self) -> None:
+        table = naming.build_table(g_images)
+        assert table['crab'].no_taxonomy
+        assert not table['crab'].exact
+        assert not table['orange pulp crab'].no_taxonomy
+        assert table['orange pulp crab'].scientific == ''
+
+    def test_metrics_untouched(self) -> None:
+        """names without taxonomy are only reported by the pages that use them,
+        and what other threads record meanwhile isn't swapped out
+        """
+        metrics.take()
+        metrics.counter('before')
+        recording = metrics.data
+
+        naming.build_table(g_images)
+        assert metrics.data is recording
+        assert metrics.take() == {'before': 1}
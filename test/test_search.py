@@ -0,0 +1,41 @@
+from diving import search
+
+
+class TestSearch:
+    """Search index shards."""
+
+    def test_tokens(self) -> None:
+        """words, and the pieces of compound words as search.js splits them"""
+        assert list(search.tokens('Red Lionfish')) == ['red', 'lionfish', 'lion', 'fish']
+        assert list(search.tokens("Heath's  Stingray")) == ['heaths', 'stingray', 'sting', 'ray']
+        assert list(search.tokens('fish')) == ['fish']
+
+    def test_tokens_two_splits(self) -> None:
+        """only the first split in static.yml is used, as search.js does"""
+        assert list(search.tokens('Pennant Coralfish')) == ['pennant', 'coralfish']
+        assert list(search.tokens('Wormfish')) == ['wormfish', 'worm', 'fish']
+        assert list(search.tokens('Rockfishworm')) == ['rockfishworm', 'rock', 'fishworm']
+
+    def test_search_data_splits(self) -> None:
+        """search.js splits queries with the same list"""
+        script = search._search_data({})
+        assert script.startswith('var search_index = {};\n')
+        assert 'var search_splits = ["chiton","coral","fish",' in script
+
+    def test_build_index(self) -> None:
+        names = ['Red Lionfish', 'Blue Tang', 'Bluespine Unicornfish']
+        shards = search.build_index(names)
+
+        assert sorted(shards) == ['b', 'f', 'l', 'r', 't', 'u']
+
+        pages, tokens = shards['f']
+        assert pages == ['Bluespine Unicornfish', 'Red Lionfish']
+        assert tokens == [('fish', [1, 0])]
+
+        pages, tokens = shards['b']
+        assert [token for token, _ in tokens] == ['blue', 'bluespine']
+        assert [pages[i] for i in dict(tokens)['blue']] == ['Blue Tang']
+
+    def test_cleaner(self) -> None:
+        pages = ['gallery/index.html', 'gallery/blue-tang.html', 'sites/Reef-2021-03-06.html']
+        assert list(search._cleaner(pages)) == ['blue tang', 'Reef 2021-03-06']
@@ -1,4 +1,4 @@
-from diving.util.similarity import similarity
+from diving.util.similarity import encode_lineages, similarity, similarity_matrix
 
 
 class TestSimilarity:
@@ -46,3 +46,37 @@ class TestSimilarity:
         assert similarity('', 'a b c') == 0.0
         assert similarity('a b c', '') == 0.0
         assert similarity('', '') == 0.0
+
+
+class TestSimilarityMatrix:
+    """Vectorized similarity_matrix() must agree with similarity()."""
+
+    lineages = (
+        'a b c d',
+        'a b c x',
+        'x b c d',
+        'a b',
+        'a',
+        'a b c d e f',
+        'd e f',
+        '',
+    )
+
+    def test_matches_scalar(self) -> None:
+        matrix = similarity_matrix(self.lineages)
+
+        for i, a in enumerate(self.lineages):
+            for j, b in enumerate(self.lineages):
+                assert matrix[i, j] == int(similarity(a, b) * 100), (a, b)
+
+    def test_symmetric(self) -> None:
+        matrix = similarity_matrix(self.lineages)
+        assert (matrix == matrix.T).all()
+
+    def test_encode_lineages(self) -> None:
+        encoded, lengths = encode_lineages(['a b', 'a c d'])
+        assert encoded.tolist() == [[0, 1, -1], [0, 2, 3]]
+        assert lengths.tolist() == [2, 3]
+
+    def test_empty(self) -> None:
+        assert similarity_matrix([]).shape == (0, 0)
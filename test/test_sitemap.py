@@ -0,0 +1,68 @@
+import gzip
+import os
+from pathlib import Path
+
+import pytest
+
+from diving.util import sitemap
+from diving.util.image import Image
+from diving.util.sitemap import Sitemap
+
+
+def fish() -> list[Image]:
+    """an image and a video, created after the test database is in place"""
+    return [
+        Image('001 - Fish.jpg', '2021-01-01 1 Rockaway Beach'),
+        Image('002 - Fish.mov', '2021-01-01 1 Rockaway Beach'),
+    ]
+
+
+class TestSitemap:
+    """Image sitemap shards."""
+
+    def test_add(self) -> None:
+        """videos aren't included, and each image is listed once"""
+        pages = Sitemap()
+        pages.add('gallery/fish.html', fish() + fish())
+        assert pages.pages == {'gallery/fish.html': ['/imgs/test.webp']}
+
+    def test_merge(self) -> None:
+        worker = Sitemap()
+        worker.add('gallery/a.html', [])
+
+        parent = Sitemap()
+        parent.add('gallery/b.html', [])
+        parent.merge(worker.take())
+
+        assert worker.pages == {}
+        assert set(parent.pages) == {'gallery/a.html', 'gallery/b.html'}
+
+    def test_write(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setattr(sitemap, 'SHARD_URLS', 2)
+        Path('sitemap-9.xml.gz').write_bytes(b'stale')
+
+        pages = Sitemap()
+        for name in ('gallery/index.html', 'gallery/fish.html', 'sites/reef.html'):
+            pages.add(name, fish())
+        pages.write()
+
+        assert sorted(os.listdir()) == ['sitemap-1.xml.gz', 'sitemap-2.xml.gz', 'sitemap.xml']
+        index = Path('sitemap.xml').read_text()
+        assert '<loc>https://diving.anardil.net/sitemap-2.xml.gz</loc>' in index
+
+        first = gzip.decompress(Path('sitemap-1.xml.gz').read_bytes()).decode()
+        assert '<loc>https://diving.anardil.net/gallery/</loc>' in first
+        assert '<loc>https://diving.anardil.net/gallery/fish</loc>' in first
+        assert '<image:loc>https://diving.anardil.net/imgs/test.webp</image:loc>' in first
+
+    def test_unchanged_not_written(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.chdir(tmp_path)
+
+        pages = Sitemap()
+        pages.add('gallery/fish.html', fish())
+        pages.write()
+        os.utime('sitemap-1.xml.gz', ns=(0, 0))
+
+        pages.write()
+        assert os.stat('sitemap-1.xml.gz').st_mtime_ns == 0
@@ -1,13 +1,23 @@
+import json
 from datetime import datetime
+from typing import Any
 
+import pytest
+
+from diving import stats as stats_module
 from diving.stats import (
+    StatsAccumulator,
+    build_density,
     build_distribution,
     build_distributions,
     build_location_stats,
     build_records,
     build_stats_bundle,
     build_totals,
+    svg_density,
+    svg_histogram,
 )
+from diving.util import database
 from diving.util.image import dive_to_location
 
 
@@ -135,6 +145,22 @@ class TestBuildDistribution:
         assert counts == [1, 0, 0, 0, 1]
 
 
+class TestSvgHistogram:
+    def test_empty(self) -> None:
+        assert svg_histogram([], '#fff') == '<p>No data available</p>'
+
+    def test_bars(self) -> None:
+        svg = svg_histogram([[20, 30, 4], [30, 40, 0], [40, 50, 2]], '#4a90d9')
+
+        assert svg.startswith('<svg') and svg.endswith('</svg>')
+        assert svg.count('<title>') == 3
+        assert '<title>20–30: 4</title>' in svg
+        # the largest bucket fills the track, the others are in proportion
+        assert 'width="280.0" height="20" rx="4" fill="#4a90d9"' in svg
+        assert 'width="140.0" height="20" rx="4" fill="#4a90d9"' in svg
+        assert 'width="0.0" height="20" rx="4" fill="#4a90d9"' in svg
+
+
 class TestBuildDistributions:
     def test_all_distributions(self) -> None:
         dives = [
@@ -185,6 +211,34 @@ class TestBuildDistributions:
         assert total_air_count == 1
 
 
+class TestBuildDensity:
+    def test_empty(self) -> None:
+        assert build_density([make_dive()])['grid'] == []
+
+    def test_minutes_at_depth(self) -> None:
+        # a waypoint every 10 minutes, each standing for 10 minutes at that depth
+        dive = make_dive(duration=2400)
+        dive['depths'] = [(0.25, 15), (0.5, 15), (0.75, 35), (1.0, 35)]
+
+        density = build_density([dive, dive])
+        grid = density['grid']
+
+        assert density['feet'] == 10
+        assert density['minutes'] == 5
+        assert sum(map(sum, grid)) == 80
+        # rows are depths from the surface, columns are elapsed time
+        assert grid[1][2] == 20  # 10-20ft, 10-15min
+        assert grid[1][4] == 20  # 10-20ft, 20-25min
+        assert grid[3][8] == 20  # 30-40ft, 40-45min
+        assert grid[0] == [0] * len(grid[0])
+
+    def test_svg(self) -> None:
+        svg = svg_density({'feet': 10, 'minutes': 5, 'grid': [[0, 4], [2, 0]]}, '#fff')
+        assert svg.count('<title>') == 2
+        assert '<title>10–20ft, 0–5min: 2</title>' in svg
+        assert svg_density({'feet': 10, 'minutes': 5, 'grid': []}, '#fff').startswith('<p>')
+
+
 class TestBuildLocationStats:
     def test_empty(self) -> None:
         assert build_location_stats([], []) == {}
@@ -279,6 +333,88 @@ class TestBuildTotals:
         assert totals['Unique Sites'] == 2
 
 
+g_dives = [
+    make_dive(1, depth=60, date='2023-01-01', directory='2023-01-01 Fort Ward'),
+    make_dive(2, depth=100, date='2023-01-02', directory='2023-01-02 Darwin'),
+    make_dive(3, depth=40, date='2023-01-02', directory='2023-01-02 Fort Ward'),
+]
+
+
+class TestStatsAccumulator:
+    """Incremental updates from the persisted state."""
+
+    def restored(
+        self, monkeypatch: pytest.MonkeyPatch, stats: StatsAccumulator
+    ) -> StatsAccumulator:
+        """save and load through json, like the database does"""
+        stored: dict[str, Any] = {}
+
+        def save(*keys: str, value: Any) -> None:
+            stored[keys[-1]] = json.loads(json.dumps(value))
+
+        monkeypatch.setattr(database.database, 'set', save)
+        monkeypatch.setattr(database.database, 'get', lambda *keys: stored.get(keys[-1]))
+        stats.save()
+        return StatsAccumulator.load()
+
+    def test_incremental(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        before = StatsAccumulator()
+        before.update(g_dives[:2], g_dives[:2])
+
+        after = self.restored(monkeypatch, before)
+        assert after.extends(g_dives, g_dives)
+        after.update(g_dives, g_dives)
+
+        everything = StatsAccumulator()
+        everything.update(g_dives, g_dives)
+
+        assert after.build_records() == everything.build_records()
+        assert after.build_distributions() == everything.build_distributions()
+        assert after.build_location_stats() == everything.build_location_stats()
+        assert after.logged_dives == 3
+
+    def test_changed_dives_start_over(self) -> None:
+        stats = StatsAccumulator()
+        stats.update(g_dives[1:], g_dives)
+
+        # a dive that's gone
+        assert not stats.extends(g_dives[2:], g_dives[2:])
+        # a dive that was logged without photos now has some
+        assert not stats.extends(g_dives, g_dives)
+
+    def test_edited_dive_starts_over(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        before = StatsAccumulator()
+        before.update(g_dives, g_dives)
+
+        deeper = make_dive(2, depth=120, date='2023-01-02', directory='2023-01-02 Darwin')
+        dives = [g_dives[0], deeper, g_dives[2]]
+
+        stats = self.restored(monkeypatch, before)
+        assert not stats.extends(dives, dives)
+
+        stats = StatsAccumulator()
+        stats.update(dives, dives)
+        assert stats.build_records()['Deepest Dive']['value'] == 120
+
+    def test_density_edited_profile(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        stored: dict[str, Any] = {}
+        monkeypatch.setattr(
+            database.database, 'set', lambda *keys, value: stored.update({keys[-1]: value})
+        )
+        monkeypatch.setattr(database.database, 'get', lambda *keys: stored.get(keys[-1]))
+
+        dive = make_dive(duration=2400)
+        dive['depths'] = [(0.5, 15), (1.0, 15)]
+        shallow = stats_module._cached_density([dive])
+
+        # the same number of waypoints, corrected
+        dive['depths'] = [(0.5, 35), (1.0, 35)]
+        deep = stats_module._cached_density([dive])
+
+        assert deep != shallow
+        assert deep == build_density([dive])
+
+
 class TestDiveToLocation:
     def test_simple(self) -> None:
         assert dive_to_location('2023-01-01 Fort Ward') == 'Fort Ward'
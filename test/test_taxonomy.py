@@ -4,6 +4,7 @@ import diving.util.common as utility
 from diving import gallery
 from diving.hypertext import Where
 from diving.util import collection, taxonomy
+from diving.util.metrics import metrics
 from diving.util.taxonomy import MappingType
 
 g_scientific = taxonomy.mapping()
@@ -136,6 +137,19 @@ class TestTaxonomy:
         match = taxonomy.gallery_scientific(lineage, g_scientific)
         assert match.endswith(expected), f'{match} != {expected}'
 
+    def test_gallery_scientific_unrecorded(self) -> None:
+        """lookups can leave names without taxonomy out of the metrics"""
+        metrics.take()
+        assert (
+            taxonomy.gallery_scientific(['orange', 'pulp', 'crab'], g_scientific, record=False)
+            == ''
+        )
+        assert taxonomy.no_taxonomy(['crab'], record=False)
+        assert metrics.take() == {}
+
+        assert taxonomy.gallery_scientific(['orange', 'pulp', 'crab'], g_scientific) == ''
+        assert metrics.take() == {'no scientific name': {'orange pulp crab'}}
+
     @pytest.mark.parametrize(
         'expected,pair',
         [
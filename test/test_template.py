@@ -0,0 +1,52 @@
+import pytest
+
+from diving.util.template import Template, chunk
+
+
+class TestTemplate:
+    """Precompiled template tests."""
+
+    def test_render(self) -> None:
+        t = Template('<a href="{link}">{name}</a>')
+        assert t.render(link='/x', name='X') == '<a href="/x">X</a>'
+
+    def test_matches_format(self) -> None:
+        text = """
+            <div class="{cls}">
+              {body} {body}
+            </div>
+        """
+        values = {'cls': 'grid', 'body': 'hello'}
+        assert Template(text).render(**values) == chunk(text).format(**values)
+
+    def test_dedent(self) -> None:
+        t = Template(
+            """\
+            <p>
+              {x}
+            </p>
+            """
+        )
+        assert t.render(x='1') == '<p>\n  1\n</p>\n'
+
+    def test_escaped_braces(self) -> None:
+        t = Template('body {{ color: {color}; }}')
+        assert t.render(color='red') == 'body { color: red; }'
+
+    def test_missing_value(self) -> None:
+        with pytest.raises(KeyError):
+            Template('{a} {b}').render(a='1')
+
+    def test_no_format_spec(self) -> None:
+        with pytest.raises(AssertionError):
+            Template('{a:>3}')
+
+    def test_partial(self) -> None:
+        t = Template('{a} {{literal}} {b}').partial(a='{x}')
+        assert t.slots == ['b']
+        assert t.render(b='2') == '{x} {literal} 2'
+
+    def test_chunks_interned(self) -> None:
+        a = Template('<p>{x}</p>\n')
+        b = Template('<p>{y}</p>\n')
+        assert a.chunks[0] is b.chunks[0]
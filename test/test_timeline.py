@@ -0,0 +1,124 @@
+import json
+import os
+import re
+from pathlib import Path
+
+import pytest
+
+from diving import timeline
+from diving.util import static
+from diving.util.fingerprint import Fingerprints
+
+g_dives = [
+    '2021-01-01 1 Rockaway Beach',
+    '2021-01-02 1 Sund Rock',
+    '2021-01-03 1 Sund Rock',
+    '2021-02-01 1 Fort Worden',
+]
+
+# dive -> what's changed about it
+g_edits: dict[str, str] = {}
+
+
+@pytest.fixture
+def site(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Fingerprints:
+    """dive folders and an output directory, each dive's page is just its name"""
+    images = tmp_path / 'images'
+    for dive in g_dives:
+        (images / dive).mkdir(parents=True)
+    (tmp_path / 'timeline').mkdir()
+    monkeypatch.chdir(tmp_path)
+
+    monkeypatch.setattr(static, 'image_root', str(images))
+    monkeypatch.setattr(timeline, 'BUNDLE_DIVES', 2)
+    monkeypatch.setattr(timeline, '_subpage', _subpage)
+
+    fingerprints = Fingerprints()
+    monkeypatch.setattr(timeline, 'fingerprints', fingerprints)
+    return fingerprints
+
+
+def _subpage(dive: str) -> tuple[str, str | None]:
+    path = f'timeline/{dive.replace(" ", "-")}.html'
+    if timeline.fingerprints.unchanged(path, dive, g_edits.get(dive)):
+        return path, None
+    return path, f'<p>{dive} {g_edits.get(dive, "")}</p>'
+
+
+def build(fingerprints: Fingerprints) -> dict[str, str | None]:
+    """one build, writing the pages out and keeping the fingerprints for the next"""
+    fingerprints.previous, fingerprints.current = fingerprints.current, {}
+    pages = dict(timeline.timeline())
+    for path, html in pages.items():
+        if html is not None:
+            Path(path).write_text(html)
+    return pages
+
+
+def bundles(pages: dict[str, str | None]) -> list[str]:
+    return [path for path in pages if path.startswith('timeline/bundle-')]
+
+
+class TestTimeline:
+    """Timeline pages and their bundles."""
+
+    def test_bundles(self, site: Fingerprints) -> None:
+        """newest first, a few dives at a time, never spanning months"""
+        pages = build(site)
+        names = [re.sub(r'-\w{10}\.html$', '', path) for path in bundles(pages)]
+        assert names == [
+            'timeline/bundle-2021-02-1',
+            'timeline/bundle-2021-01-1',
+            'timeline/bundle-2021-01-2',
+        ]
+
+        html = pages[bundles(pages)[1]]
+        assert html is not None
+        assert html.count('timeline-item') == 2
+        assert html.index('2021-01-03') < html.index('2021-01-02')
+
+    def test_index(self, site: Fingerprints) -> None:
+        """the newest bundle is inlined, the rest are listed for timeline.js"""
+        pages = build(site)
+        newest, *rest = bundles(pages)
+
+        index = pages['timeline/index.html']
+        assert index is not None
+        assert '2021-02-01 1 Fort Worden' in index
+        assert '2021-01-03' not in index
+
+        listed = re.search(r'const timelineBundles = (.*);', index)
+        assert listed
+        assert json.loads(listed.group(1)) == [f'/{path}' for path in rest]
+        assert f'/{newest}' not in listed.group(1)
+
+    def test_unchanged(self, site: Fingerprints) -> None:
+        """nothing is rendered again when no dive has changed"""
+        first = build(site)
+        second = build(site)
+        assert bundles(second) == bundles(first)
+        assert all(html is None for html in second.values())
+
+    def test_dive_changed(self, site: Fingerprints, monkeypatch: pytest.MonkeyPatch) -> None:
+        """a bundle is rebuilt under a new name when one of its dives changes,
+        the unchanged dive is read back from disk, and the old bundle removed
+        """
+        first = build(site)
+        monkeypatch.setitem(g_edits, '2021-01-03 1 Sund Rock', 'edited')
+        second = build(site)
+
+        assert second['timeline/2021-01-03-1-Sund-Rock.html'] is not None
+        assert second['timeline/2021-01-02-1-Sund-Rock.html'] is None
+
+        old, new = bundles(first)[1], bundles(second)[1]
+        assert old != new
+        html = second[new]
+        assert html is not None
+        assert '2021-01-03 1 Sund Rock edited' in html
+        assert '2021-01-02 1 Sund Rock' in html
+        assert not os.path.exists(old)
+
+        # the other bundles are untouched
+        assert bundles(second)[0] == bundles(first)[0]
+        assert second[bundles(second)[0]] is None
+        assert bundles(second)[2] == bundles(first)[2]
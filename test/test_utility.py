@@ -118,12 +118,3 @@ class TestUtility:
     )
     def test_strip_date(self, before: str, expected: str) -> None:
         assert utility.strip_date(before) == expected
-
-    def test_file_content_matches(self) -> None:
-        """it works"""
-        with open('LICENSE') as fd:
-            license = fd.read()
-
-        assert utility.file_content_matches('LICENSE', license) is True
-        assert utility.file_content_matches('LICENSE', 'Hello there') is False
-        assert utility.file_content_matches('LICENSE', license.replace(' ', '!')) is False
@@ -73,3 +73,20 @@ class TestVerify:
         """a name isn't misspelled if it has a scientific name"""
         wrong = [sorted(w) for w in verify._find_misspellings(set(names))]
         assert wrong == []
+
+    def test_letter_index_later(self) -> None:
+        """only names after this one, with close letter counts, in the length range"""
+        index = verify._LetterIndex(['bat star', 'basket star', 'star bat', 'sea star', 'tsar tab'])
+        assert index.later(0, 2, 5, 12) == ['star bat', 'tsar tab']
+        assert index.later(0, 6, 5, 12) == ['basket star', 'star bat', 'sea star', 'tsar tab']
+        assert index.later(0, 6, 5, 8) == ['star bat', 'sea star', 'tsar tab']
+        assert index.later(4, 6, 5, 12) == []
+
+    def test_detect_misspelling_groups(self) -> None:
+        """each name is grouped with the close names after it"""
+        names = {'bat star', 'basket star', 'blacktip reef shark', 'blacktail reef shark'}
+        wrong = list(verify._possible_misspellings(names))
+        assert wrong == [
+            ['basket star', 'bat star'],
+            ['blacktail reef shark', 'blacktip reef shark'],
+        ]
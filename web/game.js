@@ -8,6 +8,8 @@ let g_names = [];
 let g_thumbs = [];
 let g_similarities = [];
 let g_difficulties = [];
+let g_pools = [];
+let g_unpacked = {};
 
 const g_lower_bound_table = [0, 30, 50, 70, 80];
 const g_upper_bound_table = [30, 50, 70, 80, 100];
@@ -21,15 +23,13 @@ const g_sample_table = [2, 2, 2, 1, 1];
  * options below
  */
 function image_game() {
-  choose_dataset('main');
+  choose_dataset(get_dataset());
   const difficulty = get_difficulty();
   const correct = choose_correct(difficulty);
   console.log(g_names[correct]);
 
-  const lower_bound = g_lower_bound_table[difficulty];
-  const upper_bound = g_upper_bound_table[difficulty];
   const count = g_count_table[difficulty];
-  const options = find_similar(correct, lower_bound, upper_bound, count - 1);
+  const options = choose_distractors(correct, difficulty, count - 1);
 
   set_correct_image(correct);
   const actual = random(count);
@@ -52,16 +52,14 @@ function image_game() {
  * options below
  */
 function name_game() {
-  choose_dataset('main');
+  choose_dataset(get_dataset());
 
   const difficulty = get_difficulty();
   const correct = choose_correct(difficulty);
   console.log(g_names[correct]);
 
-  const lower_bound = g_lower_bound_table[difficulty];
-  const upper_bound = g_upper_bound_table[difficulty];
   const count = g_count_table[difficulty];
-  const options = find_similar(correct, lower_bound, upper_bound, count - 1);
+  const options = choose_distractors(correct, difficulty, count - 1);
 
   set_correct_name(correct);
   const actual = random(count);
@@ -95,10 +93,8 @@ function reef_game() {
   const correct = choose_correct(difficulty);
   console.log(g_names[correct]);
 
-  const lower_bound = g_lower_bound_table[difficulty];
-  const upper_bound = g_upper_bound_table[difficulty];
   const count = g_count_table[difficulty];
-  const options = find_similar(correct, lower_bound, upper_bound, count - 1);
+  const options = choose_distractors(correct, difficulty, count - 1);
 
   set_correct_name(correct);
   const actual = random(count);
@@ -122,27 +118,75 @@ function reef_game() {
 }
 
 function choose_dataset(dataset) {
-  if (dataset === 'main') {
-    g_names = main_names;
-    g_thumbs = main_thumbs;
-    g_similarities = main_similarities;
-    g_difficulties = main_difficulties;
-  } else if (dataset === 'reef') {
-    g_names = reef_names;
-    g_thumbs = reef_thumbs;
-    g_similarities = reef_similarities;
-    g_difficulties = reef_difficulties;
+  set_dataset(
+    dataset,
+    globalThis[`${dataset}_names`],
+    globalThis[`${dataset}_thumbs`],
+    globalThis[`${dataset}_similarities`],
+    globalThis[`${dataset}_difficulties`],
+  );
+}
+
+/**
+ * Load a dataset's data file, then continue. Only the main dataset is
+ * included in the page, the rest are fetched the first time they're played.
+ */
+function load_dataset(dataset, callback) {
+  const script = document.createElement('script');
+  script.src = g_dataset_urls[dataset];
+  script.addEventListener('load', callback);
+  document.head.appendChild(script);
+}
+
+/**
+ * Install a dataset as the active game tables, unpacking it first if the data
+ * file uses the packed encoding. Unpacked tables are cached by name.
+ */
+function set_dataset(name, names, thumbs, similarities, difficulties) {
+  // Older data files may not have distractor pools
+  const pools = globalThis[`${name}_pools`] ?? [];
+  g_names = names;
+
+  if (typeof thumbs !== 'string') {
+    g_thumbs = thumbs;
+    g_similarities = similarities;
+    g_difficulties = difficulties;
+    g_pools = pools;
+    return;
+  }
+
+  if (!(name in g_unpacked)) {
+    const hashes = globalThis[`${name}_hashes`];
+    g_unpacked[name] = {
+      thumbs: unpack_thumbs(hashes, thumbs),
+      similarities: unpack_similarities(similarities, names.length),
+      difficulties: decode_varints(decode_base64(difficulties)),
+      pools: typeof pools === 'string' ? unpack_pools(pools, g_count_table.length) : pools,
+    };
   }
+
+  const unpacked = g_unpacked[name];
+  g_thumbs = unpacked.thumbs;
+  g_similarities = unpacked.similarities;
+  g_difficulties = unpacked.difficulties;
+  g_pools = unpacked.pools;
 }
 
 /* HTML modifying utilities */
 
 function choose_game() {
+  const game = byId('game').value;
+  const dataset = game === 'reef' ? 'reef' : get_dataset();
+
+  if (typeof globalThis[`${dataset}_names`] === 'undefined') {
+    load_dataset(dataset, choose_game);
+    return;
+  }
+
   g_made_mistake = false;
   update_score();
   reset_options();
 
-  const game = byId('game').value;
   if (game === 'images') {
     image_game();
   } else if (game === 'names') {
@@ -337,6 +381,10 @@ function add_zoom() {
   options.appendChild(child);
 }
 
+function get_dataset() {
+  return byId('dataset')?.value ?? 'main';
+}
+
 function get_difficulty() {
   return parseInt(byId('difficulty').value);
 }
@@ -373,6 +421,28 @@ function choose_correct(difficulty) {
   return candidate;
 }
 
+/**
+ * Choose distractors for the target from its precomputed pool, which the
+ * build has already filtered to the difficulty's similarity band. Falls back
+ * to searching the similarity table if there's no usable pool.
+ *
+ * @param   {number} target - Index of the creature to find distractors for.
+ * @param   {number} difficulty - The difficulty level to match.
+ * @param   {number} required - How many creatures to find.
+ * @returns {number[]} Array of creature indices.
+ */
+function choose_distractors(target, difficulty, required) {
+  const pool = g_pools[target]?.[difficulty];
+
+  if (pool && pool.length >= required) {
+    return shuffle(pool).slice(0, required);
+  }
+
+  const lower_bound = g_lower_bound_table[difficulty];
+  const upper_bound = g_upper_bound_table[difficulty];
+  return find_similar(target, lower_bound, upper_bound, required);
+}
+
 /**
  * Find similar creatures as the provided target.
  *
@@ -468,7 +538,114 @@ function shuffle(array) {
   return result;
 }
 
+/* packed dataset decoding, see detective._write_data_js */
+
+/**
+ * Decode a base64 string into bytes.
+ * @param {string} text - base64 encoded data.
+ * @returns {Uint8Array}
+ */
+function decode_base64(text) {
+  const raw = atob(text);
+  const bytes = new Uint8Array(raw.length);
+  for (let i = 0; i < raw.length; i++) {
+    bytes[i] = raw.charCodeAt(i);
+  }
+  return bytes;
+}
+
+/**
+ * Decode LEB128 variable length unsigned integers.
+ * @param {Uint8Array} bytes - The encoded integers.
+ * @returns {number[]}
+ */
+function decode_varints(bytes) {
+  const values = [];
+  let value = 0;
+  let shift = 0;
+
+  for (const byte of bytes) {
+    value += (byte & 0x7f) * 2 ** shift;
+    if (byte & 0x80) {
+      shift += 7;
+    } else {
+      values.push(value);
+      value = 0;
+      shift = 0;
+    }
+  }
+  return values;
+}
+
+/**
+ * Split the flat lower triangular similarity table back into rows. The rows
+ * are views into one buffer, so g_similarities[i][j] works as before.
+ * @param {string} text - base64 encoded scores, one byte each.
+ * @param {number} count - How many names are in the dataset.
+ * @returns {Uint8Array[]}
+ */
+function unpack_similarities(text, count) {
+  const bytes = decode_base64(text);
+  const rows = [];
+  for (let i = 0, offset = 0; i < count; offset += ++i) {
+    rows.push(bytes.subarray(offset, offset + i + 1));
+  }
+  return rows;
+}
+
+/**
+ * Rebuild the distractor pools for every name and difficulty.
+ * @param {string} text - base64 varints, a count then indices for each pool.
+ * @param {number} difficulties - How many difficulty levels each name has.
+ * @returns {number[][][]}
+ */
+function unpack_pools(text, difficulties) {
+  const values = decode_varints(decode_base64(text));
+  const pools = [];
+
+  for (let i = 0; i < values.length; ) {
+    const row = [];
+    for (let d = 0; d < difficulties; d++) {
+      const count = values[i++];
+      row.push(values.slice(i, i + count));
+      i += count;
+    }
+    pools.push(row);
+  }
+  return pools;
+}
+
+/**
+ * Resolve thumbnail references against the hash dictionary.
+ * @param {string} hashes - Comma separated hash dictionary.
+ * @param {string} text - base64 varints, a count then indices for each name.
+ * @returns {string[][]}
+ */
+function unpack_thumbs(hashes, text) {
+  const dictionary = hashes.split(',');
+  const refs = decode_varints(decode_base64(text));
+  const thumbs = [];
+
+  for (let i = 0; i < refs.length; ) {
+    const count = refs[i++];
+    thumbs.push(refs.slice(i, i + count).map((ref) => dictionary[ref]));
+    i += count;
+  }
+  return thumbs;
+}
+
 // Export for testing (CommonJS)
 if (typeof module !== 'undefined' && module.exports) {
-  module.exports = { random, shuffle, find_similar, choose_correct };
+  module.exports = {
+    random,
+    shuffle,
+    find_similar,
+    choose_correct,
+    choose_distractors,
+    decode_base64,
+    decode_varints,
+    unpack_similarities,
+    unpack_pools,
+    unpack_thumbs,
+  };
 }
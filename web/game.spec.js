@@ -4,7 +4,15 @@ global.document = {
   }),
 };
 
-const { random, shuffle } = require('./game.js');
+const {
+  random,
+  shuffle,
+  decode_base64,
+  decode_varints,
+  unpack_similarities,
+  unpack_pools,
+  unpack_thumbs,
+} = require('./game.js');
 
 describe('random', () => {
   it('returns a value between 0 and maximum', () => {
@@ -102,4 +110,36 @@ describe('shuffle', () => {
   });
 });
 
+describe('packed datasets', () => {
+  // Fixtures produced by detective._pack_* in Python
+
+  it('decodes base64 into bytes', () => {
+    expect([...decode_base64('ACgAWgwA')]).toEqual([0, 40, 0, 90, 12, 0]);
+  });
+
+  it('decodes single and multi byte varints', () => {
+    const values = decode_varints(decode_base64('AAR/gAGsAg=='));
+    expect(values).toEqual([0, 4, 127, 128, 300]);
+  });
+
+  it('splits the similarity triangle into rows', () => {
+    const rows = unpack_similarities('ACgAWgwA', 3);
+    expect(rows.map((row) => [...row])).toEqual([[0], [40, 0], [90, 12, 0]]);
+    expect(rows[2][1]).toBe(12);
+  });
+
+  it('resolves thumbnail references', () => {
+    const thumbs = unpack_thumbs('aa,bb,cc', 'AgABAQIA');
+    expect(thumbs).toEqual([['aa', 'bb'], ['cc'], []]);
+  });
+
+  it('rebuilds distractor pools per name and difficulty', () => {
+    const pools = unpack_pools('AQEAAgIDAQEBAQEAAQABAAEAAQA=', 5);
+    expect(pools).toEqual([
+      [[1], [], [2, 3], [1], [1]],
+      [[0], [0], [0], [0], [0]],
+    ]);
+  });
+});
+
 // find_similar and choose_correct depend on module-level state and are not easily unit-testable
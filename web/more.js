@@ -0,0 +1,50 @@
+// Configuration
+const MORE_THRESHOLD = 1000; // pixels from bottom of page to trigger load
+
+// State
+let moreLink = null;
+let moreChunks = [];
+let isLoadingMore = false;
+
+async function loadMoreImages() {
+  if (isLoadingMore || !moreChunks.length) return;
+
+  isLoadingMore = true;
+  try {
+    const response = await fetch(moreChunks[0]);
+    const images = await response.json();
+    moreLink.insertAdjacentHTML('beforebegin', images.join(''));
+    moreChunks.shift();
+  } catch (error) {
+    // leave the link to the full page in place
+    console.error('Error loading images:', error);
+    window.removeEventListener('scroll', handleMoreScroll);
+    return;
+  }
+  isLoadingMore = false;
+
+  if (!moreChunks.length) {
+    window.removeEventListener('scroll', handleMoreScroll);
+    moreLink.remove();
+  } else {
+    handleMoreScroll();
+  }
+}
+
+function handleMoreScroll() {
+  if (window.innerHeight + window.scrollY >= document.body.offsetHeight - MORE_THRESHOLD) {
+    loadMoreImages();
+  }
+}
+
+// Initialization
+function initializeMore() {
+  moreLink = document.querySelector('a.more');
+  if (!moreLink) return;
+
+  moreChunks = moreLink.dataset.chunks.split(' ');
+  window.addEventListener('scroll', handleMoreScroll);
+  handleMoreScroll();
+}
+
+document.addEventListener('DOMContentLoaded', initializeMore);
@@ -1,10 +1,10 @@
-const splits = ['fish', 'coral', 'ray', 'chiton', 'snail', 'worm'];
+const splits = search_splits;
 const where = document.title.toLowerCase();
-const pages = {
-  gallery: gallery_pages,
-  taxonomy: taxonomy_pages,
-  sites: sites_pages,
-}[where];
+const section = search_index[where];
+
+// a few names for the placeholder, searches load the shards they need
+const pages = section.sample;
+const loaded = {};
 
 const CHAR_LIMIT = 100;
 let PREVIOUS_STACK = [];
@@ -54,12 +54,57 @@ function shortenName(name) {
   return name;
 }
 
-function search_inner(text, skip = 0) {
+function loadJson(path) {
+  if (!(path in loaded)) {
+    loaded[path] = fetch(`/${path}`).then((response) => response.json());
+  }
+  return loaded[path];
+}
+
+function prefixMatches(shard, word) {
+  // tokens are sorted, so those starting with word follow the first >= word
+  const tokens = shard.tokens;
+  let low = 0;
+  let high = tokens.length;
+  while (low < high) {
+    const middle = (low + high) >> 1;
+    if (tokens[middle][0] < word) {
+      low = middle + 1;
+    } else {
+      high = middle;
+    }
+  }
+
+  const matches = new Set();
+  for (let i = low; i < tokens.length && tokens[i][0].startsWith(word); i++) {
+    tokens[i][1].forEach((index) => matches.add(shard.pages[index]));
+  }
+  return matches;
+}
+
+async function candidates(text) {
+  const words = expandWords(text.replace("'", '').split(' ')).filter((word) => word);
+
+  let found = null;
+  for (let word of words) {
+    const path = section.shards[word[0]];
+    if (!path) {
+      return [];
+    }
+
+    const matches = prefixMatches(await loadJson(path), word);
+    found = found === null ? matches : new Set([...found].filter((page) => matches.has(page)));
+  }
+
+  return found === null ? [] : [...found];
+}
+
+function search_inner(text, skip = 0, names = pages) {
   const words = expandWords(text.replace("'", '').split(' '));
 
   let results = [];
-  for (let i = 0; i < pages.length; i++) {
-    const candidate = pages[i];
+  for (let i = 0; i < names.length; i++) {
+    const candidate = names[i];
     let match = true;
 
     for (let j = 0; j < words.length; j++) {
@@ -147,12 +192,18 @@ function addNextResult(skip, results_length) {
   SEARCH_RESULTS.appendChild(more);
 }
 
-function searcher(skip = 0) {
+async function searcher(skip = 0) {
   console.log(where);
 
+  const text = SEARCH_BAR.value.toLowerCase();
+  const found = await candidates(text);
+  if (SEARCH_BAR.value.toLowerCase() !== text) {
+    // superseded by a later search
+    return;
+  }
+
   SEARCH_RESULTS.innerHTML = '';
   SEARCH_RESULTS.classList.remove('have-results');
-  const text = SEARCH_BAR.value.toLowerCase();
   if (skip === 0) {
     PREVIOUS_STACK = [];
   }
@@ -160,7 +211,7 @@ function searcher(skip = 0) {
     return;
   }
 
-  const [results, truncated] = search_inner(text, skip);
+  const [results, truncated] = search_inner(text, skip, found);
   console.log('search found', results, truncated);
 
   if (results.length === 0) {
@@ -192,9 +243,10 @@ function searcher(skip = 0) {
   }
 }
 
-function randomPage() {
-  const index = Math.floor(Math.random() * pages.length);
-  const page = pages[index];
+async function randomPage() {
+  const everything = await loadJson(section.pages);
+  const index = Math.floor(Math.random() * everything.length);
+  const page = everything[index];
   window.location.href = pageToUrl(page);
 }
 
@@ -224,5 +276,12 @@ randomSearchPlaceholder();
 
 // Export for testing (CommonJS)
 if (typeof module !== 'undefined' && module.exports) {
-  module.exports = { expandWords, shortenName, search_inner, pageToUrl, toTitleCase };
+  module.exports = {
+    expandWords,
+    shortenName,
+    prefixMatches,
+    search_inner,
+    pageToUrl,
+    toTitleCase,
+  };
 }
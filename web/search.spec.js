@@ -13,11 +13,19 @@ const mockPages = [
   'Longlure Frogfish',
 ];
 
-global.gallery_pages = mockPages;
-global.taxonomy_pages = mockPages;
-global.sites_pages = mockPages;
+global.search_index = {
+  gallery: { pages: 'search/gallery.json', shards: {}, sample: mockPages },
+};
+global.search_splits = ['chiton', 'coral', 'fish', 'grass', 'ray', 'snail', 'worm'];
 
-const { expandWords, shortenName, search_inner, pageToUrl, toTitleCase } = require('./search.js');
+const {
+  expandWords,
+  shortenName,
+  prefixMatches,
+  search_inner,
+  pageToUrl,
+  toTitleCase,
+} = require('./search.js');
 
 describe('expandWords', () => {
   it('expands words containing "fish"', () => {
@@ -50,6 +58,12 @@ describe('expandWords', () => {
     expect(result).toEqual(['flat', 'worm']);
   });
 
+  it('splits at the first split word listed, like search.py', () => {
+    expect(expandWords(['coralfish'])).toEqual(['coralfish']);
+    expect(expandWords(['wormfish'])).toEqual(['worm', 'fish']);
+    expect(expandWords(['rockfishworm'])).toEqual(['rock', 'fishworm']);
+  });
+
   it('keeps words without split keywords unchanged', () => {
     const result = expandWords(['octopus']);
     expect(result).toEqual(['octopus']);
@@ -168,6 +182,32 @@ describe('search_inner', () => {
   });
 });
 
+describe('prefixMatches', () => {
+  const shard = {
+    pages: ['Blue Tang', 'Bluespine Unicornfish', 'Red Lionfish'],
+    tokens: [
+      ['blue', [0]],
+      ['bluespine', [1]],
+      ['fish', [1, 2]],
+      ['lion', [2]],
+      ['lionfish', [2]],
+    ],
+  };
+
+  it('finds every token starting with the word', () => {
+    expect([...prefixMatches(shard, 'blue')]).toEqual(['Blue Tang', 'Bluespine Unicornfish']);
+  });
+
+  it('finds the pieces of compound words', () => {
+    expect([...prefixMatches(shard, 'fish')]).toEqual(['Bluespine Unicornfish', 'Red Lionfish']);
+  });
+
+  it('returns nothing for a missing prefix', () => {
+    expect(prefixMatches(shard, 'bluf').size).toBe(0);
+    expect(prefixMatches(shard, 'z').size).toBe(0);
+  });
+});
+
 describe('pageToUrl', () => {
   it('converts spaces to hyphens', () => {
     const result = pageToUrl('Blue Tang');
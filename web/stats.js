@@ -55,6 +55,8 @@
 
   function renderBarChart(containerId, data, color) {
     const container = document.getElementById(containerId);
+    if (container && container.firstElementChild) return; // drawn with the page
+
     if (!container || !data || data.length === 0) {
       if (container) container.innerHTML = '<p>No data available</p>';
       return;
@@ -84,6 +86,51 @@
     container.innerHTML = html;
   }
 
+  function renderDensity(containerId, density, color) {
+    const container = document.getElementById(containerId);
+    if (container && container.firstElementChild) return; // drawn with the page
+
+    if (!container || !density || density.grid.length === 0) {
+      if (container) container.innerHTML = '<p>No data available</p>';
+      return;
+    }
+
+    // Same layout as svg_density in stats.py
+    const grid = density.grid;
+    const largest = Math.max(...grid.map((row) => Math.max(...row))) || 1;
+    const left = 45;
+    const cellHeight = 16;
+    const width = (400 - left) / grid[0].length;
+    const height = grid.length * cellHeight;
+
+    let html = `<svg class="bar-svg" viewBox="0 0 400 ${height + 20}" role="img">`;
+    html += `<rect class="bar-track" x="${left}" y="0" width="${400 - left}" height="${height}"/>`;
+    grid.forEach((row, i) => {
+      const y = i * cellHeight;
+      const depth = i * density.feet;
+      html += `<text x="${left - 5}" y="${y + cellHeight / 2}" text-anchor="end">${depth}</text>`;
+
+      row.forEach((value, j) => {
+        if (!value) return;
+        const time = j * density.minutes;
+        const opacity = Math.sqrt(value / largest).toFixed(2);
+        html += `
+          <rect x="${left + j * width}" y="${y}" width="${width}" height="${cellHeight}"
+                fill="${color}" fill-opacity="${opacity}">
+            <title>${depth}–${depth + density.feet}ft, ${time}–${time + density.minutes}min: ${value}</title>
+          </rect>
+          `;
+      });
+    });
+    for (let j = 0; j < grid[0].length; j += 3) {
+      const x = left + j * width;
+      html += `<text x="${x}" y="${height + 10}" text-anchor="middle">${j * density.minutes}</text>`;
+    }
+    html += '</svg>';
+
+    container.innerHTML = html;
+  }
+
   function renderLocations(locations) {
     const container = document.getElementById('locations');
     if (!container || !locations) return;
@@ -135,6 +182,7 @@
     renderBarChart('sac-chart', stats_data.distributions.sac, '#bf46ca');
     renderBarChart('end-chart', stats_data.distributions.end, '#f0ad4e');
     renderBarChart('start-chart', stats_data.distributions.start, '#f0ad4e');
+    renderDensity('density-chart', stats_data.density, '#4a90d9');
     renderLocations(stats_data.locations);
   }
 